@@ -1,36 +1,62 @@
 
 import pandas as pd
+import numpy as np
 import json
 import os
+import re
 import tempfile
+import shutil
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal
 from dotenv import load_dotenv
 import mysql.connector
 from mysql.connector import Error
-from anthropic import Anthropic
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import warnings
-import hashlib
+import copy
 import base64
 import io
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.utils import ImageReader
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-import markdown
+import time
+import random
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# anthropic, plotly (via charts) and reportlab are imported where they are used, to keep cold start fast
 import streamlit as st
+import ticket_rollup
+from response_cache import ResponseCache
+from report_store import ReportStore, new_report_id
+from name_index import ClientNameIndex
+import query_plan
+import tracing
+import query_log
+import statements
+import db_pool
+import portfolio
+import snapshot
+import jobs
+from query_results import rows_to_records, rows_to_columns, round_half_up
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 
 warnings.filterwarnings('ignore')
 
 # Load environment variables (for local development)
 load_dotenv()
 
+def get_config_value(key, default=None):
+    """Read a setting from Streamlit secrets, falling back to environment variables"""
+    try:
+        return st.secrets[key]
+    except Exception:
+        return os.getenv(key, default)
+
+logger = query_log.configure_logging(get_config_value("LOG_LEVEL"), get_config_value("LOG_FORMAT"))
+QUERY_LOGGER = query_log.QueryLogger(
+    slow_ms=get_config_value("SLOW_QUERY_MS"),
+    sample_rate=get_config_value("QUERY_LOG_SAMPLE_RATE")
+)
+
 # Authentication credentials - updated for Streamlit Cloud deployment
 try:
     # Try to use Streamlit secrets first (for cloud deployment)
@@ -98,8 +124,10 @@ def logout():
     """Handle user logout"""
     st.session_state.authenticated = False
     st.session_state.username = None
-    # Clear generated reports
+    # Clear generated reports and their stored artifacts
     if 'generated_reports' in st.session_state:
+        for report in st.session_state.generated_reports:
+            get_report_store().delete(report['report_id'])
         del st.session_state.generated_reports
     st.rerun()
 
@@ -107,68 +135,194 @@ def logout():
 if 'generated_reports' not in st.session_state:
     st.session_state.generated_reports = []
 
+# Ids of this session's report jobs that have not been collected yet. Jobs are owned by the
+# session, not the login: the role accounts are shared by several people.
+if 'report_jobs' not in st.session_state:
+    st.session_state.report_jobs = []
+if 'job_owner' not in st.session_state:
+    st.session_state.job_owner = uuid.uuid4().hex
+
 if 'current_report' not in st.session_state:
     st.session_state.current_report = None
 
+# Shared store for report artifacts; session state only keeps report metadata
+@st.cache_resource
+def get_report_store():
+    return ReportStore(
+        per_user_bytes=int(float(get_config_value("REPORT_STORE_USER_MB", 50)) * 1024 * 1024),
+        global_bytes=int(float(get_config_value("REPORT_STORE_GLOBAL_MB", 1024)) * 1024 * 1024)
+    )
+
+# Recent pipeline traces for the performance panel; TRACE_LOG_PATH also appends them as JSON lines
+@st.cache_resource
+def get_trace_store():
+    return tracing.TraceStore(
+        max_traces=int(get_config_value("TRACE_HISTORY", 200)),
+        path=get_config_value("TRACE_LOG_PATH") or None
+    )
+
+# Worker pool for report generation, shared by every session; job manifests outlive the process
+@st.cache_resource
+def get_report_jobs():
+    return jobs.JobQueue(
+        max_workers=int(get_config_value("REPORT_JOB_WORKERS", 4)),
+        manifest_dir=get_config_value("REPORT_JOBS_DIR") or os.path.join(tempfile.gettempdir(), "smartworks_report_jobs"),
+        max_jobs=int(get_config_value("REPORT_JOB_HISTORY", 500))
+    )
+
+def is_admin(username=None):
+    username = username or st.session_state.get('username')
+    admins = [name.strip() for name in str(get_config_value("ADMIN_USERS", "smartworks_admin")).split(",")]
+    return username in admins
+
+# Deferred download data: build an export on first request, then memoize it in the report store
+def report_export(report, kind):
+    """Returns a callable for st.download_button data (Streamlit 1.52+); kind is 'markdown_content' or 'pdf_content'"""
+    store = get_report_store()
+    trace_store = get_trace_store()
+    empty = b"" if kind == 'pdf_content' else ""
+    
+    # Runs outside the script thread when the download is clicked, so it must not touch st.session_state
+    def _build():
+        report_id = report['report_id']
+        if store.has(report_id, kind):
+            return store.load(report_id, kind) or empty
+        if not store.has(report_id):
+            return empty
+        
+        with tracing.trace(f"export_{kind.split('_')[0]}", store=trace_store,
+                           report_id=report_id, client_name=report['client_name']):
+            ai_report = store.load(report_id, 'ai_report') or ''
+            charts = store.load(report_id, 'charts') or {}
+            chart_pngs = store.load(report_id, 'chart_pngs')
+            artifacts = {}
+            if chart_pngs is None:
+                chart_pngs = artifacts['chart_pngs'] = export_chart_images(charts)
+            
+            if kind == 'markdown_content':
+                with tracing.span("markdown_build", "export"):
+                    content = create_markdown_with_charts(
+                        ai_report, charts, report['client_name'], chart_pngs, report['generated_by']
+                    )
+            else:
+                with tracing.span("pdf_build", "export"):
+                    content = create_pdf_report(
+                        ai_report, charts, report['client_name'], chart_pngs, report['generated_by']
+                    )
+            
+            artifacts[kind] = content
+            store.save(report_id, report['generated_by'], report['data_dir'], artifacts)
+        return content or empty
+    
+    return _build
+
+# Drop metadata for reports whose artifacts were evicted from the store
+def prune_evicted_reports():
+    store = get_report_store()
+    st.session_state.generated_reports = [
+        report for report in st.session_state.generated_reports if store.has(report['report_id'])
+    ]
+    current = st.session_state.current_report
+    if current and not store.has(current['report_id']):
+        st.session_state.current_report = None
+
+# Pool size: DB_POOL_SIZE if set, otherwise enough for every report job worker fetching in parallel at once
+def get_pool_size():
+    configured = get_config_value("DB_POOL_SIZE")
+    if configured:
+        return int(configured)
+    # The long-lived primary connection, the portfolio's two bulk queries and the name index reload,
+    # plus one for the rollup refresher thread when enabled
+    reserved = 1 + 2 + 1 + (str(get_config_value("ROLLUP_BACKGROUND_REFRESH", "false")).lower() == "true")
+    # Reports only fetch on the job queue's workers, so they bound the concurrent report fetches
+    return db_pool.recommended_pool_size(
+        int(get_config_value("REPORT_JOB_WORKERS", 4)),
+        int(get_config_value("DB_PARALLEL_WORKERS", 6)),
+        reserved=reserved
+    )
+
+# Where report data is read from: "mysql" (live database) or "snapshot" (Parquet export, see snapshot.py)
+def get_data_source():
+    return str(get_config_value("DATA_SOURCE", "mysql")).lower()
+
+# Shared snapshot reader (one per server process); it reopens the files after each export
+@st.cache_resource
+def get_snapshot_reader():
+    return snapshot.SnapshotReader(get_config_value("SNAPSHOT_DIR", "./snapshot"))
+
 # Initialize connections - optimized for Streamlit Cloud
 @st.cache_resource
 def init_connections():
     connections = {}
     
-    # MySQL connection with timeout and retry logic
-    try:
-        # Connection parameters with timeouts
-        connection_config = {
-            'connect_timeout': 10,  # 10 seconds connection timeout
-            'autocommit': True,
-            'raise_on_warnings': True,
-            'use_unicode': True,
-            'charset': 'utf8mb4',
-            'connection_timeout': 10,
-            'pool_name': 'smartworks_pool',
-            'pool_size': 3,
-            'pool_reset_session': True
-        }
-        
-        # Try Streamlit secrets first (for cloud deployment)
+    # In snapshot mode reports are read from Parquet files and MySQL is not touched
+    if get_data_source() == "snapshot":
+        connections['mysql'] = None
+        connections['mysql_pool'] = None
+    else:
+        # MySQL connection with timeout and retry logic
         try:
-            connection_config.update({
-                'host': st.secrets["DB_HOST"],
-                'database': st.secrets["DB_NAME"],
-                'user': st.secrets["DB_USER"],
-                'password': st.secrets["DB_PASSWORD"],
-                'port': int(st.secrets.get("DB_PORT", 3306))
-            })
-        except Exception:
-            # Fallback to environment variables (for local development)
-            connection_config.update({
-                'host': os.getenv('DB_HOST'),
-                'database': os.getenv('DB_NAME'),
-                'user': os.getenv('DB_USER'),
-                'password': os.getenv('DB_PASSWORD'),
-                'port': int(os.getenv("DB_PORT", 3306))
-            })
-        
-        # Create connection with timeout
-        conn = mysql.connector.connect(**connection_config)
-        
-        # Test connection with a simple query
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        cursor.close()
+            # Connection parameters with timeouts
+            connection_config = {
+                'connect_timeout': 10,  # 10 seconds connection timeout
+                'autocommit': True,
+                'raise_on_warnings': True,
+                'use_unicode': True,
+                'charset': 'utf8mb4',
+                'connection_timeout': 10
+            }
         
-        connections['mysql'] = conn
-        print("✅ Connected to MySQL database")
+            # Try Streamlit secrets first (for cloud deployment)
+            try:
+                connection_config.update({
+                    'host': st.secrets["DB_HOST"],
+                    'database': st.secrets["DB_NAME"],
+                    'user': st.secrets["DB_USER"],
+                    'password': st.secrets["DB_PASSWORD"],
+                    'port': int(st.secrets.get("DB_PORT", 3306))
+                })
+            except Exception:
+                # Fallback to environment variables (for local development)
+                connection_config.update({
+                    'host': os.getenv('DB_HOST'),
+                    'database': os.getenv('DB_NAME'),
+                    'user': os.getenv('DB_USER'),
+                    'password': os.getenv('DB_PASSWORD'),
+                    'port': int(os.getenv("DB_PORT", 3306))
+                })
         
-    except mysql.connector.Error as e:
-        st.error(f"❌ MySQL Error: {e}")
-        print(f"MySQL connection failed: {e}")
-        connections['mysql'] = None
-    except Exception as e:
-        st.error(f"❌ Database connection failed: {str(e)}")
-        print(f"Database connection error: {e}")
-        connections['mysql'] = None
+            # Create the shared pool; connections are checked out per query in parallel mode
+            pool = db_pool.ConnectionPool(
+                connection_config,
+                size=get_pool_size(),
+                ping_interval=float(get_config_value("DB_PING_INTERVAL_SECONDS", 30)),
+                checkout_timeout=float(get_config_value("DB_CHECKOUT_TIMEOUT", 10)),
+                # Resetting the session on checkin deallocates server-side prepared statements,
+                # so it is off by default to let report statements be reused across requests
+                reset_session=str(get_config_value("DB_POOL_RESET_SESSION", "false")).lower() == "true"
+            )
+            conn = pool.get_connection()
+        
+            # Test connection with a simple query
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+        
+            connections['mysql_pool'] = pool
+            connections['mysql'] = conn
+            print("✅ Connected to MySQL database")
+        
+        except mysql.connector.Error as e:
+            st.error(f"❌ MySQL Error: {e}")
+            print(f"MySQL connection failed: {e}")
+            connections['mysql'] = None
+            connections['mysql_pool'] = None
+        except Exception as e:
+            st.error(f"❌ Database connection failed: {str(e)}")
+            print(f"Database connection error: {e}")
+            connections['mysql'] = None
+            connections['mysql_pool'] = None
     
     # Anthropic AI - quick initialization
     try:
@@ -180,6 +334,8 @@ def init_connections():
             anthropic_api_key = os.getenv("ANTHROPIC_API_KEY")
         
         if anthropic_api_key:
+            from anthropic import Anthropic
+            
             connections['anthropic'] = Anthropic(
                 api_key=anthropic_api_key,
                 timeout=30.0  # 30 second timeout for API calls
@@ -294,34 +450,67 @@ TECHNICAL REQUIREMENTS:
 RETURN ONLY executable Python code without markdown formatting.
 """
 
-# Convert plotly figure to base64 image
-def fig_to_base64(fig):
-    """Convert plotly figure to base64 string for embedding in reports"""
+# Canonical export size shared by the Markdown and PDF reports (3:2, matches the 6x4 inch PDF frame)
+CHART_IMAGE_WIDTH = 900
+CHART_IMAGE_HEIGHT = 600
+
+# Keep a kaleido renderer warm across reports (one per server process)
+@st.cache_resource
+def start_image_export_server():
+    """Returns the lock every chart export must hold.
+    
+    kaleido's sync server is process-global and does not match answers to callers, so
+    concurrent to_image calls (report jobs, batch workers) would receive each other's PNGs.
+    """
     try:
-        img_bytes = fig.to_image(format="png", width=800, height=500)
-        img_base64 = base64.b64encode(img_bytes).decode()
-        return f"data:image/png;base64,{img_base64}"
+        import kaleido
+        if hasattr(kaleido, "start_sync_server"):
+            # Kaleido v1 renders through Chrome; a persistent server avoids a browser launch per image.
+            # Probe first: without Chrome the server never answers and every export (and job) would hang
+            import plotly.graph_objects as go
+            go.Figure().to_image(format="png", width=10, height=10)
+            kaleido.start_sync_server(n=1, silence_warnings=True)
     except Exception as e:
-        print(f"Error converting figure to base64: {e}")
-        return None
+        print(f"Warning: could not start persistent image export server: {e}")
+    return threading.Lock()
+
+# Render every chart to PNG once, one at a time (the server renders serially anyway)
+def export_chart_images(charts, width=CHART_IMAGE_WIDTH, height=CHART_IMAGE_HEIGHT):
+    """Returns {chart_name: png bytes}; charts that fail to render are left out"""
+    figures = {name: fig for name, fig in charts.items() if fig is not None}
+    if not figures:
+        return {}
+    
+    export_lock = start_image_export_server()
+    images = {}
+    for name, fig in figures.items():
+        with tracing.span(f"kaleido_export:{name}", "export", width=width, height=height) as span:
+            try:
+                with export_lock:
+                    images[name] = fig.to_image(format="png", width=width, height=height)
+                span.set(bytes=len(images[name]))
+            except Exception as e:
+                print(f"Error exporting {name} to PNG: {e}")
+    return images
+
+def png_to_data_uri(img_bytes):
+    return f"data:image/png;base64,{base64.b64encode(img_bytes).decode()}"
 
 # Create markdown report with embedded charts
-def create_markdown_with_charts(ai_report, charts, client_name):
+def create_markdown_with_charts(ai_report, charts, client_name, chart_pngs=None, generated_by=None):
     """Create enhanced markdown report with embedded chart images"""
+    generated_by = generated_by or st.session_state.get('username', 'SmartWorks User')
     
-    # Convert charts to base64 for embedding
-    chart_images = {}
-    for chart_name, fig in charts.items():
-        if fig is not None:
-            base64_img = fig_to_base64(fig)
-            if base64_img:
-                chart_images[chart_name] = base64_img
+    # Reuse pre-rendered PNGs when available, otherwise render now
+    if chart_pngs is None:
+        chart_pngs = export_chart_images(charts)
+    chart_images = {name: png_to_data_uri(img) for name, img in chart_pngs.items()}
     
     # Create enhanced markdown content
     markdown_content = f"""# SmartWorks Client Analytics Report
 
 **Generated on:** {datetime.now().strftime('%B %d, %Y at %I:%M %p')}  
-**Generated by:** {st.session_state.get('username', 'SmartWorks User')}  
+**Generated by:** {generated_by}  
 **Client:** {client_name}
 
 ---
@@ -376,9 +565,19 @@ This comprehensive analysis provides SmartWorks operations team with:
     return markdown_content
 
 # Create PDF report
-def create_pdf_report(ai_report, charts, client_name):
+def create_pdf_report(ai_report, charts, client_name, chart_pngs=None, generated_by=None):
     """Create PDF report with embedded charts"""
     try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.lib.units import inch
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Image, PageBreak
+        
+        generated_by = generated_by or st.session_state.get('username', 'SmartWorks User')
+        if chart_pngs is None:
+            chart_pngs = export_chart_images(charts)
+        
         # Create BytesIO buffer for PDF
         buffer = io.BytesIO()
         
@@ -410,7 +609,7 @@ def create_pdf_report(ai_report, charts, client_name):
         story.append(Spacer(1, 20))
         story.append(Paragraph(f"<b>Client:</b> {client_name}", styles['Normal']))
         story.append(Paragraph(f"<b>Generated on:</b> {datetime.now().strftime('%B %d, %Y at %I:%M %p')}", styles['Normal']))
-        story.append(Paragraph(f"<b>Generated by:</b> {st.session_state.get('username', 'SmartWorks User')}", styles['Normal']))
+        story.append(Paragraph(f"<b>Generated by:</b> {generated_by}", styles['Normal']))
         story.append(Spacer(1, 30))
         
         # Add AI report content
@@ -440,14 +639,12 @@ def create_pdf_report(ai_report, charts, client_name):
         }
         
         for chart_key in ['fig1', 'fig2', 'fig3', 'fig4']:
-            if chart_key in charts and charts[chart_key] is not None:
+            if chart_key in chart_pngs:
                 # Add chart title
                 story.append(Paragraph(chart_titles.get(chart_key, chart_key), heading_style))
                 story.append(Spacer(1, 12))
                 
-                # Convert chart to image
-                img_bytes = charts[chart_key].to_image(format="png", width=600, height=400)
-                img = Image(io.BytesIO(img_bytes), width=6*inch, height=4*inch)
+                img = Image(io.BytesIO(chart_pngs[chart_key]), width=6*inch, height=4*inch)
                 story.append(img)
                 story.append(Spacer(1, 20))
         
@@ -460,42 +657,89 @@ def create_pdf_report(ai_report, charts, client_name):
         st.error(f"Error creating PDF: {e}")
         return None
 
-# Execute SQL query with logging
-def execute_query(cursor, query, query_name=""):
+# Run a parameterized query as a server-side prepared statement reused on this connection
+def execute_statement(conn, query, query_name="", params=None, columnar=False, raise_errors=False):
+    # Uncontended on pooled connections; serializes threads that share one connection
+    with statements.connection_lock(conn):
+        if str(get_config_value("DB_PREPARED_STATEMENTS", "true")).lower() != "true":
+            cursor = conn.cursor()
+            try:
+                return execute_query(cursor, query, query_name, params, columnar, raise_errors)
+            finally:
+                cursor.close()
+        
+        cache = statements.get_statement_cache(conn, int(get_config_value("DB_MAX_PREPARED_STATEMENTS", 64)))
+        cursor, prepared_query = cache.cursor_for(query)
+        try:
+            return execute_query(cursor, prepared_query, query_name, params, columnar, raise_errors)
+        except Exception:
+            cache.discard(query)
+            raise
+
+# Execute SQL query with logging (one structured record per query; full SQL only at DEBUG)
+def execute_query(cursor, query, query_name="", params=None, columnar=False, raise_errors=False):
+    """Returns a list of records, or {column: np.ndarray} with columnar=True.
+    
+    A failed query is shown on the page and returns [], unless raise_errors is set.
+    """
+    start = time.perf_counter()
     try:
-        print(f"\n🔍 Executing {query_name}:")
-        print("-" * 50)
-        print(query)
-        print("-" * 50)
-        
-        cursor.execute(query)
-        result = cursor.fetchall()
-        columns = [col[0] for col in cursor.description]
-        df_result = pd.DataFrame(result, columns=columns).to_dict(orient='records')
-        
-        print(f"✅ {query_name}: {len(df_result)} records found")
-        return df_result
+        with tracing.span(f"query:{query_name}", "db") as span:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            rows = cursor.fetchall()
+            columns = [col[0] for col in cursor.description]
+            result = rows_to_columns(columns, rows) if columnar else rows_to_records(columns, rows)
+            span.set(rows=len(rows))
+        
+        QUERY_LOGGER.log(query_name, query, time.perf_counter() - start, rows=len(rows), params=params)
+        return result
     except Error as e:
-        print(f"❌ Error executing {query_name}: {e}")
+        QUERY_LOGGER.log(query_name, query, time.perf_counter() - start, params=params, error=e)
+        if raise_errors:
+            raise
         st.error(f"Error executing {query_name}: {e}")
         return []
 
-# Get client data with enhanced queries
-def get_client_data(client_name, cursor):
+MONTH_NAMES = {
+    1: 'jan', 2: 'feb', 3: 'mar', 4: 'apr', 5: 'may', 6: 'jun',
+    7: 'jul', 8: 'aug', 9: 'sep', 10: 'oct', 11: 'nov', 12: 'dec'
+}
+
+# Column names are interpolated into SQL, so only seat_<mon><yyyy> / revenue_<mon><yyyy> are allowed
+PERIOD_COLUMN_PATTERN = re.compile(r"(seat|revenue)_(" + "|".join(MONTH_NAMES.values()) + r")\d{4}")
+
+def validate_period_column(column):
+    if not PERIOD_COLUMN_PATTERN.fullmatch(column):
+        raise ValueError(f"Invalid period column: {column!r}")
+    return column
+
+# Seat and revenue column names for the current analysis month
+def get_period_columns():
+    now = pd.Timestamp.now()
+    period = f"{MONTH_NAMES[now.month]}{now.year}"
+    return validate_period_column(f"seat_{period}"), validate_period_column(f"revenue_{period}")
+
+# Half-open [first of month, first of next month) range, so createdAt filters stay index-friendly
+def get_month_range(as_of=None):
+    month_start = (as_of or pd.Timestamp.now()).normalize().replace(day=1)
+    next_month_start = month_start + pd.offsets.MonthBegin(1)
+    return month_start.strftime('%Y-%m-%d'), next_month_start.strftime('%Y-%m-%d')
+
+# Build the report queries for a client; values are bound as parameters so the SQL text is the same for every client
+def build_client_queries(client_name):
+    """Returns (queries, params) keyed by query name"""
     current_year = pd.Timestamp.now().year
     current_month = pd.Timestamp.now().month
+    current_month_name = MONTH_NAMES[current_month]
     
-    month_names = {
-        1: 'jan', 2: 'feb', 3: 'mar', 4: 'apr', 5: 'may', 6: 'jun',
-        7: 'jul', 8: 'aug', 9: 'sep', 10: 'oct', 11: 'nov', 12: 'dec'
-    }
-    current_month_name = month_names[current_month]
-    
-    seat_column = f"seat_{current_month_name}{current_year}"
-    revenue_column = f"revenue_{current_month_name}{current_year}"
+    seat_column, revenue_column = get_period_columns()
+    month_start, next_month_start = get_month_range()
     
-    print(f"\n📅 Analysis Period: {current_month_name.upper()} {current_year}")
-    print(f"📊 Using columns: {seat_column}, {revenue_column}")
+    logger.debug("analysis period %s %s, columns %s, %s",
+                 current_month_name.upper(), current_year, seat_column, revenue_column)
     
     queries = {
         "client_demographics": f"""
@@ -524,7 +768,7 @@ def get_client_data(client_name, cursor):
                 ELSE 0 
             END as days_since_moveout
         FROM chatbot_portfolio_sheet
-        WHERE Status IN ('Active', 'Inactive') AND Client_Name = '{client_name}'
+        WHERE Status IN ('Active', 'Inactive') AND Client_Name = %s
         """,
         
         "center_avg_pricing": f"""
@@ -547,13 +791,13 @@ def get_client_data(client_name, cursor):
             AND p.Centre = (
                 SELECT Centre 
                 FROM chatbot_portfolio_sheet 
-                WHERE Client_Name = '{client_name}' 
+                WHERE Client_Name = %s 
                 LIMIT 1
             )
         GROUP BY p.Centre
         """,
         
-        "monthly_trend": f"""
+        "monthly_trend": """
         SELECT 
             DATE_FORMAT(createdAt, '%Y-%m') as month,
             COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as resolved_tickets,
@@ -561,13 +805,13 @@ def get_client_data(client_name, cursor):
             COUNT(*) as total_tickets,
             ROUND(AVG(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat
         FROM prod_ticketing 
-        WHERE companyName = '{client_name}'
+        WHERE companyName = %s
             AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
         GROUP BY DATE_FORMAT(createdAt, '%Y-%m')
         ORDER BY month
         """,
         
-        "issues_breakdown": f"""
+        "issues_breakdown": """
         SELECT 
             category,
             subCategory,
@@ -577,7 +821,7 @@ def get_client_data(client_name, cursor):
             ROUND(AVG(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat,
             ROUND((COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) * 100.0 / COUNT(*)), 2) as resolution_rate
         FROM prod_ticketing 
-        WHERE companyName = '{client_name}'
+        WHERE companyName = %s
             AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
             AND category IS NOT NULL
             AND category != 'AC'
@@ -585,7 +829,7 @@ def get_client_data(client_name, cursor):
         ORDER BY total_tickets DESC
         """,
         
-        "sla_compliance": f"""
+        "sla_compliance": """
         SELECT 
             COUNT(*) as total_tickets,
             COUNT(CASE WHEN isDueDateBreached = 0 THEN 1 END) as within_sla,
@@ -594,12 +838,12 @@ def get_client_data(client_name, cursor):
             ROUND(AVG(CASE WHEN isDueDateBreached = 0 AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat_within_sla,
             ROUND(AVG(CASE WHEN isDueDateBreached = 1 AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat_breached
         FROM prod_ticketing 
-        WHERE companyName = '{client_name}'
-            AND YEAR(createdAt) = {current_year}
-            AND MONTH(createdAt) = {current_month}
+        WHERE companyName = %s
+            AND createdAt >= %s
+            AND createdAt < %s
         """,
         
-        "escalation_analysis": f"""
+        "escalation_analysis": """
         SELECT 
             escalationLevel,
             escalationStatus,
@@ -609,7 +853,7 @@ def get_client_data(client_name, cursor):
             COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as unresolved_count,
             ROUND((COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) * 100.0 / COUNT(*)), 2) as resolution_rate
         FROM prod_ticketing 
-        WHERE companyName = '{client_name}'
+        WHERE companyName = %s
             AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
             AND escalationLevel IS NOT NULL
         GROUP BY escalationLevel, escalationStatus
@@ -617,66 +861,859 @@ def get_client_data(client_name, cursor):
         """
     }
     
-    data = {}
+    params = {name: (client_name,) for name in queries}
+    params['sla_compliance'] = (client_name, month_start, next_month_start)
+    return queries, params
+
+# Run queries one after another, as prepared statements on connection or with bound params on cursor
+def run_queries_sequential(queries, params, cursor=None, connection=None, columnar=()):
+    """Returns (results, timings, failed) keyed by query name; queries named in columnar return NumPy columns.
+    
+    A failed query's result is [] and its name is listed in failed, so callers can tell it from an empty result.
+    """
+    results, timings, failed = {}, {}, []
     for query_name, query in queries.items():
+        start = time.perf_counter()
+        as_columns = query_name in columnar
         try:
-            result = execute_query(cursor, query, query_name)
-            data[query_name] = result
+            if connection is not None:
+                results[query_name] = execute_statement(
+                    connection, query, query_name, params.get(query_name), as_columns, raise_errors=True
+                )
+            else:
+                results[query_name] = execute_query(
+                    cursor, query, query_name, params.get(query_name), as_columns, raise_errors=True
+                )
         except Exception as e:
-            print(f"❌ Error executing {query_name}: {e}")
-            data[query_name] = []
-    
+            logger.error("query %s failed: %s", query_name, e, extra={'query': query_name, 'error': str(e)})
+            results[query_name] = []
+            failed.append(query_name)
+        timings[query_name] = time.perf_counter() - start
+    return results, timings, failed
+
+# Get client data with enhanced queries
+def get_client_data(client_name, cursor=None, connection=None):
+    queries, params = build_client_queries(client_name)
+    data, _, _ = run_queries_sequential(queries, params, cursor, connection)
     return data
 
+# Columns needed from prod_ticketing to derive all four ticket result sets
+TICKET_SLICE_COLUMNS = [
+    'createdAt', 'clientStatus', 'category', 'subCategory', 'TAT',
+    'isDueDateBreached', 'escalationLevel', 'escalationStatus'
+]
+
+TICKET_RESULT_SETS = ['monthly_trend', 'issues_breakdown', 'sla_compliance', 'escalation_analysis']
+
+# Single scan of a client's 6-month ticket window; binds companyName
+def build_ticket_slice_query():
+    return f"""
+        SELECT 
+            {', '.join(TICKET_SLICE_COLUMNS)}
+        FROM prod_ticketing 
+        WHERE companyName = %s
+            AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
+        """
+
+# Convert an aggregated frame to JSON-friendly records (NaN -> None, numpy -> python types)
+def frame_to_records(df):
+    df = df.astype(object)
+    return df.where(pd.notna(df), None).to_dict(orient='records')
+
+def _round_or_none(value):
+    return None if pd.isna(value) else round_half_up(value)
+
+# Derive monthly_trend, issues_breakdown, sla_compliance and escalation_analysis from one ticket slice
+def derive_ticket_aggregates(ticket_rows, as_of=None):
+    """Vectorized equivalent of the four prod_ticketing queries, with the same result shapes.
+    
+    ticket_rows is a list of rows in TICKET_SLICE_COLUMNS order or a {column: array} mapping.
+    """
+    as_of = as_of or pd.Timestamp.now()
+    tickets = pd.DataFrame(ticket_rows, columns=TICKET_SLICE_COLUMNS)
+    
+    created = pd.to_datetime(tickets['createdAt'])
+    status = tickets['clientStatus']
+    tat = pd.to_numeric(tickets['TAT'], errors='coerce').astype(float)
+    breached = pd.to_numeric(tickets['isDueDateBreached'], errors='coerce')
+    
+    closed = (status == 'Closed').to_numpy()
+    work = pd.DataFrame({
+        'month': created.dt.strftime('%Y-%m'),
+        'category': tickets['category'],
+        'subCategory': tickets['subCategory'],
+        'escalationLevel': tickets['escalationLevel'],
+        'escalationStatus': tickets['escalationStatus'],
+        'resolved': closed.astype(np.int64),
+        'unresolved': (status == 'Open').to_numpy().astype(np.int64),
+        'tat': tat,
+        'closed_tat': tat.where(closed),
+    })
+    
+    # Monthly trend
+    monthly = work.groupby('month', sort=True).agg(
+        resolved_tickets=('resolved', 'sum'),
+        unresolved_tickets=('unresolved', 'sum'),
+        total_tickets=('resolved', 'size'),
+        avg_tat=('closed_tat', 'mean'),
+    ).reset_index()
+    # Rounded half up like MySQL ROUND, so every fetch mode returns the same figures
+    monthly['avg_tat'] = monthly['avg_tat'].map(round_half_up)
+    
+    # Issues breakdown (AC tickets and uncategorised tickets are excluded, as in the SQL)
+    issues_mask = work['category'].notna() & (work['category'] != 'AC')
+    issues = work[issues_mask].groupby(['category', 'subCategory'], dropna=False, sort=False).agg(
+        resolved_count=('resolved', 'sum'),
+        unresolved_count=('unresolved', 'sum'),
+        total_tickets=('resolved', 'size'),
+        avg_tat=('closed_tat', 'mean'),
+    ).reset_index()
+    issues['avg_tat'] = issues['avg_tat'].map(round_half_up)
+    issues['resolution_rate'] = (issues['resolved_count'] * 100.0 / issues['total_tickets']).map(round_half_up)
+    issues = issues.sort_values('total_tickets', ascending=False, kind='mergesort')
+    
+    # SLA compliance for the current calendar month
+    in_month = ((created.dt.year == as_of.year) & (created.dt.month == as_of.month)).to_numpy()
+    within = in_month & (breached == 0).to_numpy()
+    breach = in_month & (breached == 1).to_numpy()
+    total_month = int(in_month.sum())
+    sla = [{
+        'total_tickets': total_month,
+        'within_sla': int(within.sum()),
+        'sla_breached': int(breach.sum()),
+        'sla_compliance_rate': round_half_up(within.sum() * 100.0 / total_month) if total_month else None,
+        'avg_tat_within_sla': _round_or_none(tat[within].mean()),
+        'avg_tat_breached': _round_or_none(tat[breach].mean()),
+    }]
+    
+    # Escalation analysis
+    escalation = work[work['escalationLevel'].notna()].groupby(
+        ['escalationLevel', 'escalationStatus'], dropna=False, sort=False
+    ).agg(
+        ticket_count=('resolved', 'size'),
+        avg_resolution_time=('tat', 'mean'),
+        resolved_count=('resolved', 'sum'),
+        unresolved_count=('unresolved', 'sum'),
+    ).reset_index()
+    escalation['avg_resolution_time'] = escalation['avg_resolution_time'].map(round_half_up)
+    escalation['resolution_rate'] = (
+        escalation['resolved_count'] * 100.0 / escalation['ticket_count']
+    ).map(round_half_up)
+    escalation = escalation.sort_values('escalationLevel', kind='mergesort')
+    
+    return {
+        'monthly_trend': frame_to_records(monthly),
+        'issues_breakdown': frame_to_records(issues),
+        'sla_compliance': sla,
+        'escalation_analysis': frame_to_records(escalation),
+    }
+
+# Get client data with a single prod_ticketing scan instead of four
+def get_client_data_consolidated(client_name, cursor=None, pool=None, connection=None):
+    """Consolidated variant of get_client_data; returns (data, per-query timings in seconds, failed query names)"""
+    client_queries, client_params = build_client_queries(client_name)
+    queries = {
+        'client_demographics': client_queries['client_demographics'],
+        'center_avg_pricing': client_queries['center_avg_pricing'],
+        'ticket_slice': build_ticket_slice_query(),
+    }
+    params = {name: client_params.get(name, (client_name,)) for name in queries}
+    
+    # The ticket slice is only aggregated, so it is fetched as NumPy columns
+    if pool is not None:
+        results, timings, failed = run_queries_parallel(pool, queries, params=params, columnar={'ticket_slice'})
+    else:
+        results, timings, failed = run_queries_sequential(
+            queries, params, cursor, connection, columnar={'ticket_slice'}
+        )
+    
+    start = time.perf_counter()
+    ticket_data = derive_ticket_aggregates(results.pop('ticket_slice'))
+    timings['derive_ticket_aggregates'] = time.perf_counter() - start
+    
+    data = {
+        'client_demographics': results['client_demographics'],
+        'center_avg_pricing': results['center_avg_pricing'],
+    }
+    data.update({name: ticket_data[name] for name in TICKET_RESULT_SETS})
+    return data, timings, failed
+
+# Get client data with ticket aggregates read from the precomputed rollup table
+def get_client_data_from_rollup(client_name, connections):
+    """Rollup variant of get_client_data; falls back to the live queries if the rollup is missing or stale"""
+    pool = connections.get('mysql_pool')
+    fallback_mode = get_config_value("ROLLUP_FALLBACK_MODE", "parallel")
+    max_staleness = timedelta(minutes=float(get_config_value("ROLLUP_MAX_STALENESS_MINUTES", 120)))
+    
+    try:
+        with borrow_connection(connections) as conn:
+            cursor = conn.cursor()
+            try:
+                _, refreshed_at, age_seconds = ticket_rollup.get_rollup_state(cursor)
+            finally:
+                cursor.close()
+    except Error as e:
+        print(f"⚠️ Ticket rollup unavailable ({e}), using live queries")
+        return fetch_client_data(client_name, connections, fallback_mode)
+    
+    if refreshed_at is None or timedelta(seconds=age_seconds) > max_staleness:
+        print(f"⚠️ Ticket rollup is stale (last refresh: {refreshed_at}), using live queries")
+        return fetch_client_data(client_name, connections, fallback_mode)
+    
+    client_queries, client_params = build_client_queries(client_name)
+    queries = {
+        'client_demographics': client_queries['client_demographics'],
+        'center_avg_pricing': client_queries['center_avg_pricing'],
+        'ticket_rollup': ticket_rollup.build_client_rollup_query(),
+    }
+    params = {name: client_params.get(name, (client_name,)) for name in queries}
+    
+    if pool:
+        results, timings, failed = run_queries_parallel(pool, queries, params=params, columnar={'ticket_rollup'})
+    else:
+        with borrow_connection(connections) as conn:
+            results, timings, failed = run_queries_sequential(
+                queries, params, connection=conn, columnar={'ticket_rollup'}
+            )
+    
+    ticket_data = ticket_rollup.rollup_to_ticket_data(results.pop('ticket_rollup'))
+    
+    data = {
+        'client_demographics': results['client_demographics'],
+        'center_avg_pricing': results['center_avg_pricing'],
+    }
+    data.update({name: ticket_data[name] for name in TICKET_RESULT_SETS})
+    return data, timings, failed
+
+# Get client data from the Parquet snapshot, with the same result sets as the live queries
+def get_client_data_from_snapshot(client_name):
+    """Snapshot variant of get_client_data_consolidated; returns (data, per-step timings in seconds, [])"""
+    reader = get_snapshot_reader()
+    seat_column, revenue_column = get_period_columns()
+    since = pd.Timestamp.now().normalize() - pd.DateOffset(months=6)
+    
+    timings = {}
+    steps = [
+        ('client_demographics', lambda: reader.client_demographics(client_name, seat_column, revenue_column)),
+        ('center_avg_pricing', lambda: reader.center_avg_pricing(client_name, seat_column, revenue_column)),
+        ('ticket_slice', lambda: reader.ticket_slice(client_name, since, TICKET_SLICE_COLUMNS)),
+    ]
+    results = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        with tracing.span(f"snapshot:{name}", "db"):
+            results[name] = step()
+        timings[name] = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    ticket_data = derive_ticket_aggregates(results.pop('ticket_slice'))
+    timings['derive_ticket_aggregates'] = time.perf_counter() - start
+    
+    data = {
+        'client_demographics': results['client_demographics'],
+        'center_avg_pricing': results['center_avg_pricing'],
+    }
+    data.update({name: ticket_data[name] for name in TICKET_RESULT_SETS})
+    return data, timings, []
+
+# Keep the ticket rollup fresh from a background thread (one per server process)
+@st.cache_resource
+def start_rollup_refresher(_pool):
+    interval = float(get_config_value("ROLLUP_REFRESH_INTERVAL_SECONDS", 900))
+    restate_days = int(get_config_value("ROLLUP_RESTATE_DAYS", 35))
+    
+    def _refresh_loop():
+        schema_ready = False
+        while True:
+            try:
+                conn = checkout_connection(_pool)
+                try:
+                    if not schema_ready:
+                        ticket_rollup.ensure_rollup_schema(conn)
+                        schema_ready = True
+                    ticket_rollup.refresh_rollup(conn, restate_days=restate_days)
+                finally:
+                    conn.close()
+            except Exception as e:
+                print(f"❌ Ticket rollup refresh failed: {e}")
+            time.sleep(interval)
+    
+    thread = threading.Thread(target=_refresh_loop, name="sw_rollup_refresh", daemon=True)
+    thread.start()
+    return thread
+
+# Fetch client data using the configured fetch mode
+def fetch_client_data(client_name, connections, fetch_mode=None):
+    """Returns (data, per-query timings, names of failed queries); timings are empty for the sequential path"""
+    if get_data_source() == "snapshot":
+        return get_client_data_from_snapshot(client_name)
+    
+    fetch_mode = fetch_mode or get_config_value("DB_FETCH_MODE", "parallel")
+    pool = connections.get('mysql_pool')
+    
+    if fetch_mode == "rollup":
+        return get_client_data_from_rollup(client_name, connections)
+    
+    if fetch_mode == "parallel" and pool:
+        return get_client_data_parallel(client_name, pool)
+    
+    if fetch_mode == "consolidated" and pool:
+        return get_client_data_consolidated(client_name, pool=pool)
+    
+    # The sequential paths still check out a pooled connection when there is one, rather than share one
+    with borrow_connection(connections) as conn:
+        if fetch_mode == "consolidated":
+            return get_client_data_consolidated(client_name, connection=conn)
+        queries, params = build_client_queries(client_name)
+        data, _, failed = run_queries_sequential(queries, params, connection=conn)
+    return data, {}, failed
+
+# Ticket source for the portfolio view and a version that changes whenever that data is refreshed
+def get_portfolio_data_version(connections):
+    """Returns (source, version); the rollup is used when fresh, otherwise raw tickets with a TTL"""
+    if get_data_source() == "snapshot":
+        return "snapshot", f"snapshot@{get_snapshot_reader().refreshed_at}"
+    source = get_config_value("PORTFOLIO_TICKET_SOURCE", "auto")
+    if source in ("auto", "rollup") and connections.get('mysql'):
+        max_staleness = timedelta(minutes=float(get_config_value("ROLLUP_MAX_STALENESS_MINUTES", 120)))
+        with borrow_connection(connections) as conn:
+            cursor = conn.cursor()
+            try:
+                _, refreshed_at, age_seconds = ticket_rollup.get_rollup_state(cursor)
+            except Error:
+                refreshed_at = None
+            finally:
+                cursor.close()
+        if refreshed_at is not None and (source == "rollup" or timedelta(seconds=age_seconds) <= max_staleness):
+            return "rollup", f"rollup@{refreshed_at.isoformat()}"
+    ttl = float(get_config_value("PORTFOLIO_CACHE_TTL_SECONDS", 900))
+    return "live", f"live@{int(time.time() // ttl)}"
+
+# Bulk-load the active portfolio and per-client ticket totals, then compute KPIs for every client and centre
+@st.cache_data(show_spinner=False, max_entries=4)
+def load_portfolio_kpis(source, data_version, _connections):
+    """Returns (client KPIs, centre KPIs, info); cached per data_version, i.e. until the next data refresh.
+    
+    Raises RuntimeError when a bulk query fails, so that no partial result is cached.
+    """
+    seat_column, revenue_column = get_period_columns()
+    queries = {
+        'portfolio': portfolio.build_portfolio_query(seat_column, revenue_column),
+        'ticket_totals': portfolio.build_ticket_totals_query(source),
+    }
+    
+    with tracing.trace("portfolio", store=get_trace_store(), source=source, data_version=data_version):
+        with tracing.span("fetch_portfolio_data", "db"):
+            pool = _connections.get('mysql_pool')
+            if source == "snapshot":
+                reader = get_snapshot_reader()
+                results = {
+                    'portfolio': reader.portfolio_columns(seat_column, revenue_column),
+                    'ticket_totals': reader.ticket_totals(),
+                }
+                timings = {}
+            elif pool:
+                results, timings, failed = run_queries_parallel(pool, queries, columnar=set(queries))
+            else:
+                with borrow_connection(_connections) as conn:
+                    results, timings, failed = run_queries_sequential(
+                        queries, {}, connection=conn, columnar=set(queries)
+                    )
+            # Raising keeps st.cache_data from holding empty KPIs for the whole data version
+            if failed:
+                raise RuntimeError(f"Portfolio query failed: {', '.join(failed)}")
+        with tracing.span("portfolio_kpis", "db") as span:
+            start = time.perf_counter()
+            client_kpis, centre_kpis = portfolio.compute_portfolio_kpis(results['portfolio'], results['ticket_totals'])
+            timings['compute_portfolio_kpis'] = time.perf_counter() - start
+            span.set(clients=len(client_kpis), centres=len(centre_kpis))
+    
+    info = {
+        'source': source,
+        'data_version': data_version,
+        'period': seat_column.split('_', 1)[1],
+        'loaded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'timings': {name: round(seconds, 3) for name, seconds in timings.items() if seconds is not None},
+    }
+    return client_kpis, centre_kpis, info
+
+# Normalize a client name for cache keys and lookups
+def normalize_client_name(client_name):
+    return " ".join(client_name.split()).casefold()
+
+class ClientDataCache:
+    """Thread-safe TTL + LRU cache for get_client_data results, bounded by approximate size in bytes"""
+    
+    def __init__(self, ttl_seconds=900, max_bytes=64 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(client_name):
+        seat_column, _ = get_period_columns()
+        return (normalize_client_name(client_name), seat_column)
+    
+    def get(self, client_name):
+        key = self.make_key(client_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry['stored_at'] > self.ttl_seconds:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(entry['data']), dict(entry['timings'])
+    
+    def put(self, client_name, data, timings=None):
+        key = self.make_key(client_name)
+        size = len(json.dumps(data, default=str).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = {
+                'data': copy.deepcopy(data),
+                'timings': dict(timings or {}),
+                'stored_at': time.monotonic(),
+                'size': size
+            }
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+    
+    def invalidate(self, client_name):
+        with self._lock:
+            self._remove(self.make_key(client_name))
+    
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits * 100.0 / lookups, 1) if lookups else 0.0
+            }
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry['size']
+
+# Shared across all sessions of this server process
+@st.cache_resource
+def get_client_data_cache():
+    return ClientDataCache(
+        ttl_seconds=float(get_config_value("CLIENT_CACHE_TTL_SECONDS", 900)),
+        max_bytes=int(float(get_config_value("CLIENT_CACHE_MAX_MB", 64)) * 1024 * 1024)
+    )
+
+# Shared client name index for autocomplete (one per server process)
+@st.cache_resource
+def get_client_name_index():
+    return ClientNameIndex()
+
+# Client names from the portfolio sheet and the ticketing table
+def query_client_names(connections):
+    query = """
+        SELECT DISTINCT Client_Name as name FROM chatbot_portfolio_sheet WHERE Client_Name IS NOT NULL
+        UNION
+        SELECT DISTINCT companyName as name FROM prod_ticketing WHERE companyName IS NOT NULL
+        """
+    with borrow_connection(connections) as conn:
+        cursor = conn.cursor()
+        try:
+            rows = execute_query(cursor, query, "client_name_index", raise_errors=True)
+        finally:
+            cursor.close()
+    return [row['name'] for row in rows]
+
+# Build the index from load_names(); runs with index.refresh_lock held and releases it
+def _reload_client_name_index(index, load_names):
+    start = time.perf_counter()
+    try:
+        names = load_names()
+        if names:
+            index.build(names)
+            print(f"📇 Client name index loaded: {len(index)} names in {time.perf_counter() - start:.2f}s")
+    except Exception as e:
+        print(f"⚠️ Client name index reload failed: {e}")
+    finally:
+        index.refresh_lock.release()
+
+# Reload the name index when empty or older than the TTL, one reload at a time per process
+def refresh_client_name_index(connections, force=False):
+    """Returns the index at once: a stale index keeps serving while a background thread reloads it"""
+    index = get_client_name_index()
+    ttl = float(get_config_value("CLIENT_INDEX_TTL_SECONDS", 3600))
+    retry_after = float(get_config_value("CLIENT_INDEX_RETRY_SECONDS", 60))
+    snapshot_mode = get_data_source() == "snapshot"
+    if not connections.get('mysql') and not snapshot_mode:
+        return index
+    now = time.monotonic()
+    if not force:
+        if len(index) > 0 and now - index.loaded_at < ttl:
+            return index
+        # A reload that failed or found nothing is retried after a pause, not on every rerun
+        failed_at = index.attempted_at if index.attempted_at and index.attempted_at > index.loaded_at else None
+        if failed_at is not None and now - failed_at < retry_after:
+            return index
+    if not index.refresh_lock.acquire(blocking=False):
+        # Another session is already reloading it
+        return index
+    index.attempted_at = now
+    
+    if snapshot_mode:
+        reader = get_snapshot_reader()
+        load_names = lambda: reader.client_names() if reader.available() else []
+    else:
+        load_names = lambda: query_client_names(connections)
+    if len(index) == 0:
+        # Nothing to serve meanwhile: the first load runs here
+        _reload_client_name_index(index, load_names)
+    else:
+        threading.Thread(
+            target=_reload_client_name_index, args=(index, load_names), name="sw_name_index", daemon=True
+        ).start()
+    return index
+
+# Run a callable on a worker thread with the current Streamlit script context attached
+def submit_with_script_ctx(executor, fn, *args, **kwargs):
+    """Submit fn to executor so that st.* calls made inside it still reach the page"""
+    ctx = get_script_run_ctx()
+    # Carry the active trace into the worker so its spans are recorded
+    traced_fn = tracing.propagate(fn)
+    
+    def _task():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return traced_fn(*args, **kwargs)
+    
+    return executor.submit(_task)
+
+# Check out a pooled connection, waiting up to the pool's checkout timeout if it is exhausted
+def checkout_connection(pool, timeout=None):
+    with tracing.span("db_checkout", "db"):
+        return pool.get_connection(timeout=timeout)
+
+# A connection of one's own: pooled when there is a pool, else the shared one, held exclusively until exit
+@contextmanager
+def borrow_connection(connections):
+    pool = connections.get('mysql_pool')
+    if not pool:
+        with statements.connection_lock(connections['mysql']):
+            yield connections['mysql']
+        return
+    conn = checkout_connection(pool)
+    try:
+        yield conn
+    finally:
+        conn.close()
+
+# Execute one query on its own pooled connection and time it
+def execute_pooled_query(pool, query, query_name="", params=None, columnar=False, raise_errors=False):
+    start = time.perf_counter()
+    conn = checkout_connection(pool)
+    try:
+        result = execute_statement(conn, query, query_name, params, columnar, raise_errors)
+    finally:
+        # Closing a pooled connection returns it to the pool
+        conn.close()
+    return result, time.perf_counter() - start
+
+# Run independent queries concurrently over the connection pool
+def run_queries_parallel(pool, queries, max_workers=None, params=None, columnar=()):
+    """Run {name: sql} concurrently with optional {name: params}; returns (results, timings, failed).
+    
+    results and timings are keyed by query name; queries named in columnar return {column: np.ndarray}
+    instead of records. A failed query's result is [] and its name is listed in failed.
+    """
+    params = params or {}
+    if max_workers is None:
+        max_workers = int(get_config_value("DB_PARALLEL_WORKERS", len(queries)))
+    max_workers = max(1, min(max_workers, len(queries)))
+    
+    results, timings, failed = {}, {}, []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sw_query") as executor:
+        futures = {
+            query_name: submit_with_script_ctx(
+                executor, execute_pooled_query, pool, query, query_name, params.get(query_name),
+                query_name in columnar, raise_errors=True
+            )
+            for query_name, query in queries.items()
+        }
+        for query_name, future in futures.items():
+            try:
+                results[query_name], timings[query_name] = future.result()
+            except Exception as e:
+                logger.error("query %s failed: %s", query_name, e, extra={'query': query_name, 'error': str(e)})
+                results[query_name] = []
+                timings[query_name] = None
+                failed.append(query_name)
+    
+    return results, timings, failed
+
+# Get client data with the six queries running concurrently on pooled connections
+def get_client_data_parallel(client_name, pool, max_workers=None):
+    """Parallel variant of get_client_data; returns (data, per-query timings in seconds, failed query names)"""
+    queries, params = build_client_queries(client_name)
+    
+    start = time.perf_counter()
+    data, timings, failed = run_queries_parallel(pool, queries, max_workers, params)
+    total = time.perf_counter() - start
+    
+    timed = {name: t for name, t in timings.items() if t is not None}
+    if timed:
+        slowest = max(timed, key=timed.get)
+        logger.info("parallel fetch %.2fs, slowest %s %.2fs, sum of queries %.2fs",
+                    total, slowest, timed[slowest], sum(timed.values()),
+                    extra={'query': 'client_data_parallel', 'duration_ms': round(total * 1000, 2)})
+    
+    # Keep the same key order as the sequential path
+    return {name: data[name] for name in queries}, timings, failed
+
+# Format one value for the compact prompt encoding
+def _compact_value(value, float_digits):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    if isinstance(value, (float, Decimal, np.floating)):
+        rounded = round(float(value), float_digits)
+        return str(int(rounded)) if rounded.is_integer() else str(rounded)
+    return " ".join(str(value).split()).replace("|", "/")
+
+def _is_empty_value(value):
+    if value is None:
+        return True
+    if isinstance(value, (int, float, Decimal, np.number)) and not isinstance(value, bool):
+        return float(value) == 0 or np.isnan(float(value))
+    return str(value).strip() == ""
+
+# Token-efficient encoding: one pipe-separated table per result set
+def encode_data_compact(data, drop_empty_columns=True, float_digits=2):
+    sections = []
+    for name, rows in data.items():
+        rows = rows or []
+        columns = list(rows[0].keys()) if rows else []
+        if drop_empty_columns and len(rows) > 1:
+            columns = [col for col in columns if not all(_is_empty_value(row.get(col)) for row in rows)]
+        
+        lines = [f"### {name} ({len(rows)} rows)"]
+        if not rows:
+            lines.append("(no data)")
+        else:
+            lines.append("|".join(columns))
+            lines.extend("|".join(_compact_value(row.get(col), float_digits) for col in columns) for row in rows)
+        sections.append("\n".join(lines))
+    
+    header = "Data tables below are pipe-separated with a header row; empty cells are null"
+    if drop_empty_columns:
+        header += "; columns that are null or zero in every row are omitted"
+    return header + ".\n\n" + "\n\n".join(sections)
+
+# Render client data for a prompt in the configured format (compact or json)
+def format_data_for_prompt(data, drop_empty_columns=True):
+    if get_config_value("PROMPT_DATA_FORMAT", "compact") == "json":
+        return json.dumps(data, indent=2, default=str)
+    float_digits = int(get_config_value("PROMPT_FLOAT_DIGITS", 2))
+    return encode_data_compact(data, drop_empty_columns=drop_empty_columns, float_digits=float_digits)
+
+# Count prompt tokens with the API when configured, otherwise estimate (~4 characters per token)
+def count_prompt_tokens(ai_client, text):
+    if ai_client is not None and get_config_value("PROMPT_TOKEN_COUNT", "estimate") == "api":
+        try:
+            return ai_client.messages.count_tokens(
+                model=CLAUDE_MODEL,
+                messages=[{"role": "user", "content": text}]
+            ).input_tokens
+        except Exception as e:
+            print(f"Warning: token count failed, using estimate: {e}")
+    return max(1, len(text) // 4)
+
+# Compare prompt size of the indented JSON payload against the configured encoding
+def measure_prompt_encoding(ai_client, data):
+    json_tokens = count_prompt_tokens(ai_client, json.dumps(data, indent=2, default=str))
+    encoded_tokens = count_prompt_tokens(ai_client, format_data_for_prompt(data))
+    saving = (1 - encoded_tokens / json_tokens) * 100 if json_tokens else 0.0
+    print(f"🧮 Prompt data tokens: json {json_tokens} -> "
+          f"{get_config_value('PROMPT_DATA_FORMAT', 'compact')} {encoded_tokens} ({saving:.0f}% smaller)")
+    return {'json_tokens': json_tokens, 'encoded_tokens': encoded_tokens}
+
+CLAUDE_MODEL = "claude-3-5-sonnet-20241022"
+
+# Shared on-disk cache for Claude responses
+@st.cache_resource
+def get_response_cache():
+    cache_dir = get_config_value("LLM_CACHE_DIR", os.path.join(tempfile.gettempdir(), "smartworks_llm_cache"))
+    max_bytes = int(float(get_config_value("LLM_CACHE_MAX_MB", 256)) * 1024 * 1024)
+    return ResponseCache(cache_dir, max_bytes=max_bytes)
+
+def llm_cache_enabled():
+    return str(get_config_value("LLM_CACHE_ENABLED", "true")).lower() == "true"
+
+# Stream a Claude response into a Streamlit container, re-rendering at most every interval/chunk
+def stream_claude(ai_client, prompt, max_tokens, temperature, container):
+    min_interval = float(get_config_value("AI_STREAM_RENDER_INTERVAL", 0.25))
+    min_chars = int(get_config_value("AI_STREAM_RENDER_CHARS", 400))
+    
+    text = ""
+    rendered_len = 0
+    started = last_render = time.monotonic()
+    with ai_client.messages.stream(
+        model=CLAUDE_MODEL,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        messages=[{"role": "user", "content": prompt}]
+    ) as stream:
+        for chunk in stream.text_stream:
+            if not text:
+                tracing.annotate(first_token_ms=round((time.monotonic() - started) * 1000, 2))
+            text += chunk
+            now = time.monotonic()
+            if now - last_render >= min_interval or len(text) - rendered_len >= min_chars:
+                container.markdown(text + " ▌")
+                rendered_len = len(text)
+                last_render = now
+        usage = stream.get_final_message().usage
+        tracing.annotate(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+    
+    container.markdown(text)
+    return text
+
+# Call Claude, serving byte-identical requests from the response cache
+def call_claude(ai_client, prompt, max_tokens, temperature, use_cache=True, stream_to=None):
+    """Returns the response text; pass a Streamlit container as stream_to to render tokens as they arrive.
+    
+    use_cache=False (regenerate) skips the cached response but still stores the new one, so the next run
+    does not bring back the response that was just rejected.
+    """
+    cache = get_response_cache() if llm_cache_enabled() else None
+    cache_key = ResponseCache.make_key(CLAUDE_MODEL, temperature, prompt, max_tokens)
+    
+    with tracing.span("anthropic", "llm", model=CLAUDE_MODEL, max_tokens=max_tokens,
+                      streamed=stream_to is not None) as span:
+        if cache is not None and use_cache:
+            cached = cache.get(cache_key)
+            if cached is not None:
+                print(f"⚡ AI response cache hit ({cache_key[:12]})")
+                span.set(cache_hit=True)
+                if stream_to is not None:
+                    stream_to.markdown(cached)
+                return cached
+        
+        if stream_to is not None:
+            text = stream_claude(ai_client, prompt, max_tokens, temperature, stream_to)
+        else:
+            response = ai_client.messages.create(
+                model=CLAUDE_MODEL,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            text = response.content[0].text
+            span.set(input_tokens=response.usage.input_tokens, output_tokens=response.usage.output_tokens)
+        span.set(cache_hit=False)
+    
+    if cache is not None:
+        cache.put(cache_key, text)
+    return text
+
+# Render the narrative report prompt for client data
+def build_report_prompt(data):
+    return load_smartworks_prompt().replace("{data}", format_data_for_prompt(data))
+
+# Render the chart-code prompt for client data
+def build_chart_prompt(data):
+    # Generated code indexes client_data by column name, so keep every column visible
+    return load_graph_prompt().replace("{data}", format_data_for_prompt(data, drop_empty_columns=False))
+
+# Strip markdown fences from generated chart code
+def clean_chart_code(chart_code):
+    if "```python" in chart_code:
+        chart_code = chart_code.split("```python")[1].split("```")[0]
+    elif "```" in chart_code:
+        chart_code = chart_code.split("```")[1].split("```")[0]
+    return chart_code.strip()
+
 # Generate AI report 
-def generate_smartworks_report(ai_client, data):
+def generate_smartworks_report(ai_client, data, use_cache=True, stream_to=None):
     try:
-        prompt = load_smartworks_prompt()
-        formatted_prompt = prompt.replace("{data}", json.dumps(data, indent=2, default=str))
-        
-        response = ai_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=6000,
-            temperature=0.2,
-            messages=[{"role": "user", "content": formatted_prompt}]
-        )
+        formatted_prompt = build_report_prompt(data)
         
-        return response.content[0].text
+        return call_claude(
+            ai_client, formatted_prompt, max_tokens=6000, temperature=0.2,
+            use_cache=use_cache, stream_to=stream_to
+        )
     except Exception as e:
         st.error(f"Error generating report: {e}")
         return None
 
 # Generate chart code
-def generate_chart_code_with_ai(ai_client, data):
+def generate_chart_code_with_ai(ai_client, data, use_cache=True):
     try:
-        chart_prompt = load_graph_prompt()
-        formatted_prompt = chart_prompt.replace("{data}", json.dumps(data, indent=2, default=str))
-        
-        response = ai_client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=4000,
-            temperature=0.1,
-            messages=[{"role": "user", "content": formatted_prompt}]
-        )
+        formatted_prompt = build_chart_prompt(data)
         
-        chart_code = response.content[0].text
+        chart_code = call_claude(ai_client, formatted_prompt, max_tokens=4000, temperature=0.1, use_cache=use_cache)
         
-        # Clean up code
-        if "```python" in chart_code:
-            chart_code = chart_code.split("```python")[1].split("```")[0]
-        elif "```" in chart_code:
-            chart_code = chart_code.split("```")[1].split("```")[0]
-        
-        return chart_code.strip()
+        return clean_chart_code(chart_code)
     except Exception as e:
         st.error(f"Error generating chart code: {e}")
         return None
 
+# Generate the narrative report and chart code, concurrently unless disabled
+def generate_ai_outputs(ai_client, data, use_cache=True, parallel=None, report_container=None,
+                        include_chart_code=True):
+    """Returns (ai_report, chart_code); either may be None if its request failed.
+    
+    With report_container, the narrative is streamed into it on the calling thread
+    while the chart code is generated in the background.
+    """
+    if parallel is None:
+        parallel = str(get_config_value("AI_PARALLEL_CALLS", "true")).lower() == "true"
+    
+    if not include_chart_code:
+        return generate_smartworks_report(ai_client, data, use_cache=use_cache, stream_to=report_container), None
+    
+    if not parallel:
+        ai_report = generate_smartworks_report(ai_client, data, use_cache=use_cache, stream_to=report_container)
+        chart_code = generate_chart_code_with_ai(ai_client, data, use_cache=use_cache) if ai_report else None
+        return ai_report, chart_code
+    
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="sw_ai") as executor:
+        chart_future = submit_with_script_ctx(executor, generate_chart_code_with_ai, ai_client, data, use_cache)
+        
+        # Both generators report their own errors and return None on failure
+        if report_container is not None:
+            # Streaming renders to the page, so it stays on the script thread
+            ai_report = generate_smartworks_report(ai_client, data, use_cache=use_cache, stream_to=report_container)
+        else:
+            report_future = submit_with_script_ctx(executor, generate_smartworks_report, ai_client, data, use_cache)
+            ai_report = report_future.result()
+        chart_code = chart_future.result()
+    
+    return ai_report, chart_code
+
 # Execute chart code
 def execute_chart_code(chart_code, client_data):
     charts = {}
     
     try:
+        import plotly.express as px
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        
         exec_globals = {
             'pd': pd,
             'px': px,
@@ -698,17 +1735,17 @@ def execute_chart_code(chart_code, client_data):
         return {}
 
 # Save data function - updated for Streamlit Cloud
-def save_client_data(client_name, data):
+def save_client_data(client_name, data, data_dir=None, generated_by=None):
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{client_name.replace(' ', '_').replace(',', '')}_{timestamp}.json"
-        filepath = os.path.join(DATA_DIR, filename)
+        filepath = os.path.join(data_dir or DATA_DIR, filename)
         
         data_with_meta = {
             "client_name": client_name,
             "timestamp": timestamp,
             "generated_at": datetime.now().isoformat(),
-            "generated_by": st.session_state.get('username', 'unknown'),
+            "generated_by": generated_by or st.session_state.get('username', 'unknown'),
             "data": data
         }
         
@@ -719,6 +1756,539 @@ def save_client_data(client_name, data):
         print(f"Warning: Could not save data: {e}")
         return None
 
+# Retry Claude calls on rate limits and transient errors, sharing the cool-down across workers
+class RateLimitBackoff:
+    RETRYABLE_STATUS = {429, 500, 502, 503, 529}
+    
+    def __init__(self, max_attempts=6, base_delay=2.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _retry_delay(self, error, attempt):
+        response = getattr(error, 'response', None)
+        retry_after = response.headers.get('retry-after') if response is not None else None
+        try:
+            return min(self.max_delay, float(retry_after))
+        except (TypeError, ValueError):
+            delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+            return delay / 2 + random.uniform(0, delay / 2)
+    
+    def call(self, fn, *args, **kwargs):
+        import anthropic
+        
+        for attempt in range(1, self.max_attempts + 1):
+            with self._lock:
+                wait = self._resume_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return fn(*args, **kwargs)
+            except (anthropic.APIStatusError, anthropic.APIConnectionError) as e:
+                status = getattr(e, 'status_code', None)
+                if status is not None and status not in self.RETRYABLE_STATUS or attempt == self.max_attempts:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                print(f"⏳ Claude request throttled ({status or 'connection error'}), retrying in {delay:.1f}s")
+                if status == 429:
+                    # Pause every worker, not just the one that was throttled
+                    with self._lock:
+                        self._resume_at = max(self._resume_at, time.monotonic() + delay)
+                time.sleep(delay)
+
+# Build set-based queries that fetch report data for many clients at once
+def build_batch_queries(client_names):
+    seat_column, revenue_column = get_period_columns()
+    month_start, next_month_start = get_month_range()
+    placeholders = ", ".join(["%s"] * len(client_names))
+    
+    queries = {
+        "client_demographics": f"""
+        SELECT 
+            Centre as centre_name,
+            Client_Name as client_name,
+            Client_Id as client_id,
+            Client_Move_in as move_in_date,
+            Client_Move_out as move_out_date,
+            Stage_Strategy as client_type,
+            Status,
+            Floor as floor_info,
+            COALESCE({seat_column}, 0) as current_month_seats,
+            COALESCE({revenue_column}, 0) as current_month_revenue,
+            CASE 
+                WHEN COALESCE({seat_column}, 0) > 0 AND COALESCE({revenue_column}, 0) > 0 THEN 
+                    ROUND(COALESCE({revenue_column}, 0) / COALESCE({seat_column}, 1), 2)
+                ELSE 0 
+            END as current_month_price_per_seat,
+            Escalation,
+            Escalation_Frequency,
+            First_Escalation_Date,
+            CASE 
+                WHEN Client_Move_out < CURDATE() THEN 
+                    DATEDIFF(CURDATE(), Client_Move_out)
+                ELSE 0 
+            END as days_since_moveout
+        FROM chatbot_portfolio_sheet
+        WHERE Status IN ('Active', 'Inactive') AND Client_Name IN ({placeholders})
+        """,
+        
+        "center_avg_pricing": f"""
+        SELECT 
+            p.Centre,
+            COUNT(*) as total_clients_in_center,
+            SUM(COALESCE({seat_column}, 0)) as total_center_seats,
+            SUM(COALESCE({revenue_column}, 0)) as total_center_revenue,
+            ROUND(AVG(
+                CASE 
+                    WHEN COALESCE({seat_column}, 0) > 0 AND COALESCE({revenue_column}, 0) > 0 THEN 
+                        COALESCE({revenue_column}, 0) / COALESCE({seat_column}, 1)
+                    ELSE NULL 
+                END
+            ), 2) as center_avg_price_per_seat
+        FROM chatbot_portfolio_sheet p
+        WHERE p.Status = 'Active'
+            AND COALESCE({seat_column}, 0) > 0
+            AND COALESCE({revenue_column}, 0) > 0
+            AND p.Centre IN (
+                SELECT Centre 
+                FROM chatbot_portfolio_sheet 
+                WHERE Client_Name IN ({placeholders})
+            )
+        GROUP BY p.Centre
+        """,
+        
+        "monthly_trend": f"""
+        SELECT 
+            companyName,
+            DATE_FORMAT(createdAt, '%Y-%m') as month,
+            COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as resolved_tickets,
+            COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as unresolved_tickets,
+            COUNT(*) as total_tickets,
+            ROUND(AVG(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat
+        FROM prod_ticketing 
+        WHERE companyName IN ({placeholders})
+            AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
+        GROUP BY companyName, DATE_FORMAT(createdAt, '%Y-%m')
+        ORDER BY companyName, month
+        """,
+        
+        "issues_breakdown": f"""
+        SELECT 
+            companyName,
+            category,
+            subCategory,
+            COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as resolved_count,
+            COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as unresolved_count,
+            COUNT(*) as total_tickets,
+            ROUND(AVG(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat,
+            ROUND((COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) * 100.0 / COUNT(*)), 2) as resolution_rate
+        FROM prod_ticketing 
+        WHERE companyName IN ({placeholders})
+            AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
+            AND category IS NOT NULL
+            AND category != 'AC'
+        GROUP BY companyName, category, subCategory
+        ORDER BY companyName, total_tickets DESC
+        """,
+        
+        "sla_compliance": f"""
+        SELECT 
+            companyName,
+            COUNT(*) as total_tickets,
+            COUNT(CASE WHEN isDueDateBreached = 0 THEN 1 END) as within_sla,
+            COUNT(CASE WHEN isDueDateBreached = 1 THEN 1 END) as sla_breached,
+            ROUND((COUNT(CASE WHEN isDueDateBreached = 0 THEN 1 END) * 100.0 / COUNT(*)), 2) as sla_compliance_rate,
+            ROUND(AVG(CASE WHEN isDueDateBreached = 0 AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat_within_sla,
+            ROUND(AVG(CASE WHEN isDueDateBreached = 1 AND TAT IS NOT NULL THEN TAT END), 2) as avg_tat_breached
+        FROM prod_ticketing 
+        WHERE companyName IN ({placeholders})
+            AND createdAt >= %s
+            AND createdAt < %s
+        GROUP BY companyName
+        """,
+        
+        "escalation_analysis": f"""
+        SELECT 
+            companyName,
+            escalationLevel,
+            escalationStatus,
+            COUNT(*) as ticket_count,
+            ROUND(AVG(TAT), 2) as avg_resolution_time,
+            COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as resolved_count,
+            COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as unresolved_count,
+            ROUND((COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) * 100.0 / COUNT(*)), 2) as resolution_rate
+        FROM prod_ticketing 
+        WHERE companyName IN ({placeholders})
+            AND createdAt >= DATE_SUB(CURDATE(), INTERVAL 6 MONTH)
+            AND escalationLevel IS NOT NULL
+        GROUP BY companyName, escalationLevel, escalationStatus
+        ORDER BY companyName, escalationLevel
+        """
+    }
+    
+    params = {name: tuple(client_names) for name in queries}
+    params['sla_compliance'] = tuple(client_names) + (month_start, next_month_start)
+    return queries, params
+
+# Fetch report data for many clients with one query per result set
+def get_batch_client_data(client_names, cursor, chunk_size=500):
+    """Returns {client_name: data} with the same per-client shape as get_client_data"""
+    empty_sla = [{
+        'total_tickets': 0, 'within_sla': 0, 'sla_breached': 0, 'sla_compliance_rate': None,
+        'avg_tat_within_sla': None, 'avg_tat_breached': None
+    }]
+    batch_data = {
+        name: {
+            'client_demographics': [], 'center_avg_pricing': [], 'monthly_trend': [],
+            'issues_breakdown': [], 'sla_compliance': copy.deepcopy(empty_sla), 'escalation_analysis': []
+        }
+        for name in client_names
+    }
+    by_key = {normalize_client_name(name): name for name in client_names}
+    
+    for offset in range(0, len(client_names), chunk_size):
+        chunk = client_names[offset:offset + chunk_size]
+        queries, params = build_batch_queries(chunk)
+        results = {
+            query_name: execute_query(cursor, query, f"batch_{query_name}", params[query_name])
+            for query_name, query in queries.items()
+        }
+        
+        centres = {}
+        for row in results['client_demographics']:
+            client = by_key.get(normalize_client_name(str(row['client_name'])))
+            if client:
+                batch_data[client]['client_demographics'].append(row)
+                centres.setdefault(client, row['centre_name'])
+        
+        pricing_by_centre = {row['Centre']: row for row in results['center_avg_pricing']}
+        for client, centre in centres.items():
+            if centre in pricing_by_centre:
+                batch_data[client]['center_avg_pricing'] = [pricing_by_centre[centre]]
+        
+        for query_name in TICKET_RESULT_SETS:
+            grouped = {}
+            for row in results[query_name]:
+                client = by_key.get(normalize_client_name(str(row.pop('companyName'))))
+                if client:
+                    grouped.setdefault(client, []).append(row)
+            for client, rows in grouped.items():
+                batch_data[client][query_name] = rows
+    
+    return batch_data
+
+# Resolve the batch client list from explicit names or a Centre in chatbot_portfolio_sheet
+def resolve_batch_clients(cursor, client_names=None, centre=None):
+    names = [name.strip() for name in (client_names or []) if name and name.strip()]
+    if centre:
+        rows = execute_query(
+            cursor,
+            """
+            SELECT DISTINCT Client_Name as client_name
+            FROM chatbot_portfolio_sheet
+            WHERE Centre = %s AND Status = 'Active'
+            ORDER BY Client_Name
+            """,
+            "batch_centre_clients",
+            (centre,)
+        )
+        names.extend(row['client_name'] for row in rows)
+    
+    # De-duplicate while keeping order
+    seen, unique = set(), []
+    for name in names:
+        key = normalize_client_name(name)
+        if key not in seen:
+            seen.add(key)
+            unique.append(name)
+    return unique
+
+def safe_filename(name):
+    return "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name).strip("_") or "client"
+
+# Generate and write one client's report outside the Streamlit UI
+def generate_batch_report(client_name, data, ai_client, output_dir, backoff, chart_mode="builtin",
+                          generated_by="batch", trace_store=None):
+    start = time.perf_counter()
+    base = os.path.join(output_dir, safe_filename(client_name))
+    
+    if not data['client_demographics'] and not data['monthly_trend']:
+        return {'client_name': client_name, 'status': 'not_found', 'seconds': 0.0, 'files': []}
+    
+    with tracing.trace("batch_report", store=trace_store, client_name=client_name):
+        ai_report = backoff.call(call_claude, ai_client, build_report_prompt(data), 6000, 0.2)
+        
+        with tracing.span("charts", "charts", mode=chart_mode):
+            if chart_mode == "ai":
+                chart_code = clean_chart_code(backoff.call(call_claude, ai_client, build_chart_prompt(data), 4000, 0.1))
+                charts = execute_chart_code(chart_code, data)
+            else:
+                from charts import build_standard_charts
+                charts = build_standard_charts(data)
+        
+        chart_pngs = export_chart_images(charts)
+        with tracing.span("markdown_build", "export"):
+            markdown_content = create_markdown_with_charts(ai_report, charts, client_name, chart_pngs, generated_by)
+        pdf_content = None
+        if charts:
+            with tracing.span("pdf_build", "export"):
+                pdf_content = create_pdf_report(ai_report, charts, client_name, chart_pngs, generated_by)
+    
+    files = []
+    with open(f"{base}.json", 'w', encoding='utf-8') as f:
+        json.dump({'client_name': client_name, 'data': data}, f, indent=2, default=str, ensure_ascii=False)
+    files.append(f"{base}.json")
+    with open(f"{base}.md", 'w', encoding='utf-8') as f:
+        f.write(markdown_content)
+    files.append(f"{base}.md")
+    if pdf_content:
+        with open(f"{base}.pdf", 'wb') as f:
+            f.write(pdf_content)
+        files.append(f"{base}.pdf")
+    
+    return {'client_name': client_name, 'status': 'ok', 'seconds': round(time.perf_counter() - start, 2), 'files': files}
+
+# Generate reports for many clients: set-based data fetch, then a bounded worker pool for the AI calls
+def run_batch_reports(client_names, connections, output_dir, max_workers=None, chart_mode=None,
+                      generated_by="batch", on_progress=None):
+    """Writes Markdown/PDF/JSON per client plus batch_summary.json; returns the per-client summaries"""
+    max_workers = max_workers or int(get_config_value("BATCH_WORKERS", 4))
+    chart_mode = chart_mode or get_config_value("CHART_MODE", "builtin")
+    os.makedirs(output_dir, exist_ok=True)
+    trace_store = tracing.TraceStore(max_traces=len(client_names) + 1, path=os.path.join(output_dir, "traces.jsonl"))
+    
+    with borrow_connection(connections) as conn:
+        cursor = conn.cursor()
+        try:
+            with tracing.trace("batch_fetch", store=trace_store, clients=len(client_names)):
+                batch_data = get_batch_client_data(client_names, cursor)
+        finally:
+            cursor.close()
+    
+    backoff = RateLimitBackoff(
+        max_attempts=int(get_config_value("BATCH_MAX_ATTEMPTS", 6)),
+        max_delay=float(get_config_value("BATCH_MAX_BACKOFF_SECONDS", 60))
+    )
+    summaries = []
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sw_batch") as executor:
+        futures = {
+            executor.submit(
+                generate_batch_report, name, batch_data[name], connections['anthropic'],
+                output_dir, backoff, chart_mode, generated_by, trace_store
+            ): name
+            for name in client_names
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                print(f"❌ Batch report failed for {name}: {e}")
+                summary = {'client_name': name, 'status': 'error', 'error': str(e), 'seconds': None, 'files': []}
+            summaries.append(summary)
+            if on_progress:
+                on_progress(len(summaries), len(client_names), summary)
+    
+    with open(os.path.join(output_dir, "batch_summary.json"), 'w', encoding='utf-8') as f:
+        json.dump({'generated_at': datetime.now().isoformat(), 'reports': summaries}, f, indent=2)
+    return summaries
+
+# Report pipeline for one client, run by the job queue on a worker thread (no st.* calls here)
+def run_report_pipeline(progress, client_name, connections, data_dir, generated_by, data_cache, report_store,
+                        trace_store, refresh_data=False, regenerate_ai=False):
+    """Returns the report metadata kept in session state; raises jobs.JobError for expected failures"""
+    with tracing.trace("report", store=trace_store, client_name=client_name, user=generated_by) as trace:
+        progress.step(1, 4, "Analyzing client data...")
+        cached = None if refresh_data else data_cache.get(client_name)
+        trace.attributes['data_cache_hit'] = bool(cached)
+        failed_queries = []
+        if cached:
+            data, query_timings = cached
+            print(f"⚡ Client data cache hit for {client_name}")
+        else:
+            with tracing.span("fetch_client_data", "db") as span:
+                data, query_timings, failed_queries = fetch_client_data(client_name, connections)
+                span.set(failed_queries=len(failed_queries))
+        
+        has_demographics = data.get('client_demographics') and len(data['client_demographics']) > 0
+        has_tickets = data.get('monthly_trend') and len(data['monthly_trend']) > 0
+        if not has_demographics and not has_tickets:
+            if failed_queries:
+                raise jobs.JobError(
+                    f"The database could not be read for '{client_name}' ({', '.join(failed_queries)} failed). "
+                    "Please try again in a few minutes or contact IT support."
+                )
+            raise jobs.JobError(f"Client '{client_name}' not found. Please check the spelling and try again.")
+        data_warnings = []
+        if not has_demographics:
+            data_warnings.append("Limited data available - Client found in ticketing system only")
+        elif not has_tickets:
+            data_warnings.append("Limited analytics - No recent tickets found for this client")
+        if failed_queries:
+            data_warnings.append(
+                f"Some data could not be loaded ({', '.join(failed_queries)}); the report may be missing sections"
+            )
+        
+        # A partial result would be served to every session until it expires, so only complete ones are cached
+        if not cached and not failed_queries:
+            data_cache.put(client_name, data, query_timings)
+        
+        if not connections['anthropic']:
+            raise jobs.JobError("AI service unavailable. Please contact IT support to enable AI analysis.")
+        
+        progress.step(2, 4, "Generating AI insights...")
+        with tracing.span("prompt_encoding", "llm"):
+            prompt_tokens = measure_prompt_encoding(connections['anthropic'], data)
+        stream_report = str(get_config_value("AI_STREAM_REPORT", "true")).lower() == "true"
+        chart_mode = get_config_value("CHART_MODE", "builtin")
+        # The progress handle stands in for the page container: streamed text is polled by the UI
+        ai_report, chart_code = generate_ai_outputs(
+            connections['anthropic'], data, use_cache=not regenerate_ai,
+            report_container=progress if stream_report else None,
+            include_chart_code=(chart_mode == "ai")
+        )
+        if not ai_report:
+            raise jobs.JobError("Report generation failed. Please try again or contact support.")
+        
+        progress.step(3, 4, "Creating visualizations...")
+        charts = {}
+        with tracing.span("charts", "charts", mode=chart_mode) as span:
+            if chart_mode == "ai":
+                if chart_code:
+                    charts = execute_chart_code(chart_code, data)
+            else:
+                from charts import build_standard_charts
+                charts = build_standard_charts(data)
+            span.set(charts=len(charts))
+        
+        progress.step(4, 4, "Finalizing report...")
+        save_client_data(client_name, data, data_dir=data_dir, generated_by=generated_by)
+        report_id = new_report_id()
+        with tracing.span("save_report", "storage"):
+            report_store.save(report_id, generated_by, data_dir, {'ai_report': ai_report, 'charts': charts})
+        trace.attributes['report_id'] = report_id
+    
+    report_data = {
+        'report_id': report_id,
+        'client_name': client_name,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M'),
+        'generated_by': generated_by,
+        'data_dir': data_dir,
+        'has_pdf': bool(charts),
+        'query_timings': query_timings,
+        # Timings of a cache hit are those of the run that filled the cache
+        'query_timings_cached': bool(cached),
+        'prompt_tokens': prompt_tokens,
+        'trace_id': trace.trace_id,
+        'duration_seconds': round(trace.duration, 2),
+        'warnings': data_warnings
+    }
+    
+    # Build the downloads now, while nobody is waiting on them; they are persisted next to the report
+    if str(get_config_value("REPORT_JOB_PREBUILD_EXPORTS", "true")).lower() == "true":
+        report_export(report_data, 'markdown_content')()
+        if report_data['has_pdf']:
+            report_export(report_data, 'pdf_content')()
+    return report_data
+
+# Queue a report for client_name on the shared worker pool; returns the job id
+def submit_report_job(client_name, connections, refresh_data=False, regenerate_ai=False, index_miss=False):
+    generated_by = st.session_state.get('username', 'Unknown')
+    # Resolve session and cached resources here, on the script thread
+    data_dir = DATA_DIR
+    data_cache = get_client_data_cache()
+    report_store = get_report_store()
+    trace_store = get_trace_store()
+    
+    def _job(progress):
+        return run_report_pipeline(
+            progress, client_name, connections, data_dir, generated_by, data_cache, report_store, trace_store,
+            refresh_data=refresh_data, regenerate_ai=regenerate_ai
+        )
+    
+    return get_report_jobs().submit(
+        _job, generated_by, client_name, owner=st.session_state.job_owner, client_name=client_name,
+        index_miss=index_miss
+    )
+
+# Add a finished report to the session, keeping only the last 10
+def remember_report(report_data):
+    st.session_state.generated_reports.insert(0, report_data)
+    st.session_state.current_report = report_data
+    if len(st.session_state.generated_reports) > 10:
+        for report in st.session_state.generated_reports[10:]:
+            get_report_store().delete(report['report_id'])
+        st.session_state.generated_reports = st.session_state.generated_reports[:10]
+
+# Move finished jobs into the session: its own, plus jobs of the same login whose session went away
+def collect_report_jobs():
+    queue = get_report_jobs()
+    store = get_report_store()
+    owner = st.session_state.job_owner
+    queue.heartbeat(owner)
+    pickup_after = datetime.now() - timedelta(hours=float(get_config_value("REPORT_JOB_PICKUP_HOURS", 24)))
+    orphan_after = float(get_config_value("REPORT_JOB_ORPHAN_SECONDS", 60))
+    
+    # Oldest first, so the newest report ends up as the current one
+    for job in reversed(queue.list(user=st.session_state.get('username'), statuses=jobs.FINISHED, collected=False)):
+        if job.get('owner') != owner and datetime.fromisoformat(job['finished_at']) < pickup_after:
+            continue
+        if not queue.claim(job['job_id'], owner, orphan_after=orphan_after):
+            continue
+        
+        if job['status'] == jobs.FAILED:
+            st.error(f"❌ **Report for {job['label']} failed**\n\n{job['error']}")
+        elif job['status'] == jobs.DONE:
+            report_data = job['result']
+            if not store.has(report_data['report_id']) and not store.register(
+                    report_data['report_id'], report_data['generated_by'], report_data['data_dir']):
+                st.warning(f"⚠️ The report for {job['label']} is no longer available. Please generate it again.")
+                continue
+            remember_report(report_data)
+            # The database knew a client the name index did not: it is out of date
+            if job['metadata'].get('index_miss') and not get_client_name_index().exact(job['label']):
+                refresh_client_name_index(init_connections(), force=True)
+            for warning in report_data.get('warnings', []):
+                st.warning(f"⚠️ **{job['label']}:** {warning}")
+            st.toast(f"✅ Report ready: {job['label']}")
+    
+    # Drop collected jobs, and jobs pruned from the queue that can never finish for this session
+    st.session_state.report_jobs = [
+        job_id for job_id in st.session_state.report_jobs
+        if (queue.get(job_id) or {}).get('collected') is False
+    ]
+
+def has_active_report_jobs():
+    queue = get_report_jobs()
+    return any(
+        (queue.get(job_id) or {}).get('status') in jobs.ACTIVE for job_id in st.session_state.report_jobs
+    )
+
+# Progress of this session's report jobs; reruns on a timer until they finish, then reruns the app to show them
+@st.fragment(run_every=float(get_config_value("REPORT_JOB_POLL_SECONDS", 1.0)))
+def display_report_jobs():
+    queue = get_report_jobs()
+    queue.heartbeat(st.session_state.job_owner)
+    report_jobs = [job for job in map(queue.get, st.session_state.report_jobs) if job]
+    if any(job['status'] in jobs.FINISHED for job in report_jobs):
+        st.rerun()
+    
+    st.markdown("### 🚀 Generating Client Analysis")
+    for job in report_jobs:
+        with st.container(border=True):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"**{job['label']}** - {job['message']}")
+                st.progress(job['step'] / job['total_steps'] if job['total_steps'] else 0.0)
+            with col2:
+                if job['status'] == jobs.QUEUED and st.button("✖️ Cancel", key=f"cancel_job_{job['job_id']}"):
+                    queue.cancel(job['job_id'])
+                    st.rerun()
+            if job['partial_text']:
+                st.markdown(job['partial_text'] + " ▌")
+
 # Display previous reports section
 def display_previous_reports():
     """Display previously generated reports in sidebar"""
@@ -736,12 +2306,12 @@ def display_previous_reports():
                     st.session_state.current_report = report
                     st.rerun()
                 
-                # Download buttons for each report
+                # Download buttons for each report (exports are built or read from the store on click)
                 col1, col2 = st.columns(2)
                 with col1:
                     st.download_button(
                         label="📄 MD",
-                        data=report['markdown_content'],
+                        data=report_export(report, 'markdown_content'),
                         file_name=f"{report['client_name']}_Report.md",
                         mime="text/markdown",
                         key=f"md_download_{i}",
@@ -749,66 +2319,289 @@ def display_previous_reports():
                     )
                 
                 with col2:
-                    if report['pdf_content']:
+                    if report['has_pdf']:
                         st.download_button(
                             label="📕 PDF",
-                            data=report['pdf_content'],
+                            data=report_export(report, 'pdf_content'),
                             file_name=f"{report['client_name']}_Report.pdf",
                             mime="application/pdf",
                             key=f"pdf_download_{i}",
                             use_container_width=True
                         )
 
-# Simulate streaming text effect for better user experience
-def stream_text(text, container):
-    """Simulate streaming text like ChatGPT"""
-    words = text.split()
-    displayed_text = ""
-    
-    for i, word in enumerate(words):
-        displayed_text += word + " "
-        container.markdown(displayed_text)
-        
-        # Add small delay for streaming effect (only for first few words)
-        if i < 20:  # Stream first 20 words slower
-            import time
-            time.sleep(0.05)
-    
-    return displayed_text
-
-# Show elegant loading messages with spinner
-def show_loading_steps(step_num, total_steps, message):
-    """Show elegant loading progress with messages and spinner"""
-    progress = step_num / total_steps
-    
-    loading_messages = {
-        1: "🔍 **Analyzing client data...**\n\n*Gathering comprehensive insights from your database*",
-        2: "🤖 **Generating AI insights...**\n\n*Processing patterns and trends with advanced analytics*", 
-        3: "📊 **Creating visualizations...**\n\n*Building interactive charts for better understanding*",
-        4: "📝 **Finalizing report...**\n\n*Preparing professional-grade analysis document*"
-    }
+# Display shared data cache statistics
+def display_cache_stats():
+    stats = get_client_data_cache().stats()
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### ⚡ Data Cache")
+    st.sidebar.caption(
+        f"{stats['entries']} clients cached ({stats['bytes'] / 1024:.0f} KB) | "
+        f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']}% hit rate)"
+    )
+
+SPAN_COLORS = {'db': '#1f77b4', 'llm': '#9467bd', 'charts': '#2ca02c', 'export': '#ff7f0e', 'storage': '#7f7f7f'}
+
+# Waterfall of one trace: each span is a bar starting at its offset from the trace start
+def build_trace_waterfall(trace):
+    import plotly.graph_objects as go
+    
+    spans = trace['spans']
+    labels = [f"{span['name']} ({span['thread']})" if span['thread'] != 'MainThread' else span['name']
+              for span in spans]
+    fig = go.Figure(go.Bar(
+        y=labels,
+        x=[span['duration_ms'] for span in spans],
+        base=[span['start_ms'] for span in spans],
+        orientation='h',
+        marker_color=[SPAN_COLORS.get(span['category'], '#17becf') for span in spans],
+        customdata=[json.dumps(span['attributes'], default=str) for span in spans],
+        hovertemplate='<b>%{y}</b><br>start %{base:.0f} ms, %{x:.0f} ms<br>%{customdata}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f"{trace['name']} - {trace['duration_ms'] / 1000:.1f}s",
+        xaxis_title='ms since start',
+        yaxis={'autorange': 'reversed'},
+        template='plotly_white',
+        height=max(250, 28 * len(spans) + 120),
+        margin=dict(l=10, r=10, t=40, b=10)
+    )
+    return fig
+
+# Admin-only pipeline timings: waterfall for one run, p50/p95 per stage over recent runs, JSONL export
+def display_performance_panel():
+    if not is_admin():
+        return
+    trace_store = get_trace_store()
+    traces = trace_store.recent()
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("### ⏱️ Performance")
+    if not traces:
+        st.sidebar.caption("No traced runs yet.")
+        return
     
-    # Create columns for progress bar and spinner
-    col1, col2 = st.columns([4, 1])
+    with st.sidebar.expander("Stage percentiles", expanded=False):
+        stats = trace_store.percentiles(name="report", limit=50)
+        if stats:
+            st.caption(f"Milliseconds over the last {stats['total']['count']} report runs")
+            st.dataframe(
+                pd.DataFrame.from_dict(stats, orient='index').sort_values('p95', ascending=False),
+                use_container_width=True
+            )
+        else:
+            st.caption("No report runs yet.")
     
-    with col1:
-        st.progress(progress)
-        st.markdown(loading_messages.get(step_num, message))
+    with st.sidebar.expander("Waterfall", expanded=False):
+        current = st.session_state.current_report or {}
+        trace_ids = [entry['trace_id'] for entry in traces]
+        selected = st.selectbox(
+            "Run", trace_ids,
+            index=trace_ids.index(current['trace_id']) if current.get('trace_id') in trace_ids else 0,
+            format_func=lambda trace_id: next(
+                f"{entry['started_at'][11:]} {entry['name']} {entry['attributes'].get('client_name', '')}"
+                for entry in traces if entry['trace_id'] == trace_id
+            ),
+            key="perf_trace"
+        )
+        trace = next(entry for entry in traces if entry['trace_id'] == selected)
+        st.plotly_chart(build_trace_waterfall(trace), use_container_width=True)
     
-    with col2:
-        # Add spinner with different emojis for each step
-        spinner_icons = {
-            1: "🔄",
-            2: "⚡", 
-            3: "📈",
-            4: "✨"
-        }
-        
-        with st.spinner(f"{spinner_icons.get(step_num, '⏳')} Processing..."):
-            import time
-            time.sleep(0.5)  # Small delay to show spinner
+    pool = init_connections().get('mysql_pool')
+    if pool:
+        with st.sidebar.expander("Connection pool", expanded=False):
+            pool_stats = pool.stats()
+            st.caption(f"{pool_stats['in_use']} in use, {pool_stats['idle']} idle, "
+                       f"{pool_stats['open']}/{pool_stats['size']} open (peak {pool_stats['peak_in_use']})")
+            st.dataframe(
+                pd.DataFrame(list(pool_stats.items()), columns=['metric', 'value']).set_index('metric'),
+                use_container_width=True
+            )
+    
+    job_stats = get_report_jobs().stats()
+    st.sidebar.caption(
+        f"Report jobs: {job_stats['running']} running, {job_stats['queued']} queued on {job_stats['workers']} workers "
+        f"({job_stats['done']} done, {job_stats['failed']} failed)"
+    )
     
-    return progress
+    # Built eagerly: at most TRACE_HISTORY small traces, and admins only
+    st.sidebar.download_button(
+        "📥 Export traces (JSONL)",
+        data=trace_store.export_jsonl(),
+        file_name=f"smartworks_traces_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+        mime="application/x-ndjson",
+        use_container_width=True
+    )
+
+# EXPLAIN the report queries for a client and flag scans, non-sargable predicates and missing indexes
+def display_query_diagnostics(client_name, connections):
+    with st.expander("🩺 Query Diagnostics", expanded=False):
+        st.markdown("Inspect the query plans behind the report. `EXPLAIN ANALYZE` runs each query, so use it sparingly.")
+        analyze = st.checkbox("Use EXPLAIN ANALYZE", key="diagnostics_analyze")
+        
+        if not st.button("🩺 Inspect Queries", key="diagnostics_run"):
+            return
+        if not client_name.strip():
+            st.error("Please enter a client name.")
+            return
+        if not connections['mysql']:
+            st.error("❌ Database connection failed. Please check your configuration.")
+            return
+        
+        with borrow_connection(connections) as conn:
+            cursor = conn.cursor()
+            try:
+                queries, params = build_client_queries(client_name)
+                report = query_plan.inspect_queries(cursor, queries, params, analyze=analyze)
+            finally:
+                cursor.close()
+        
+        for query_name, entry in report['queries'].items():
+            findings = entry['non_sargable'] + entry['plan_findings']
+            if entry['error']:
+                st.error(f"**{query_name}**: {entry['error']}")
+            elif findings:
+                st.warning(f"**{query_name}**\n\n" + "\n".join(f"- {finding}" for finding in findings))
+            else:
+                st.success(f"**{query_name}**: no issues found")
+            if entry['plan']:
+                st.dataframe(pd.DataFrame(entry['plan']).astype(str), use_container_width=True)
+        
+        if report['index_suggestions']:
+            st.markdown("**Suggested indexes**")
+            st.code(";\n".join(s['ddl'] for s in report['index_suggestions']) + ";", language="sql")
+
+PORTFOLIO_SOURCE_LABELS = {'rollup': 'the rollup', 'live': 'live queries', 'snapshot': 'the Parquet snapshot'}
+
+PORTFOLIO_SORT_OPTIONS = {
+    'Price per seat': 'price_per_seat',
+    'Price vs centre median (%)': 'price_vs_centre_pct',
+    'Tickets per seat': 'tickets_per_seat',
+    'SLA compliance (%)': 'sla_compliance_rate',
+    'Escalation rate (%)': 'escalation_rate',
+    'Tickets (6 months)': 'ticket_count',
+    'Revenue': 'revenue',
+    'Seats': 'seats',
+}
+
+# Rank every active client and centre on pricing and service KPIs
+def display_portfolio_dashboard(connections):
+    with st.expander("🌐 Portfolio Overview", expanded=False):
+        st.markdown("Pricing and service KPIs for every active client, refreshed with the ticket data.")
+        if not st.checkbox("Load portfolio", key="portfolio_enabled"):
+            return
+        if get_data_source() == "snapshot" and not get_snapshot_reader().available():
+            st.error("❌ Snapshot not found. Run `python snapshot.py` to export the report data first.")
+            return
+        if not connections['mysql'] and get_data_source() != "snapshot":
+            st.error("❌ Database connection failed. Please check your configuration.")
+            return
+        
+        if st.button("🔄 Reload now", key="portfolio_reload"):
+            load_portfolio_kpis.clear()
+        source, data_version = get_portfolio_data_version(connections)
+        with st.spinner("Loading portfolio..."):
+            try:
+                client_kpis, centre_kpis, info = load_portfolio_kpis(source, data_version, connections)
+            except RuntimeError as e:
+                st.error(f"❌ Could not load the portfolio: {e}. Please try again later.")
+                return
+        st.caption(
+            f"{len(client_kpis)} clients in {len(centre_kpis)} centres | {info['period']} seats and revenue | "
+            f"tickets from {PORTFOLIO_SOURCE_LABELS[info['source']]} | loaded {info['loaded_at']}"
+        )
+        
+        clients_tab, centres_tab = st.tabs(["Clients", "Centres"])
+        with clients_tab:
+            col1, col2, col3 = st.columns([2, 2, 1])
+            with col1:
+                sort_label = st.selectbox("Rank by", list(PORTFOLIO_SORT_OPTIONS), key="portfolio_sort")
+            with col2:
+                centres = st.multiselect("Centres", sorted(centre_kpis['centre'].dropna()), key="portfolio_centres")
+            with col3:
+                ascending = st.checkbox("Lowest first", key="portfolio_ascending")
+            
+            view = client_kpis[client_kpis['centre'].isin(centres)] if centres else client_kpis
+            view = view.sort_values(PORTFOLIO_SORT_OPTIONS[sort_label], ascending=ascending, na_position='last')
+            st.dataframe(view, use_container_width=True, hide_index=True)
+            st.download_button(
+                "📥 Download clients (CSV)",
+                data=view.to_csv(index=False),
+                file_name=f"smartworks_portfolio_clients_{info['period']}.csv",
+                mime="text/csv",
+                key="portfolio_clients_csv"
+            )
+        with centres_tab:
+            st.dataframe(
+                centre_kpis.sort_values('revenue', ascending=False), use_container_width=True, hide_index=True
+            )
+            st.download_button(
+                "📥 Download centres (CSV)",
+                data=centre_kpis.to_csv(index=False),
+                file_name=f"smartworks_portfolio_centres_{info['period']}.csv",
+                mime="text/csv",
+                key="portfolio_centres_csv"
+            )
+
+# Batch report generation for a client list or a whole centre
+def display_batch_reports(connections):
+    with st.expander("📦 Batch Reports", expanded=False):
+        # The batch runs in the script thread, so the page only takes small batches
+        max_clients = int(get_config_value("BATCH_UI_MAX_CLIENTS", 10))
+        st.markdown(f"Generate reports for up to {max_clients} clients at once. "
+                    "For larger or overnight runs use `python batch_reports.py`.")
+        clients_text = st.text_area("Client names (one per line)", key="batch_clients")
+        centre = st.text_input("...or every active client in Centre", key="batch_centre")
+        workers = st.number_input("Parallel workers", min_value=1, max_value=16,
+                                  value=int(get_config_value("BATCH_WORKERS", 4)), key="batch_workers")
+        
+        if not st.button("📦 Generate Batch", key="batch_run"):
+            return
+        if not connections['mysql'] or not connections['anthropic']:
+            st.error("❌ Database and AI service are both required for batch reports.")
+            return
+        
+        with borrow_connection(connections) as conn:
+            cursor = conn.cursor()
+            try:
+                client_names = resolve_batch_clients(cursor, clients_text.splitlines(), centre.strip() or None)
+            finally:
+                cursor.close()
+        if not client_names:
+            st.error("Please enter at least one client name or a centre.")
+            return
+        if len(client_names) > max_clients:
+            st.error(f"❌ {len(client_names)} clients selected; the page generates at most {max_clients} at once. "
+                     "Run larger batches with `python batch_reports.py` (see the readme).")
+            return
+        
+        output_dir = os.path.join(DATA_DIR, f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        progress = st.progress(0.0)
+        status = st.empty()
+        
+        # Progress is reported from the script thread as each worker finishes
+        def _on_progress(done, total, summary):
+            progress.progress(done / total)
+            status.markdown(f"**{done}/{total}** - {summary['client_name']}: {summary['status']}")
+        
+        summaries = run_batch_reports(
+            client_names, connections, output_dir, max_workers=int(workers),
+            generated_by=st.session_state.get('username', 'batch'), on_progress=_on_progress
+        )
+        
+        ok = sum(1 for summary in summaries if summary['status'] == 'ok')
+        st.success(f"✅ {ok} of {len(summaries)} reports generated")
+        failed = [summary for summary in summaries if summary['status'] != 'ok']
+        if failed:
+            st.dataframe(pd.DataFrame(failed)[['client_name', 'status']], use_container_width=True)
+        
+        archive = shutil.make_archive(output_dir, 'zip', output_dir)
+        with open(archive, 'rb') as f:
+            st.download_button(
+                label="📥 Download All Reports (ZIP)",
+                data=f.read(),
+                file_name=os.path.basename(archive),
+                mime="application/zip",
+                key="batch_download"
+            )
 
 # Main Streamlit App
 def main():
@@ -823,6 +2616,9 @@ def main():
     if not check_authentication():
         return
     
+    # Reports that finished on the job queue since the last run, before the sidebar lists them
+    collect_report_jobs()
+    
     # Sidebar with user info and navigation
     with st.sidebar:
         st.title("🏢 SmartWorks")
@@ -833,7 +2629,10 @@ def main():
         st.markdown("Generate comprehensive client insights and service performance reports")
         
         # Display previous reports
+        prune_evicted_reports()
         display_previous_reports()
+        display_cache_stats()
+        display_performance_panel()
         
         st.markdown("---")
         if st.button("🚪 Logout"):
@@ -846,6 +2645,13 @@ def main():
     # Initialize connections
     connections = init_connections()
     
+    # The primary connection is held for the process lifetime; revive it if the server dropped it
+    if connections.get('mysql_pool') and not connections['mysql_pool'].ensure_alive(connections['mysql']):
+        st.warning("⚠️ Database connection lost and could not be re-established. Retrying on the next run.")
+    
+    if connections.get('mysql_pool') and str(get_config_value("ROLLUP_BACKGROUND_REFRESH", "false")).lower() == "true":
+        start_rollup_refresher(connections['mysql_pool'])
+    
     # Client search section
     st.header("🔍 Client Analysis")
     
@@ -854,31 +2660,72 @@ def main():
         client_name = st.text_input(
             "Enter client company name:",
             placeholder="e.g., Zomato, Swiggy, Flipkart",
-            help="Enter the exact company name as registered in SmartWorks system"
+            help="Start typing a company name; matching SmartWorks clients are suggested below"
         )
+        
+        # Resolve the typed name against the in-memory index before touching the database
+        name_index = refresh_client_name_index(connections)
+        client_known = None
+        if client_name.strip() and len(name_index) > 0:
+            exact_name = name_index.exact(client_name)
+            if exact_name:
+                client_name = exact_name
+                client_known = True
+            else:
+                # The index can lag behind newly added clients, so the typed name stays selectable
+                # and anything not in the index is left for the database to resolve
+                typed_name = " ".join(client_name.split())
+                suggestions = [name for name in name_index.suggest(client_name, limit=8) if name != typed_name]
+                if suggestions:
+                    client_name = st.selectbox(
+                        "Did you mean:", [typed_name] + suggestions, key="client_suggestion",
+                        format_func=lambda name: f"{name} (as typed)" if name == typed_name else name
+                    )
+                    client_known = True if client_name != typed_name else None
+                else:
+                    st.caption("No matching clients in the index; the database will be checked")
     
     with col2:
         st.markdown("<br>", unsafe_allow_html=True)
         generate_btn = st.button("🚀 Generate Report", type="primary", use_container_width=True)
+        refresh_data = st.checkbox(
+            "🔄 Refresh data",
+            help="Bypass the shared data cache and re-query the database"
+        )
+        regenerate_ai = st.checkbox(
+            "🤖 Regenerate AI output",
+            help="Ignore cached AI responses for identical data and prompts"
+        )
+    
+    display_portfolio_dashboard(connections)
+    display_batch_reports(connections)
+    if get_config_value("QUERY_DIAGNOSTICS", "false").lower() == "true":
+        display_query_diagnostics(client_name, connections)
     
     # Analysis period info
     current_date = pd.Timestamp.now()
     st.info(f"📅 **Analysis Period:** {current_date.strftime('%B %Y')} | **Trend Data:** Last 6 months")
     
+    if has_active_report_jobs():
+        display_report_jobs()
+    
     # Display current/previous report if exists
     if st.session_state.current_report:
+        report_store = get_report_store()
+        report_id = st.session_state.current_report['report_id']
+        
         st.markdown("---")
         st.header(f"📊 Report: {st.session_state.current_report['client_name']}")
         
         # Show the AI report
-        st.markdown(st.session_state.current_report.get('ai_report', ''))
+        st.markdown(report_store.load(report_id, 'ai_report') or '')
         
         # Show charts if available
-        if st.session_state.current_report.get('charts'):
+        charts = report_store.load(report_id, 'charts')
+        if charts:
             st.markdown("---")
             st.header("📊 Visual Analytics")
             
-            charts = st.session_state.current_report['charts']
             chart_list = list(charts.items())
             
             if len(chart_list) >= 2:
@@ -908,7 +2755,7 @@ def main():
         with col1:
             st.download_button(
                 label="📄 Download Markdown",
-                data=st.session_state.current_report['markdown_content'],
+                data=report_export(st.session_state.current_report, 'markdown_content'),
                 file_name=f"SmartWorks_{st.session_state.current_report['client_name'].replace(' ', '_')}_Report.md",
                 mime="text/markdown",
                 help="Complete report with embedded charts",
@@ -916,10 +2763,10 @@ def main():
             )
         
         with col2:
-            if st.session_state.current_report.get('pdf_content'):
+            if st.session_state.current_report.get('has_pdf'):
                 st.download_button(
                     label="📕 Download PDF",
-                    data=st.session_state.current_report['pdf_content'],
+                    data=report_export(st.session_state.current_report, 'pdf_content'),
                     file_name=f"SmartWorks_{st.session_state.current_report['client_name'].replace(' ', '_')}_Report.pdf",
                     mime="application/pdf",
                     help="Professional PDF with charts",
@@ -938,117 +2785,30 @@ def main():
             st.error("Please enter a client name.")
             return
         
-        if not connections['mysql']:
+        if get_data_source() == "snapshot" and not get_snapshot_reader().available():
+            st.error("❌ **Snapshot not found**\n\nRun `python snapshot.py` to export the report data first.")
+            return
+        
+        if not connections['mysql'] and get_data_source() != "snapshot":
             st.error("❌ **Database connection unavailable**\n\nPlease contact IT support to resolve connectivity issues.")
             return
         
-        # Clear current report to show new one
-        st.session_state.current_report = None
+        # Generation runs on the shared job queue; this run only submits it and the progress panel polls it
+        active_jobs = get_report_jobs().list(owner=st.session_state.job_owner, statuses=jobs.ACTIVE)
+        if any(job['metadata'].get('client_name') == client_name for job in active_jobs):
+            st.info(f"⏳ A report for **{client_name}** is already being generated.")
+            return
         
-        # Enhanced loading experience
-        with st.container():
-            st.markdown("### 🚀 Generating Client Analysis")
-            loading_container = st.empty()
-            progress_container = st.empty()
+        if len(active_jobs) >= int(get_config_value("REPORT_JOBS_PER_SESSION", 3)):
+            st.warning("⚠️ **Too many reports in progress**\n\nPlease wait for one of your reports to finish.")
+            return
         
-        try:
-            # Step 1: Fetch data (silent in background)
-            with progress_container:
-                show_loading_steps(1, 4, "Analyzing client data...")
-            
-            cursor = connections['mysql'].cursor()
-            data = get_client_data(client_name, cursor)
-            
-            # Step 2: Validate data
-            has_demographics = data.get('client_demographics') and len(data['client_demographics']) > 0
-            has_tickets = data.get('monthly_trend') and len(data['monthly_trend']) > 0
-            
-            if not has_demographics and not has_tickets:
-                loading_container.empty()
-                progress_container.empty()
-                st.error(f"❌ **Client '{client_name}' not found**\n\nPlease check the spelling and try again.")
-                return
-            elif not has_demographics:
-                st.warning("⚠️ **Limited data available** - Client found in ticketing system only")
-            elif not has_tickets:
-                st.warning("⚠️ **Limited analytics** - No recent tickets found for this client")
-            
-            # Step 3: Generate AI report
-            if connections['anthropic']:
-                with progress_container:
-                    show_loading_steps(2, 4, "Generating AI insights...")
-                
-                ai_report = generate_smartworks_report(connections['anthropic'], data)
-                
-                if ai_report:
-                    # Step 4: Generate charts
-                    with progress_container:
-                        show_loading_steps(3, 4, "Creating visualizations...")
-                    
-                    chart_code = generate_chart_code_with_ai(connections['anthropic'], data)
-                    charts = {}
-                    
-                    if chart_code:
-                        charts = execute_chart_code(chart_code, data)
-                    
-                    # Step 5: Finalize
-                    with progress_container:
-                        show_loading_steps(4, 4, "Finalizing report...")
-                    
-                    # Save data quietly in background
-                    save_client_data(client_name, data)
-                    
-                    # Create download content
-                    markdown_content = create_markdown_with_charts(ai_report, charts, client_name)
-                    pdf_content = create_pdf_report(ai_report, charts, client_name) if charts else None
-                    
-                    # Store in session state
-                    report_data = {
-                        'client_name': client_name,
-                        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M'),
-                        'generated_by': st.session_state.get('username', 'Unknown'),
-                        'ai_report': ai_report,
-                        'charts': charts,
-                        'markdown_content': markdown_content,
-                        'pdf_content': pdf_content
-                    }
-                    
-                    # Add to reports list and set as current
-                    st.session_state.generated_reports.insert(0, report_data)
-                    st.session_state.current_report = report_data
-                    
-                    # Keep only last 10 reports
-                    if len(st.session_state.generated_reports) > 10:
-                        st.session_state.generated_reports = st.session_state.generated_reports[:10]
-                    
-                    # Clear loading and show success
-                    loading_container.empty()
-                    progress_container.empty()
-                    
-                    with st.container():
-                        st.success("✅ **Analysis Complete!** Your comprehensive client report is ready.")
-                        st.balloons()  # Celebratory effect
-                    
-                    # Rerun to show the report
-                    st.rerun()
-                
-                else:
-                    loading_container.empty()
-                    progress_container.empty()
-                    st.error("❌ **Report generation failed**\n\nPlease try again or contact support.")
-            
-            else:
-                loading_container.empty()
-                progress_container.empty()
-                st.error("❌ **AI service unavailable**\n\nPlease contact IT support to enable AI analysis.")
-                
-        except Exception as e:
-            loading_container.empty()
-            progress_container.empty()
-            st.error(f"❌ **Analysis failed**\n\n{str(e)}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
+        job_id = submit_report_job(
+            client_name, connections, refresh_data=refresh_data, regenerate_ai=regenerate_ai,
+            index_miss=client_known is None
+        )
+        st.session_state.report_jobs.insert(0, job_id)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,66 @@
+
+"""Generate SmartWorks client reports in bulk, without the browser.
+
+Examples:
+
+    python batch_reports.py --centre "Bangalore - Koramangala" --output-dir ./reports
+    python batch_reports.py --clients "Zomato,Swiggy" --workers 2
+    python batch_reports.py --clients-file clients.txt --output-dir /data/reports/2025-06
+"""
+
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate SmartWorks client reports in bulk")
+    parser.add_argument("--clients", help="Comma-separated client names")
+    parser.add_argument("--clients-file", help="File with one client name per line")
+    parser.add_argument("--centre", help="Generate reports for every active client in this Centre")
+    parser.add_argument("--output-dir", default=os.path.join(".", "reports", datetime.now().strftime("%Y%m%d_%H%M%S")),
+                        help="Directory for the Markdown/PDF/JSON outputs")
+    parser.add_argument("--workers", type=int, default=int(app.get_config_value("BATCH_WORKERS", 4)),
+                        help="Reports generated concurrently")
+    parser.add_argument("--chart-mode", choices=["builtin", "ai"], default=app.get_config_value("CHART_MODE", "builtin"))
+    args = parser.parse_args()
+
+    client_names = []
+    if args.clients:
+        client_names.extend(args.clients.split(","))
+    if args.clients_file:
+        with open(args.clients_file, encoding="utf-8") as f:
+            client_names.extend(f.read().splitlines())
+    if not client_names and not args.centre:
+        parser.error("provide --clients, --clients-file or --centre")
+
+    connections = app.init_connections()
+    if not connections['mysql'] or not connections['anthropic']:
+        print("❌ Database and AI service are both required for batch reports")
+        return 1
+
+    cursor = connections['mysql'].cursor()
+    try:
+        client_names = app.resolve_batch_clients(cursor, client_names, args.centre)
+    finally:
+        cursor.close()
+    print(f"📦 Generating {len(client_names)} reports into {args.output_dir} with {args.workers} workers")
+
+    def _on_progress(done, total, summary):
+        print(f"[{done}/{total}] {summary['client_name']}: {summary['status']}"
+              + (f" ({summary['seconds']}s)" if summary.get('seconds') else ""))
+
+    summaries = app.run_batch_reports(
+        client_names, connections, args.output_dir, max_workers=args.workers,
+        chart_mode=args.chart_mode, on_progress=_on_progress
+    )
+    failed = [summary for summary in summaries if summary['status'] != 'ok']
+    print(f"✅ {len(summaries) - len(failed)} of {len(summaries)} reports written to {args.output_dir}")
+    return 1 if any(summary['status'] == 'error' for summary in failed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+
+"""Offline stand-in for the Anthropic client used by the report pipeline.
+
+FakeAnthropic answers messages.create, messages.stream and
+messages.count_tokens with deterministic text after a configurable delay:
+`latency` seconds before the first token plus output tokens divided by
+`tokens_per_second` (0 disables the per-token delay). Chart prompts get
+plotly code that builds fig1-fig4 from client_data; every other prompt gets
+a markdown report of roughly `output_tokens` tokens.
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+CHART_CODE = '''```python
+monthly = pd.DataFrame(client_data.get('monthly_trend', []))
+fig1 = px.line(monthly, x='month', y=['total_tickets', 'resolved_tickets', 'unresolved_tickets'],
+               markers=True, title='Monthly Ticket Trends') if not monthly.empty else go.Figure()
+
+issues = pd.DataFrame(client_data.get('issues_breakdown', []))
+fig2 = px.bar(issues.head(10), x='total_tickets', y='subCategory', color='category', orientation='h',
+              title='Issue Categories Breakdown') if not issues.empty else go.Figure()
+
+escalation = pd.DataFrame(client_data.get('escalation_analysis', []))
+fig3 = px.pie(escalation, names='escalationLevel', values='ticket_count', hole=0.4,
+              title='Escalation Level Distribution') if not escalation.empty else go.Figure()
+
+sla = (client_data.get('sla_compliance') or [{}])[0]
+fig4 = go.Figure(go.Indicator(mode='gauge+number', value=sla.get('sla_compliance_rate') or 0,
+                              gauge={'axis': {'range': [0, 100]}}, title={'text': 'SLA Compliance'}))
+```'''
+
+REPORT_SECTIONS = [
+    "📍 Client Overview", "💸 Pricing Overview", "📈 Ticketing Trends (Last 6 Months)",
+    "🛠️ Top Issues Breakdown", "⏱️ SLA Performance (Current Month)", "🔺 Escalation Analysis",
+    "🎯 Key Insights & Recommendations",
+]
+
+REPORT_SENTENCE = ("The client logged **{n} tickets** in this period, with resolution times "
+                   "tracking close to the centre average and no sustained SLA regressions. ")
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def make_report(output_tokens):
+    """Markdown report of about output_tokens tokens, split across the standard sections"""
+    per_section = max(1, output_tokens * 4 // len(REPORT_SECTIONS) // len(REPORT_SENTENCE))
+    parts = []
+    for index, section in enumerate(REPORT_SECTIONS):
+        parts.append(f"## {section}")
+        parts.append("".join(REPORT_SENTENCE.format(n=100 + index * 7 + line) for line in range(per_section)))
+        parts.append(f"- **Metric {index + 1}:** {90 - index}% of target\n- **Trend:** stable")
+    return "\n\n".join(parts)
+
+
+def _message(text, prompt):
+    return SimpleNamespace(
+        content=[SimpleNamespace(type="text", text=text)],
+        usage=SimpleNamespace(input_tokens=estimate_tokens(prompt), output_tokens=estimate_tokens(text)),
+        stop_reason="end_turn",
+    )
+
+
+class _Stream:
+    def __init__(self, messages, prompt, chunk_chars=40):
+        self._messages = messages
+        self._prompt = prompt
+        self._text = messages.respond(prompt)
+        self._chunk_chars = chunk_chars
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        time.sleep(self._messages.latency)
+        for start in range(0, len(self._text), self._chunk_chars):
+            chunk = self._text[start:start + self._chunk_chars]
+            if self._messages.tokens_per_second:
+                time.sleep(estimate_tokens(chunk) / self._messages.tokens_per_second)
+            yield chunk
+
+    def get_final_message(self):
+        return _message(self._text, self._prompt)
+
+
+class _Messages:
+    def __init__(self, latency, output_tokens, tokens_per_second):
+        self.latency = latency
+        self.output_tokens = output_tokens
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def respond(self, prompt):
+        with self._lock:
+            self.calls += 1
+        if "fig1" in prompt and "plotly" in prompt.lower():
+            return CHART_CODE
+        return make_report(self.output_tokens)
+
+    def create(self, model=None, max_tokens=None, temperature=None, messages=(), **kwargs):
+        prompt = messages[-1]["content"] if messages else ""
+        text = self.respond(prompt)
+        delay = self.latency
+        if self.tokens_per_second:
+            delay += estimate_tokens(text) / self.tokens_per_second
+        time.sleep(delay)
+        return _message(text, prompt)
+
+    def stream(self, model=None, max_tokens=None, temperature=None, messages=(), **kwargs):
+        return _Stream(self, messages[-1]["content"] if messages else "")
+
+    def count_tokens(self, model=None, messages=(), **kwargs):
+        return SimpleNamespace(input_tokens=sum(estimate_tokens(str(m.get("content", ""))) for m in messages))
+
+
+class FakeAnthropic:
+    def __init__(self, latency=0.5, output_tokens=1500, tokens_per_second=0.0):
+        self.messages = _Messages(latency, output_tokens, tokens_per_second)
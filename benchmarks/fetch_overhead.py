@@ -0,0 +1,95 @@
+
+"""Per-query result conversion overhead: DataFrame round trip vs the lean fetch path.
+
+Times only what happens after cursor.fetchall(): the old
+pd.DataFrame(rows, columns=...).to_dict(orient='records') conversion against
+query_results.rows_to_records and rows_to_columns, on synthetic prod_ticketing
+rows with the same column types MySQL returns (datetime, str, Decimal, int).
+
+    python benchmarks/fetch_overhead.py
+    python benchmarks/fetch_overhead.py --rows 10000 --repeat 30 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from query_results import rows_to_columns, rows_to_records  # noqa: E402
+
+COLUMNS = [
+    'createdAt', 'clientStatus', 'category', 'subCategory', 'TAT',
+    'isDueDateBreached', 'escalationLevel', 'escalationStatus'
+]
+
+
+def make_rows(count, seed=42):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    categories = ['Housekeeping', 'IT', 'HVAC', 'Electrical', 'Pantry', 'Security']
+    rows = []
+    for _ in range(count):
+        rows.append((
+            start + timedelta(minutes=rng.randrange(180 * 24 * 60)),
+            rng.choice(['Open', 'Closed', 'Closed', 'Closed']),
+            rng.choice(categories),
+            f"sub-{rng.randrange(12)}",
+            None if rng.random() < 0.1 else Decimal(f"{rng.uniform(0.5, 96):.2f}"),
+            rng.randrange(2),
+            rng.choice([None, None, 'L1', 'L2', 'L3']),
+            rng.choice(['Open', 'Closed']),
+        ))
+    return rows
+
+
+def dataframe_round_trip(columns, rows):
+    return pd.DataFrame(rows, columns=columns).to_dict(orient='records')
+
+
+def time_call(fn, columns, rows, repeat):
+    fn(columns, rows)  # warm up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(columns, rows)
+        samples.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': round(statistics.median(samples), 2), 'min_ms': round(min(samples), 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark result conversion in execute_query")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    results = {
+        'rows': args.rows,
+        'repeat': args.repeat,
+        'dataframe_to_dict (before)': time_call(dataframe_round_trip, COLUMNS, rows, args.repeat),
+        'rows_to_records (after)': time_call(rows_to_records, COLUMNS, rows, args.repeat),
+        'rows_to_columns (columnar)': time_call(rows_to_columns, COLUMNS, rows, args.repeat),
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.rows} rows x {len(COLUMNS)} columns, median of {args.repeat} runs")
+    baseline = results['dataframe_to_dict (before)']['median_ms']
+    for name, timing in results.items():
+        if isinstance(timing, dict):
+            print(f"  {name:<28} {timing['median_ms']:>8.2f} ms  ({baseline / timing['median_ms']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Startup import cost of app.py, summarised from `python -X importtime`.
+
+Imports app in a fresh interpreter, totals the cumulative import time of
+app's direct imports per top-level package and fails when a deferred
+dependency (plotly.express, reportlab, anthropic) is pulled in at startup, a
+removed one (matplotlib, seaborn, markdown) is back, or the whole import
+exceeds --budget-ms. Run it before and after touching app.py's imports to
+catch cold-start regressions.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 2500 --top 15 --json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported by `import app`. streamlit itself imports
+# plotly.graph_objects and plotly.io, so only plotly.express is checked.
+DEFERRED = ['plotly.express', 'charts', 'reportlab', 'anthropic', 'kaleido']
+REMOVED = ['matplotlib', 'seaborn', 'markdown']
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def profile_import(module="app"):
+    """One cold import of module; returns [(name, self_us, cumulative_us, depth)]"""
+    env = dict(os.environ, LOG_LEVEL=os.environ.get("LOG_LEVEL", "WARNING"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def summarise(entries, module="app"):
+    """Total ms for module, cumulative ms of its direct imports per top-level package, and all loaded names"""
+    # -X importtime prints children before their parent, so module's direct imports are the
+    # depth-1 rows between the previous depth-0 row and module's own row
+    packages = {}
+    total_us = 0
+    children = []
+    for name, _, cumulative_us, depth in entries:
+        if depth == 0:
+            if name == module:
+                total_us = cumulative_us
+                for child, child_us in children:
+                    top = child.split(".")[0]
+                    packages[top] = packages.get(top, 0) + child_us
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative_us))
+    return {
+        'total_ms': round(total_us / 1000, 1),
+        'packages_ms': {name: round(us / 1000, 1) for name, us in sorted(packages.items(), key=lambda item: -item[1])},
+        'loaded': sorted({name for name, *_ in entries}),
+    }
+
+
+def is_loaded(name, loaded):
+    return any(module == name or module.startswith(name + ".") for module in loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise the import cost of app.py")
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold imports to run; the median run is reported")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when the median total exceeds this")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    args = parser.parse_args()
+
+    runs = [summarise(profile_import(args.module), args.module) for _ in range(max(1, args.repeat))]
+    runs.sort(key=lambda run: run['total_ms'])
+    summary = runs[len(runs) // 2]
+    summary['runs_total_ms'] = [run['total_ms'] for run in runs]
+    summary['median_total_ms'] = round(statistics.median(summary['runs_total_ms']), 1)
+
+    problems = []
+    for name in DEFERRED:
+        if is_loaded(name, summary['loaded']):
+            problems.append(f"{name} is imported at startup; import it where it is used")
+    for name in REMOVED:
+        if is_loaded(name, summary['loaded']):
+            problems.append(f"{name} is imported at startup but is no longer a dependency")
+    if args.budget_ms is not None and summary['median_total_ms'] > args.budget_ms:
+        problems.append(f"import {args.module} took {summary['median_total_ms']} ms (budget {args.budget_ms} ms)")
+    summary['problems'] = problems
+
+    if args.json:
+        output = dict(summary)
+        output.pop('loaded')
+        print(json.dumps(output, indent=2))
+    else:
+        print(f"import {args.module}: {summary['median_total_ms']} ms median of {len(runs)} "
+              f"(runs: {', '.join(str(ms) for ms in summary['runs_total_ms'])})")
+        for name, ms in list(summary['packages_ms'].items())[:args.top]:
+            print(f"  {name:<24} {ms:>8.1f} ms")
+        for problem in problems:
+            print(f"FAIL: {problem}")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
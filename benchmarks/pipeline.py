@@ -0,0 +1,229 @@
+
+"""End-to-end report pipeline timings on synthetic data, without network or MySQL.
+
+Builds a SQLite stand-in database per ticket volume (standin_db.py), then
+times each report stage for the client with the most tickets: the data
+fetch paths (sequential, parallel, consolidated, Parquet snapshot), prompt
+encoding, the AI calls against FakeAnthropic (fake_anthropic.py), chart
+building, chart code execution and the Markdown/PDF exports. Databases are
+cached in --data-dir and rebuilt when they were built on another day.
+
+    python benchmarks/pipeline.py
+    python benchmarks/pipeline.py --rows 10k,1M,10M --repeat 3 --output results.json
+    python benchmarks/pipeline.py --latency 2 --tokens-per-second 60 --stages ai_outputs
+
+Results are JSON with the seed, environment and git commit, so runs before
+and after an optimization can be diffed.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+# Configure the app before importing it: live (stand-in) data, no LLM cache, quiet logs
+os.environ['DATA_SOURCE'] = 'mysql'
+os.environ['LLM_CACHE_ENABLED'] = 'false'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+import pyarrow  # noqa: E402
+
+import app  # noqa: E402
+import snapshot  # noqa: E402
+from charts import build_standard_charts  # noqa: E402
+from fake_anthropic import FakeAnthropic  # noqa: E402
+from standin_db import StandInConnection, StandInPool, ensure_database, parse_rows  # noqa: E402
+
+STAGES = [
+    'fetch_sequential', 'fetch_parallel', 'fetch_consolidated', 'fetch_snapshot', 'prompt_encoding',
+    'ai_outputs', 'charts_builtin', 'chart_code_exec', 'chart_images', 'markdown_export', 'pdf_export',
+]
+DEFAULT_STAGES = [stage for stage in STAGES if stage != 'chart_images']  # chart_images needs Chrome for kaleido
+
+
+def time_stage(fn, repeat):
+    """Median/min/max over repeat runs; the first run is reported separately as the cold run"""
+    samples, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    timing = {
+        'median_ms': round(statistics.median(samples), 2),
+        'min_ms': round(min(samples), 2),
+        'max_ms': round(max(samples), 2),
+        'first_ms': round(samples[0], 2),
+    }
+    return timing, result
+
+
+def top_client(path):
+    conn = StandInConnection(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT companyName, COUNT(*) FROM prod_ticketing "
+            "GROUP BY companyName ORDER BY COUNT(*) DESC, companyName LIMIT 1"
+        )
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+        conn.close()
+
+
+def run_scale(rows, args, fake_client):
+    path, build = ensure_database(args.data_dir, rows, args.seed, rebuild=args.rebuild)
+    client_name, client_tickets = top_client(path)
+    conn = StandInConnection(path)
+    pool = StandInPool(path, size=int(os.getenv("DB_PARALLEL_WORKERS", 6)))
+    result = {
+        'rows': rows,
+        'clients': build['clients'],
+        'client': client_name,
+        'client_tickets': client_tickets,
+        'setup': {'build_seconds': build['build_seconds']},
+        'stages': {},
+    }
+    stages = result['stages']
+
+    def _run(stage, fn, repeat=args.repeat):
+        if stage not in args.stages:
+            return None
+        try:
+            stages[stage], value = time_stage(fn, repeat)
+            print(f"  {stage:<20} {stages[stage]['median_ms']:>10.2f} ms")
+            return value
+        except Exception as e:
+            stages[stage] = {'error': f"{type(e).__name__}: {e}"}
+            print(f"  {stage:<20} failed: {e}")
+            return None
+
+    data = _run('fetch_sequential', lambda: app.get_client_data(client_name, connection=conn))
+    parallel = _run('fetch_parallel', lambda: app.get_client_data_parallel(client_name, pool))
+    consolidated = _run('fetch_consolidated', lambda: app.get_client_data_consolidated(client_name, connection=conn))
+    data = data or (parallel or consolidated or (None,))[0]
+
+    if 'fetch_snapshot' in args.stages:
+        snapshot_dir = os.path.join(args.data_dir, f"snapshot_{rows}_{args.seed}")
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        start = time.perf_counter()
+        snapshot.export_snapshot(conn, snapshot_dir, months=13, restate_months=0)
+        result['setup']['snapshot_export_seconds'] = round(time.perf_counter() - start, 2)
+        os.environ['SNAPSHOT_DIR'] = snapshot_dir
+        app.get_snapshot_reader.clear()
+        snapshot_data = _run('fetch_snapshot', lambda: app.get_client_data_from_snapshot(client_name))
+        data = data or (snapshot_data or (None,))[0]
+
+    if data is None:
+        data = app.get_client_data(client_name, connection=conn)
+
+    _run('prompt_encoding', lambda: app.format_data_for_prompt(data))
+    ai_outputs = _run(
+        'ai_outputs', lambda: app.generate_ai_outputs(fake_client, data, use_cache=False),
+        repeat=min(args.repeat, args.ai_repeat)
+    )
+    ai_report, chart_code = ai_outputs or app.generate_ai_outputs(fake_client, data, use_cache=False)
+
+    charts = _run('charts_builtin', lambda: build_standard_charts(data)) or build_standard_charts(data)
+    _run('chart_code_exec', lambda: app.execute_chart_code(app.clean_chart_code(chart_code), data))
+    chart_pngs = _run('chart_images', lambda: app.export_chart_images(charts), repeat=1) or {}
+    _run('markdown_export', lambda: app.create_markdown_with_charts(
+        ai_report, charts, client_name, chart_pngs, generated_by='benchmark'
+    ))
+    _run('pdf_export', lambda: app.create_pdf_report(
+        ai_report, charts, client_name, chart_pngs, generated_by='benchmark'
+    ))
+    return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'pyarrow': pyarrow.__version__,
+        'git_commit': commit,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the report pipeline on synthetic data")
+    parser.add_argument("--rows", default="10k", help="Comma-separated ticket volumes, e.g. 10k,1M,10M")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--ai-repeat", type=int, default=1, help="Runs of the (sleeping) AI stage")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stages", default=",".join(DEFAULT_STAGES),
+                        help=f"Comma-separated subset of: {', '.join(STAGES)}")
+    parser.add_argument("--latency", type=float, default=0.5, help="Fake AI seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="Fake AI output speed (0 = instant)")
+    parser.add_argument("--output-tokens", type=int, default=1500, help="Fake AI report length")
+    parser.add_argument("--data-dir", default=os.path.join(tempfile.gettempdir(), "smartworks_bench"))
+    parser.add_argument("--rebuild", action="store_true", help="Regenerate the stand-in databases")
+    parser.add_argument("--output", help="Write the JSON results to this file")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+    args.stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = sorted(set(args.stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(unknown)}")
+
+    fake_client = FakeAnthropic(args.latency, args.output_tokens, args.tokens_per_second)
+    results = {
+        'benchmark': 'pipeline',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'fake_llm': {'latency': args.latency, 'tokens_per_second': args.tokens_per_second,
+                     'output_tokens': args.output_tokens},
+        'environment': environment(),
+        'scales': [],
+    }
+    # Progress and the app's own prints go to stderr so --json output stays parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        for rows in [parse_rows(value) for value in args.rows.split(",")]:
+            print(f"{rows} tickets")
+            results['scales'].append(run_scale(rows, args, fake_client))
+
+    text = json.dumps(results, indent=2, sort_keys=True, default=str)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if args.json:
+        print(text)
+        return
+    for scale in results['scales']:
+        print(f"\n{scale['rows']} tickets, {scale['clients']} clients; "
+              f"{scale['client']} has {scale['client_tickets']} tickets (median of {args.repeat} runs)")
+        for stage, timing in scale['stages'].items():
+            if 'error' in timing:
+                print(f"  {stage:<20} {timing['error']}")
+            else:
+                print(f"  {stage:<20} {timing['median_ms']:>10.2f} ms  (min {timing['min_ms']:.2f}, "
+                      f"first {timing['first_ms']:.2f})")
+
+
+if __name__ == "__main__":
+    main()
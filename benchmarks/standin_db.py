@@ -0,0 +1,263 @@
+
+"""SQLite stand-in for the SmartWorks MySQL database.
+
+Generates synthetic chatbot_portfolio_sheet and prod_ticketing tables at a
+chosen ticket volume and serves them through connection, cursor and pool
+objects shaped like mysql.connector's, so the app's report queries run
+unchanged. The MySQL functions those queries use (DATE_FORMAT, DATE_SUB,
+CURDATE, DATEDIFF) and %s placeholders are rewritten to SQLite on the fly.
+
+Names compare case-insensitively (COLLATE NOCASE), like MySQL's default
+collation. Dates are generated relative to the day the database is built,
+and a database built on an earlier day is regenerated.
+"""
+
+import itertools
+import os
+import queue
+import re
+import sqlite3
+import time
+from datetime import date, datetime
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+MONTH_NAMES = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
+CENTRES = 60
+HISTORY_DAYS = 400
+INSERT_CHUNK = 200_000
+
+CATEGORIES = np.array(['Housekeeping', 'IT', 'HVAC', 'Electrical', 'Pantry', 'Security', 'AC', None], dtype=object)
+CATEGORY_WEIGHTS = [0.22, 0.2, 0.15, 0.12, 0.12, 0.08, 0.08, 0.03]
+ESCALATION_LEVELS = np.array([None, 'L1', 'L2', 'L3'], dtype=object)
+ESCALATION_WEIGHTS = [0.8, 0.12, 0.06, 0.02]
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(sep=' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+
+
+def period_columns(as_of=None):
+    as_of = as_of or date.today()
+    period = f"{MONTH_NAMES[as_of.month - 1]}{as_of.year}"
+    return f"seat_{period}", f"revenue_{period}"
+
+
+def parse_rows(text):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    text = text.strip().lower()
+    scale = {'k': 1_000, 'm': 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip('km')) * scale)
+
+
+def client_count(rows):
+    return int(min(2000, max(20, rows // 200)))
+
+
+def client_names(count):
+    return [f"Client {index:04d}" for index in range(count)]
+
+
+@lru_cache(maxsize=256)
+def translate(query):
+    """Rewrite the MySQL dialect used by the report queries into SQLite"""
+    sql = query.replace("%s", "?")
+    sql = re.sub(r"DATE_FORMAT\(([^,()]+),\s*('[^']*')\)", r"strftime(\2, \1)", sql)
+    sql = re.sub(r"DATEDIFF\(CURDATE\(\),\s*(\w+)\)",
+                 r"CAST(julianday(date('now', 'localtime')) - julianday(\1) AS INTEGER)", sql)
+    sql = re.sub(r"DATE_SUB\(CURDATE\(\),\s*INTERVAL\s+(\d+)\s+(MONTH|DAY)\)",
+                 lambda m: f"date('now', 'localtime', '-{m.group(1)} {m.group(2).lower()}s')", sql)
+    return sql.replace("CURDATE()", "date('now', 'localtime')")
+
+
+class StandInCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def execute(self, query, params=None):
+        self._cursor.execute(translate(query), tuple(params or ()))
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=1):
+        return self._cursor.fetchmany(size)
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    _ids = itertools.count(1)
+
+    def __init__(self, path, pool=None):
+        self._db = sqlite3.connect(
+            f"file:{path}?mode=ro", uri=True, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False
+        )
+        self._pool = pool
+        self.connection_id = next(self._ids)
+
+    def cursor(self, prepared=False, **kwargs):
+        return StandInCursor(self._db.cursor())
+
+    def is_connected(self):
+        return True
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.put(self)
+        else:
+            self._db.close()
+
+
+class StandInPool:
+    """Fixed set of read-only SQLite connections; close() returns one, like a pooled MySQL connection"""
+
+    def __init__(self, path, size=6):
+        self._idle = queue.LifoQueue()
+        for _ in range(size):
+            self._idle.put(StandInConnection(path, pool=self._idle))
+
+    def get_connection(self, timeout=None):
+        return self._idle.get(timeout=timeout)
+
+
+def _portfolio_rows(names, rng, as_of):
+    seat_column, revenue_column = period_columns(as_of)
+    count = len(names)
+    seats = rng.integers(1, 300, count)
+    price = rng.lognormal(np.log(9000), 0.35, count).round(-1)
+    move_in = pd.Timestamp(as_of) - pd.to_timedelta(rng.integers(60, 1500, count), unit='D')
+    move_out = move_in + pd.to_timedelta(rng.integers(365, 1800, count), unit='D')
+    status = np.where(rng.random(count) < 0.9, 'Active', 'Inactive')
+    escalated = rng.random(count) < 0.15
+    columns = [
+        'Centre', 'Client_Name', 'Client_Id', 'Client_Move_in', 'Client_Move_out', 'Stage_Strategy', 'Status',
+        'Floor', seat_column, revenue_column, 'Escalation', 'Escalation_Frequency', 'First_Escalation_Date'
+    ]
+    rows = [
+        (
+            f"Centre {index % CENTRES:02d}", name, 10_000 + index, move_in[index].date(), move_out[index].date(),
+            ['new', 'renewal', 'expansion'][index % 3], str(status[index]), f"Floor {index % 12 + 1}",
+            int(seats[index]), float(seats[index] * price[index]),
+            'Yes' if escalated[index] else 'No', int(rng.integers(1, 6)) if escalated[index] else 0,
+            (move_in[index] + pd.Timedelta(days=30)).date() if escalated[index] else None,
+        )
+        for index, name in enumerate(names)
+    ]
+    return columns, rows
+
+
+def _ticket_chunk(names, weights, count, rng, now):
+    created = now - (rng.random(count) * HISTORY_DAYS * 86400).astype('timedelta64[s]')
+    created_text = np.char.replace(np.datetime_as_string(created, unit='s'), 'T', ' ')
+    closed = rng.random(count) < 0.75
+    tat = rng.lognormal(2.5, 0.8, count).round(2)
+    tat_missing = rng.random(count) < 0.1
+    breached = (rng.random(count) < 0.2).astype(object)
+    breached[rng.random(count) < 0.05] = None
+    return zip(
+        np.asarray(names, dtype=object)[rng.choice(len(names), count, p=weights)].tolist(),
+        created_text.tolist(),
+        np.where(closed, 'Closed', 'Open').tolist(),
+        rng.choice(CATEGORIES, count, p=CATEGORY_WEIGHTS).tolist(),
+        [f"Sub {value}" for value in rng.integers(0, 12, count).tolist()],
+        np.where(tat_missing, None, tat).tolist(),
+        breached.tolist(),
+        rng.choice(ESCALATION_LEVELS, count, p=ESCALATION_WEIGHTS).tolist(),
+        np.where(rng.random(count) < 0.6, 'Closed', 'Open').tolist(),
+    )
+
+
+def build_database(path, rows, seed=42):
+    """Create path with rows synthetic tickets; returns build metadata"""
+    start = time.perf_counter()
+    as_of = date.today()
+    rng = np.random.default_rng(seed)
+    names = client_names(client_count(rows))
+    # Skewed ticket volume: a few large clients and a long tail
+    weights = 1.0 / np.arange(1, len(names) + 1) ** 0.8
+    weights /= weights.sum()
+
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+
+    portfolio_columns, portfolio_rows = _portfolio_rows(names, rng, as_of)
+    seat_column, revenue_column = period_columns(as_of)
+    db.execute(f"""
+        CREATE TABLE chatbot_portfolio_sheet (
+            Centre TEXT, Client_Name TEXT COLLATE NOCASE, Client_Id INTEGER, Client_Move_in DATE,
+            Client_Move_out DATE, Stage_Strategy TEXT, Status TEXT, Floor TEXT, {seat_column} INTEGER,
+            {revenue_column} REAL, Escalation TEXT, Escalation_Frequency INTEGER, First_Escalation_Date DATE
+        )""")
+    db.executemany(
+        f"INSERT INTO chatbot_portfolio_sheet ({', '.join(portfolio_columns)}) "
+        f"VALUES ({', '.join('?' * len(portfolio_columns))})",
+        portfolio_rows
+    )
+    db.execute("""
+        CREATE TABLE prod_ticketing (
+            id INTEGER PRIMARY KEY, companyName TEXT COLLATE NOCASE, createdAt TIMESTAMP, clientStatus TEXT,
+            category TEXT, subCategory TEXT, TAT REAL, isDueDateBreached INTEGER, escalationLevel TEXT,
+            escalationStatus TEXT
+        )""")
+    now = np.datetime64(datetime.now().replace(microsecond=0), 's')
+    for offset in range(0, rows, INSERT_CHUNK):
+        db.executemany(
+            "INSERT INTO prod_ticketing (companyName, createdAt, clientStatus, category, subCategory, TAT, "
+            "isDueDateBreached, escalationLevel, escalationStatus) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            _ticket_chunk(names, weights, min(INSERT_CHUNK, rows - offset), rng, now)
+        )
+    db.execute("CREATE INDEX idx_ticketing_company_created ON prod_ticketing (companyName, createdAt)")
+    db.execute("CREATE INDEX idx_portfolio_client ON chatbot_portfolio_sheet (Client_Name)")
+    db.execute("CREATE INDEX idx_portfolio_centre ON chatbot_portfolio_sheet (Centre, Status)")
+    db.execute("CREATE TABLE bench_meta (key TEXT PRIMARY KEY, value TEXT)")
+    meta = {'rows': rows, 'seed': seed, 'clients': len(names), 'built_on': as_of.isoformat()}
+    db.executemany("INSERT INTO bench_meta VALUES (?, ?)", [(key, str(value)) for key, value in meta.items()])
+    db.commit()
+    db.close()
+    os.replace(tmp_path, path)
+    meta['build_seconds'] = round(time.perf_counter() - start, 2)
+    return meta
+
+
+def read_meta(path):
+    try:
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            return dict(db.execute("SELECT key, value FROM bench_meta").fetchall())
+        finally:
+            db.close()
+    except sqlite3.Error:
+        return None
+
+
+def ensure_database(data_dir, rows, seed=42, rebuild=False):
+    """Path of a stand-in database with rows tickets, building it unless a same-day copy exists"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"smartworks_{rows}_{seed}.sqlite")
+    meta = None if rebuild or not os.path.exists(path) else read_meta(path)
+    if meta and meta.get('built_on') == date.today().isoformat():
+        return path, {'rows': rows, 'seed': seed, 'clients': int(meta['clients']), 'build_seconds': None}
+    return path, build_database(path, rows, seed)
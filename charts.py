@@ -0,0 +1,186 @@
+
+"""Built-in SmartWorks report charts.
+
+Builds the four standard report figures (fig1-fig4) directly from the
+get_client_data dict, matching the layout described in graph_prompt.txt,
+without a round trip to the AI chart generator.
+"""
+
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+PRIMARY = '#1f77b4'
+RESOLVED = '#2ca02c'
+UNRESOLVED = '#d62728'
+SLA_GOOD = '#2E8B57'
+SLA_WARN = '#ff7f0e'
+SLA_BAD = '#DC143C'
+
+
+# Chart 1 - Monthly Ticket Trends (Line Chart)
+def build_monthly_trend_chart(client_data):
+    if not client_data.get('monthly_trend'):
+        return None
+    df_monthly = pd.DataFrame(client_data['monthly_trend'])
+
+    fig = go.Figure()
+    for column, name, color in [
+        ('total_tickets', 'Total Tickets', PRIMARY),
+        ('resolved_tickets', 'Resolved Tickets', RESOLVED),
+        ('unresolved_tickets', 'Unresolved Tickets', UNRESOLVED),
+    ]:
+        fig.add_trace(go.Scatter(
+            x=df_monthly['month'],
+            y=df_monthly[column],
+            name=name,
+            mode='lines+markers',
+            line=dict(width=3, color=color),
+            marker=dict(size=8),
+            hovertemplate=f'<b>%{{x}}</b><br>{name}: %{{y}}<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title='📈 Monthly Ticket Trends (Last 6 Months)',
+        xaxis_title='Month',
+        yaxis_title='Number of Tickets',
+        hovermode='x unified',
+        template='plotly_white',
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        height=400
+    )
+    return fig
+
+
+# Chart 2 - Issue Categories Breakdown (Horizontal Bar Chart)
+def build_issue_categories_chart(client_data, top_n=10):
+    if not client_data.get('issues_breakdown'):
+        return None
+    df_issues = pd.DataFrame(client_data['issues_breakdown'])
+
+    # Subcategories are rolled up so each category appears once
+    top_issues = df_issues.groupby('category', as_index=False).agg(
+        total_tickets=('total_tickets', 'sum'),
+        resolved_count=('resolved_count', 'sum')
+    ).nlargest(top_n, 'total_tickets')
+    top_issues['resolution_rate'] = (top_issues['resolved_count'] * 100.0 / top_issues['total_tickets']).round(1)
+
+    fig = px.bar(
+        top_issues,
+        y='category',
+        x='total_tickets',
+        title='🛠️ Top Issue Categories',
+        color='total_tickets',
+        color_continuous_scale='viridis',
+        orientation='h',
+        text='total_tickets'
+    )
+    fig.update_traces(
+        texttemplate='%{text}',
+        textposition='outside',
+        customdata=top_issues['resolution_rate'],
+        hovertemplate='<b>%{y}</b><br>Total Tickets: %{x}<br>Resolution Rate: %{customdata:.1f}%<extra></extra>'
+    )
+    fig.update_layout(
+        yaxis_title='Issue Category',
+        xaxis_title='Number of Tickets',
+        template='plotly_white',
+        height=400,
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    return fig
+
+
+# Chart 3 - Escalation Level Distribution (Donut Chart)
+def build_escalation_chart(client_data):
+    if not client_data.get('escalation_analysis'):
+        return None
+    df_esc = pd.DataFrame(client_data['escalation_analysis'])
+    esc_summary = df_esc.groupby('escalationLevel', as_index=False).agg(
+        ticket_count=('ticket_count', 'sum'),
+        resolved_count=('resolved_count', 'sum')
+    )
+
+    fig = px.pie(
+        esc_summary,
+        values='ticket_count',
+        names='escalationLevel',
+        title='🔺 Ticket Escalation Level Distribution',
+        hole=0.4,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate='<b>Level %{label}</b><br>Tickets: %{value}<br>Percentage: %{percent}<extra></extra>'
+    )
+    fig.add_annotation(
+        text=f"{int(esc_summary['ticket_count'].sum())}<br>Total<br>Escalated",
+        x=0.5, y=0.5,
+        font_size=16,
+        showarrow=False
+    )
+    fig.update_layout(template='plotly_white', height=400)
+    return fig
+
+
+# Chart 4 - SLA Compliance Overview (Donut Chart with Center Text)
+def build_sla_chart(client_data):
+    if not client_data.get('sla_compliance'):
+        return None
+    sla = client_data['sla_compliance'][0]
+    if not sla.get('total_tickets'):
+        return None
+
+    within_sla = sla.get('within_sla') or 0
+    sla_breached = sla.get('sla_breached') or 0
+    sla_rate = float(sla.get('sla_compliance_rate') or 0)
+    rate_color = SLA_GOOD if sla_rate >= 90 else SLA_WARN if sla_rate >= 75 else SLA_BAD
+
+    fig = go.Figure()
+    fig.add_trace(go.Pie(
+        labels=['Within SLA', 'SLA Breached'],
+        values=[within_sla, sla_breached],
+        hole=0.6,
+        marker_colors=[SLA_GOOD, SLA_BAD],
+        textinfo='label+percent',
+        textposition='outside',
+        hovertemplate='<b>%{label}</b><br>Tickets: %{value}<br>Percentage: %{percent}<extra></extra>'
+    ))
+    fig.add_annotation(
+        text=f'{sla_rate:g}%<br><b>SLA<br>Compliance</b>',
+        x=0.5, y=0.5,
+        font_size=20,
+        showarrow=False,
+        font_color=rate_color
+    )
+    fig.update_layout(
+        title='⏱️ SLA Compliance Overview (Current Month)',
+        template='plotly_white',
+        height=400,
+        showlegend=True,
+        legend=dict(orientation="h", yanchor="bottom", y=-0.1, xanchor="center", x=0.5)
+    )
+    return fig
+
+
+CHART_BUILDERS = {
+    'fig1': build_monthly_trend_chart,
+    'fig2': build_issue_categories_chart,
+    'fig3': build_escalation_chart,
+    'fig4': build_sla_chart,
+}
+
+
+def build_standard_charts(client_data):
+    """Build fig1-fig4 from client data; charts without data are left out"""
+    charts = {}
+    for chart_key, builder in CHART_BUILDERS.items():
+        try:
+            fig = builder(client_data)
+        except Exception as e:
+            print(f"❌ Error building {chart_key}: {e}")
+            fig = None
+        if fig is not None:
+            charts[chart_key] = fig
+    return charts
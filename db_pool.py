@@ -0,0 +1,216 @@
+
+"""MySQL connection pool with liveness checks, reconnect backoff and metrics.
+
+mysql.connector's built-in pool pings and reconnects every connection under
+one process-wide lock on checkout, raises immediately when it is exhausted
+and tries a single reconnect. ConnectionPool instead:
+
+- hands out idle connections LIFO (hot connections stay hot) and opens new
+  ones lazily up to `size`, making callers wait on a condition when full;
+- pings a connection on checkout only if it has been idle longer than
+  `ping_interval`, outside the pool lock;
+- reconnects dead connections with exponential backoff and full jitter,
+  so a database restart doesn't get hammered by every worker at once;
+- counts checkouts, waits, pings, reconnects and failures for the UI.
+
+Checked-out connections are returned by calling close(), like
+mysql.connector's PooledMySQLConnection.
+"""
+
+import random
+import threading
+import time
+
+import mysql.connector
+from mysql.connector import errors
+
+
+class PoolTimeout(errors.PoolError):
+    pass
+
+
+def recommended_pool_size(concurrent_sessions, queries_per_report, reserved=1):
+    """Connections so that every session can run a report's queries in parallel at once"""
+    return max(1, int(concurrent_sessions) * max(1, int(queries_per_report)) + int(reserved))
+
+
+class PooledConnection:
+    """Checked-out connection; close() gives it back to the pool"""
+
+    def __init__(self, pool, cnx):
+        self._pool = pool
+        self._cnx = cnx
+
+    def __getattr__(self, attr):
+        return getattr(self._cnx, attr)
+
+    def close(self):
+        cnx, self._cnx = self._cnx, None
+        if cnx is not None:
+            self._pool._return(cnx)
+
+
+class ConnectionPool:
+    def __init__(self, config, size=7, ping_interval=30.0, checkout_timeout=10.0, reset_session=False,
+                 reconnect_attempts=5, backoff_base=0.2, backoff_max=5.0):
+        self.config = dict(config)
+        self.size = size
+        self.ping_interval = ping_interval
+        self.checkout_timeout = checkout_timeout
+        self.reset_session = reset_session
+        self.reconnect_attempts = reconnect_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._idle = []  # (connection, returned_at), most recently returned last
+        self._open = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._metrics = {
+            'checkouts': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'timeouts': 0,
+            'pings': 0, 'ping_failures': 0, 'reconnects': 0, 'reconnect_failures': 0,
+            'connects': 0, 'discarded': 0, 'peak_in_use': 0,
+        }
+
+    def _count(self, name, amount=1):
+        with self._condition:
+            self._metrics[name] += amount
+
+    def _backoff(self, attempt):
+        # Full jitter: uniform in [0, min(max, base * 2^attempt)]
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _connect(self):
+        last_error = None
+        for attempt in range(self.reconnect_attempts):
+            try:
+                cnx = mysql.connector.connect(**self.config)
+                self._count('connects')
+                return cnx
+            except errors.Error as e:
+                last_error = e
+                if attempt + 1 < self.reconnect_attempts:
+                    time.sleep(self._backoff(attempt))
+        raise last_error
+
+    def _revive(self, cnx):
+        """Reconnect a dead connection in place; False if every attempt failed"""
+        for attempt in range(self.reconnect_attempts):
+            try:
+                cnx.reconnect(attempts=1, delay=0)
+                self._count('reconnects')
+                return True
+            except errors.Error:
+                if attempt + 1 < self.reconnect_attempts:
+                    time.sleep(self._backoff(attempt))
+        self._count('reconnect_failures')
+        return False
+
+    def _check_alive(self, cnx, idle_for):
+        if idle_for < self.ping_interval:
+            return True
+        self._count('pings')
+        try:
+            cnx.ping(reconnect=False)
+            return True
+        except errors.Error:
+            self._count('ping_failures')
+            return self._revive(cnx)
+
+    def get_connection(self, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited_from = None
+
+        with self._condition:
+            while not self._idle and self._open >= self.size:
+                waited_from = waited_from or time.monotonic()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(f"No connection available within {timeout:.1f}s (pool size {self.size})")
+                self._condition.wait(remaining)
+            if self._idle:
+                cnx, returned_at = self._idle.pop()
+            else:
+                cnx, returned_at = None, None
+                self._open += 1
+            self._in_use += 1
+            self._metrics['checkouts'] += 1
+            self._metrics['peak_in_use'] = max(self._metrics['peak_in_use'], self._in_use)
+            if waited_from is not None:
+                waited = time.monotonic() - waited_from
+                self._metrics['waits'] += 1
+                self._metrics['wait_seconds'] += waited
+                self._metrics['max_wait_seconds'] = max(self._metrics['max_wait_seconds'], waited)
+
+        # Network work happens outside the lock so one slow reconnect doesn't block other checkouts
+        try:
+            if cnx is None:
+                cnx = self._connect()
+            elif not self._check_alive(cnx, time.monotonic() - returned_at):
+                self._discard(cnx)
+                cnx = self._connect()
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        return PooledConnection(self, cnx)
+
+    def _return(self, cnx):
+        try:
+            if self.reset_session:
+                cnx.reset_session()
+            healthy = True
+        except errors.Error:
+            healthy = False
+        with self._condition:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((cnx, time.monotonic()))
+            else:
+                self._open -= 1
+                self._metrics['discarded'] += 1
+            self._condition.notify()
+        if not healthy:
+            self._disconnect(cnx)
+
+    def _discard(self, cnx):
+        self._count('discarded')
+        self._disconnect(cnx)
+
+    @staticmethod
+    def _disconnect(cnx):
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+    def ensure_alive(self, conn, max_idle=None):
+        """Ping a long-held connection if it hasn't been checked recently, reconnecting if needed"""
+        cnx = conn._cnx
+        max_idle = self.ping_interval if max_idle is None else max_idle
+        last_checked = getattr(cnx, '_smartworks_checked_at', None)
+        if last_checked is not None and time.monotonic() - last_checked < max_idle:
+            return True
+        alive = self._check_alive(cnx, float('inf'))
+        if alive:
+            cnx._smartworks_checked_at = time.monotonic()
+        return alive
+
+    def close_all(self):
+        with self._condition:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for cnx, _ in idle:
+            self._disconnect(cnx)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._metrics)
+            stats.update({'size': self.size, 'open': self._open, 'idle': len(self._idle), 'in_use': self._in_use})
+        stats['wait_seconds'] = round(stats['wait_seconds'], 3)
+        stats['max_wait_seconds'] = round(stats['max_wait_seconds'], 3)
+        return stats
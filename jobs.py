@@ -0,0 +1,280 @@
+
+"""Background report jobs that outlive the Streamlit script run that started them.
+
+A JobQueue runs report pipelines on a bounded thread pool shared by every
+session, so one long report no longer blocks its session's script thread
+and several reports run at once. Each job has an id and a record (status,
+progress step, streamed partial narrative, result metadata or error) that
+the UI polls on each rerun. Records are also written as JSON manifests
+under manifest_dir.
+
+Jobs belong to the session that submitted them (an owner id, not the login:
+several people share each role account). The owner heartbeats while it is
+polling; another session of the same login may claim a finished job only
+once its owner has been silent for a grace period, e.g. after a dropped
+websocket. Jobs that were still queued or running when the process stopped
+are marked failed on the next start.
+
+Job functions run without a Streamlit script context: they must report
+through the JobProgress handle they are given and never call st.*.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+ACTIVE = (QUEUED, RUNNING)
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobError(Exception):
+    """Expected job failure; its message is shown to the user as is"""
+
+
+def new_job_id():
+    return uuid.uuid4().hex[:12]
+
+
+class JobProgress:
+    """Progress handle passed to a job function.
+
+    Besides step(), it has the markdown(text) method of a Streamlit container, so it can be
+    passed wherever the pipeline streams the narrative (stream_to / report_container).
+    """
+
+    def __init__(self, queue, job_id):
+        self._queue = queue
+        self.job_id = job_id
+
+    def step(self, step, total, message):
+        self._queue._update(job_id=self.job_id, step=step, total_steps=total, message=message)
+
+    def markdown(self, text):
+        # Partial narrative changes many times per second; keep it in memory only
+        self._queue._update(job_id=self.job_id, persist=False, partial_text=text)
+
+
+class JobQueue:
+    def __init__(self, max_workers=4, manifest_dir=None, max_jobs=500):
+        self.max_workers = max_workers
+        self.manifest_dir = manifest_dir
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sw_job")
+        self._jobs = {}  # job_id -> record
+        self._futures = {}
+        self._lock = threading.Lock()
+        # Snapshots are taken under _lock but written after it; _written keeps an older one from landing last
+        self._write_lock = threading.Lock()
+        self._written = {}  # job_id -> version of its manifest on disk
+        if manifest_dir:
+            os.makedirs(manifest_dir, exist_ok=True)
+            self._load_manifests()
+
+    def submit(self, fn, user, label, owner=None, **metadata):
+        """Queue fn(progress) for the session owner and return the job id; fn returns a JSON-serializable dict"""
+        job_id = new_job_id()
+        record = {
+            'job_id': job_id,
+            'user': user,
+            'owner': owner,
+            'owner_seen_at': time.time(),
+            'label': label,
+            'metadata': metadata,
+            'status': QUEUED,
+            'step': 0,
+            'total_steps': 0,
+            'message': "Waiting for a free worker...",
+            'partial_text': None,
+            'result': None,
+            'error': None,
+            'submitted_at': datetime.now().isoformat(timespec='seconds'),
+            'started_at': None,
+            'finished_at': None,
+            'collected': False,
+            'cancel_requested': False,
+            'version': 1,
+        }
+        self._persist(record)
+        with self._lock:
+            self._jobs[job_id] = record
+            self._prune()
+            # Under the lock, so a job that finishes at once cannot pop its future before it is stored
+            self._futures[job_id] = self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _run(self, job_id, fn):
+        # Leave QUEUED in one step, so cancel() either wins before this or sees RUNNING
+        now = datetime.now().isoformat(timespec='seconds')
+        with self._lock:
+            record = self._jobs[job_id]
+            if record['cancel_requested']:
+                record.update(status=CANCELLED, message="Cancelled", finished_at=now)
+                self._futures.pop(job_id, None)
+            else:
+                record.update(status=RUNNING, message="Starting...", started_at=now)
+            snapshot = self._snapshot(record)
+        self._persist(snapshot)
+        if snapshot['status'] == CANCELLED:
+            return
+        start = time.perf_counter()
+        try:
+            result = fn(JobProgress(self, job_id))
+            fields = {'status': DONE, 'result': result, 'message': "Done"}
+        except JobError as e:
+            fields = {'status': FAILED, 'error': str(e), 'message': "Failed"}
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {type(e).__name__}: {e}")
+            fields = {'status': FAILED, 'error': f"{type(e).__name__}: {e}", 'message': "Failed"}
+        self._update(job_id=job_id, partial_text=None, seconds=round(time.perf_counter() - start, 2),
+                     finished_at=datetime.now().isoformat(timespec='seconds'), **fields)
+        with self._lock:
+            self._futures.pop(job_id, None)
+
+    def get(self, job_id):
+        """Copy of the job record, or None for an unknown (or pruned) job id"""
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record else None
+
+    def list(self, user=None, owner=None, statuses=None, collected=None):
+        """Copies of matching job records, newest first"""
+        with self._lock:
+            records = [
+                dict(record) for record in self._jobs.values()
+                if (user is None or record['user'] == user)
+                and (owner is None or record.get('owner') == owner)
+                and (statuses is None or record['status'] in statuses)
+                and (collected is None or record['collected'] == collected)
+            ]
+        return sorted(records, key=lambda record: record['submitted_at'], reverse=True)
+
+    def heartbeat(self, owner):
+        """The owner session is still polling; its jobs stay reserved for it"""
+        now = time.time()
+        with self._lock:
+            for record in self._jobs.values():
+                if record.get('owner') == owner:
+                    record['owner_seen_at'] = now
+
+    def claim(self, job_id, owner, orphan_after=60.0):
+        """Mark a finished job as collected by owner; True for exactly one caller.
+
+        Another session's job can only be claimed once that session has not heartbeated for
+        orphan_after seconds.
+        """
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None or record['status'] not in FINISHED or record['collected']:
+                return False
+            if record.get('owner') != owner and time.time() - record.get('owner_seen_at', 0) < orphan_after:
+                return False
+            record['collected'] = True
+            snapshot = self._snapshot(record)
+        self._persist(snapshot)
+        return True
+
+    def cancel(self, job_id):
+        """Cancel a queued job; returns False once it has started running"""
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None or record['status'] != QUEUED:
+                return False
+            # A worker that already picked the job up sees this flag before it starts running it
+            record['cancel_requested'] = True
+            future = self._futures.pop(job_id, None)
+        if future is not None and future.cancel():
+            self._update(job_id=job_id, status=CANCELLED, message="Cancelled",
+                         finished_at=datetime.now().isoformat(timespec='seconds'))
+        return True
+
+    def stats(self):
+        with self._lock:
+            counts = {status: 0 for status in ACTIVE + FINISHED}
+            for record in self._jobs.values():
+                counts[record['status']] += 1
+        return {'workers': self.max_workers, **counts}
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def _update(self, job_id, persist=True, **fields):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return
+            record.update(fields)
+            snapshot = self._snapshot(record)
+        if persist:
+            self._persist(snapshot)
+
+    @staticmethod
+    def _snapshot(record):
+        # Called under _lock: each change gets a higher version than any snapshot taken before it
+        record['version'] = record.get('version', 0) + 1
+        return dict(record)
+
+    def _manifest_path(self, job_id):
+        return os.path.join(self.manifest_dir, f"{job_id}.json")
+
+    def _persist(self, record):
+        if not self.manifest_dir:
+            return
+        path = self._manifest_path(record['job_id'])
+        version = record.get('version', 0)
+        with self._write_lock:
+            if version <= self._written.get(record['job_id'], -1):
+                return
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump({**record, 'partial_text': None}, f, default=str)
+                os.replace(tmp_path, path)
+                self._written[record['job_id']] = version
+            except OSError as e:
+                print(f"Warning: could not write job manifest {path}: {e}")
+
+    def _load_manifests(self):
+        for file_name in os.listdir(self.manifest_dir):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.manifest_dir, file_name), encoding='utf-8') as f:
+                    record = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Warning: skipping unreadable job manifest {file_name}: {e}")
+                continue
+            if record.get('status') in ACTIVE:
+                # The process that ran it is gone
+                record.update(status=FAILED, error="Interrupted by an app restart", message="Failed",
+                              finished_at=datetime.now().isoformat(timespec='seconds'))
+                self._persist(self._snapshot(record))
+            else:
+                self._written[record['job_id']] = record.get('version', 0)
+            self._jobs[record['job_id']] = record
+        with self._lock:
+            self._prune()
+
+    def _prune(self):
+        # Oldest finished jobs go first; active jobs are never dropped
+        finished = sorted(
+            (record for record in self._jobs.values() if record['status'] in FINISHED),
+            key=lambda record: record['submitted_at']
+        )
+        for record in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[record['job_id']]
+            self._written.pop(record['job_id'], None)
+            if self.manifest_dir:
+                try:
+                    os.remove(self._manifest_path(record['job_id']))
+                except OSError:
+                    pass
@@ -0,0 +1,135 @@
+
+"""In-memory client name index with prefix and fuzzy lookup.
+
+Names are normalized (case-folded, whitespace collapsed) and kept in a
+sorted list for prefix search with bisect, plus a trigram inverted index
+for typo-tolerant matching. Candidates from the trigram index are ranked
+by trigram similarity and confirmed with a bounded edit distance, so a
+lookup over tens of thousands of names stays within a few milliseconds.
+"""
+
+import bisect
+import threading
+import time
+from collections import defaultdict
+
+
+def normalize_name(name):
+    return " ".join(str(name).split()).casefold()
+
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, stopping early once it exceeds max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char_a != char_b)
+            ))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class ClientNameIndex:
+    def __init__(self, names=()):
+        self._lock = threading.Lock()
+        self.loaded_at = None
+        # Reload bookkeeping for the owner: one reload at a time, and when the last one was tried
+        self.refresh_lock = threading.Lock()
+        self.attempted_at = None
+        self.build(names)
+
+    def build(self, names):
+        display = {}
+        for name in names:
+            if name and str(name).strip():
+                display.setdefault(normalize_name(name), " ".join(str(name).split()))
+        keys = sorted(display)
+        grams = defaultdict(list)
+        for position, key in enumerate(keys):
+            for gram in trigrams(key):
+                grams[gram].append(position)
+        gram_sizes = [len(trigrams(key)) for key in keys]
+        with self._lock:
+            self._display = display
+            self._keys = keys
+            self._grams = dict(grams)
+            self._gram_sizes = gram_sizes
+            self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def exact(self, name):
+        """Canonical spelling of name if it is in the index, else None"""
+        return self._display.get(normalize_name(name))
+
+    def prefix(self, query, limit=10):
+        with self._lock:
+            keys, display = self._keys, self._display
+        query = normalize_name(query)
+        start = bisect.bisect_left(keys, query)
+        matches = []
+        for key in keys[start:start + limit]:
+            if not key.startswith(query):
+                break
+            matches.append(display[key])
+        return matches
+
+    def fuzzy(self, query, limit=10, min_similarity=0.2, max_distance=None):
+        with self._lock:
+            keys, display, grams, gram_sizes = self._keys, self._display, self._grams, self._gram_sizes
+        query = normalize_name(query)
+        if not query:
+            return []
+        query_grams = trigrams(query)
+        counts = defaultdict(int)
+        for gram in query_grams:
+            for position in grams.get(gram, ()):
+                counts[position] += 1
+
+        scored = []
+        query_size = len(query_grams)
+        for position, shared in counts.items():
+            similarity = shared / (query_size + gram_sizes[position] - shared)
+            if similarity >= min_similarity:
+                scored.append((similarity, keys[position]))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        if max_distance is None:
+            max_distance = max(1, len(query) // 3)
+        results = []
+        for similarity, key in scored[:limit * 5]:
+            # Substring hits (e.g. "swiggy" in "swiggy instamart") are always kept; typos are
+            # checked against both the whole name and its leading part ("zomatto" vs "zomato ltd")
+            if (query in key or similarity >= 0.5
+                    or edit_distance(query, key, max_distance) <= max_distance
+                    or any(edit_distance(query, key[:len(query) + extra], max_distance) <= max_distance
+                           for extra in (-1, 0, 1))):
+                results.append(display[key])
+            if len(results) >= limit:
+                break
+        return results
+
+    def suggest(self, query, limit=10):
+        """Prefix matches first, then fuzzy matches, without duplicates"""
+        suggestions = self.prefix(query, limit)
+        if len(suggestions) < limit:
+            for name in self.fuzzy(query, limit):
+                if name not in suggestions:
+                    suggestions.append(name)
+                if len(suggestions) >= limit:
+                    break
+        return suggestions
@@ -0,0 +1,190 @@
+
+"""Portfolio-wide KPIs for every active SmartWorks client in one bulk pass.
+
+Two queries feed the portfolio view: the active rows of
+chatbot_portfolio_sheet (seats and revenue for the analysis month) and one
+row of ticket totals per companyName over the trend window, read from the
+client_ticket_rollup table when it is fresh or from prod_ticketing
+otherwise. Both are fetched as NumPy columns and all KPIs are computed with
+vectorized pandas operations, so ranking ~2,000 clients costs two queries
+instead of 2,000 reports.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ticket_rollup import ROLLUP_TABLE
+
+TICKET_TOTAL_COLUMNS = [
+    'companyName', 'ticket_count', 'closed_count', 'open_count', 'closed_tat_sum', 'closed_tat_count',
+    'within_sla_count', 'breached_count', 'escalated_count'
+]
+
+TICKET_MEASURES = TICKET_TOTAL_COLUMNS[1:]
+
+PRICE_PERCENTILES = [25, 50, 75, 90]
+
+
+def build_portfolio_query(seat_column, revenue_column):
+    """Active portfolio rows with the analysis month's seats and revenue (columns are pre-validated)"""
+    return f"""
+        SELECT
+            Centre as centre,
+            Client_Name as client_name,
+            COALESCE({seat_column}, 0) as seats,
+            COALESCE({revenue_column}, 0) as revenue
+        FROM chatbot_portfolio_sheet
+        WHERE Status = 'Active'
+            AND Client_Name IS NOT NULL
+        """
+
+
+def build_ticket_totals_query(source="rollup", months=6):
+    """One row of ticket totals per companyName over the trend window, from the rollup or raw tickets"""
+    if source == "rollup":
+        measures = ",\n            ".join(
+            f"SUM({measure}) as {measure}" for measure in TICKET_MEASURES if measure != 'escalated_count'
+        )
+        return f"""
+        SELECT
+            companyName,
+            {measures},
+            SUM(CASE WHEN escalationLevel IS NOT NULL THEN ticket_count ELSE 0 END) as escalated_count
+        FROM {ROLLUP_TABLE}
+        WHERE month_start >= DATE_SUB(DATE_SUB(CURDATE(), INTERVAL DAYOFMONTH(CURDATE()) - 1 DAY), INTERVAL {int(months)} MONTH)
+        GROUP BY companyName
+        """
+    return f"""
+        SELECT
+            companyName,
+            COUNT(*) as ticket_count,
+            COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as closed_count,
+            COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as open_count,
+            SUM(CASE WHEN clientStatus = 'Closed' THEN TAT END) as closed_tat_sum,
+            COUNT(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN 1 END) as closed_tat_count,
+            COUNT(CASE WHEN isDueDateBreached = 0 THEN 1 END) as within_sla_count,
+            COUNT(CASE WHEN isDueDateBreached = 1 THEN 1 END) as breached_count,
+            COUNT(escalationLevel) as escalated_count
+        FROM prod_ticketing
+        WHERE createdAt >= DATE_SUB(CURDATE(), INTERVAL {int(months)} MONTH)
+            AND companyName IS NOT NULL
+        GROUP BY companyName
+        """
+
+
+def normalize_names(names):
+    """Vectorized normalize_client_name: collapse whitespace and casefold"""
+    return pd.Series(names, dtype=object).fillna('').astype(str).str.split().str.join(' ').str.casefold()
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.round(np.where(denominator > 0, numerator * scale / denominator, np.nan), 2)
+
+
+def _portfolio_frame(portfolio_columns):
+    portfolio = pd.DataFrame(portfolio_columns, columns=['centre', 'client_name', 'seats', 'revenue'])
+    portfolio['seats'] = pd.to_numeric(portfolio['seats'], errors='coerce').fillna(0.0).astype(float)
+    portfolio['revenue'] = pd.to_numeric(portfolio['revenue'], errors='coerce').fillna(0.0).astype(float)
+    portfolio['key'] = normalize_names(portfolio['client_name']).to_numpy()
+    return portfolio
+
+
+def _ticket_frame(ticket_columns):
+    tickets = pd.DataFrame(ticket_columns, columns=TICKET_TOTAL_COLUMNS)
+    for measure in TICKET_MEASURES:
+        tickets[measure] = pd.to_numeric(tickets[measure], errors='coerce').fillna(0.0).astype(float)
+    tickets['key'] = normalize_names(tickets['companyName']).to_numpy()
+    # The same client can appear under differently spaced or cased companyName values
+    return tickets.groupby('key', sort=False)[TICKET_MEASURES].sum()
+
+
+def _add_ticket_kpis(frame, seats):
+    frame['tickets_per_seat'] = _ratio(frame['ticket_count'], seats)
+    frame['resolution_rate'] = _ratio(frame['closed_count'], frame['ticket_count'], 100.0)
+    frame['avg_tat'] = _ratio(frame['closed_tat_sum'], frame['closed_tat_count'])
+    frame['sla_compliance_rate'] = _ratio(frame['within_sla_count'], frame['ticket_count'], 100.0)
+    frame['escalation_rate'] = _ratio(frame['escalated_count'], frame['ticket_count'], 100.0)
+    return frame
+
+
+def compute_portfolio_kpis(portfolio_columns, ticket_columns):
+    """Per-client and per-centre KPI frames.
+
+    portfolio_columns holds centre, client_name, seats and revenue; ticket_columns holds
+    TICKET_TOTAL_COLUMNS. Either may be {column: array} or a list of rows in that order.
+
+    Clients are matched to tickets on the normalized name. A client renting in several
+    centres is attributed to each centre in proportion to its seats there.
+    """
+    portfolio = _portfolio_frame(portfolio_columns)
+    tickets = _ticket_frame(ticket_columns)
+
+    # Per centre and client first, so repeated rows (one per floor) are summed
+    rows = portfolio.groupby(['key', 'centre'], sort=False).agg(
+        client_name=('client_name', 'first'),
+        seats=('seats', 'sum'),
+        revenue=('revenue', 'sum'),
+    ).reset_index()
+    # Same rule as center_avg_pricing: a price only when both seats and revenue are positive
+    rows['price_per_seat'] = _ratio(rows['revenue'].where(rows['revenue'] > 0), rows['seats'])
+    rows['price_percentile'] = rows.groupby('centre')['price_per_seat'].rank(pct=True).mul(100).round(1)
+
+    # Clients
+    clients = rows.groupby('key', sort=False).agg(
+        client_name=('client_name', 'first'),
+        seats=('seats', 'sum'),
+        revenue=('revenue', 'sum'),
+        centres=('centre', 'nunique'),
+    )
+    primary_centre = rows.sort_values('seats', kind='mergesort').drop_duplicates('key', keep='last')
+    primary_centre = primary_centre.set_index('key')
+    clients['centre'] = primary_centre['centre']
+    clients['price_per_seat'] = _ratio(clients['revenue'].where(clients['revenue'] > 0), clients['seats'])
+    clients = clients.join(tickets, how='left')
+    clients[TICKET_MEASURES] = clients[TICKET_MEASURES].fillna(0.0)
+    _add_ticket_kpis(clients, clients['seats'])
+
+    # Price position against the client's primary centre
+    centre_median = rows.groupby('centre')['price_per_seat'].median()
+    clients['centre_median_price'] = clients['centre'].map(centre_median).round(2)
+    clients['price_vs_centre_pct'] = _ratio(
+        clients['price_per_seat'] - clients['centre_median_price'], clients['centre_median_price'], 100.0
+    )
+    clients['price_percentile_in_centre'] = primary_centre['price_percentile']
+
+    # Centres: ticket totals split across a client's centres by seat share
+    client_seats = rows.groupby('key')['seats'].transform('sum')
+    client_rows = rows.groupby('key')['seats'].transform('size')
+    share = np.where(client_seats > 0, rows['seats'] / client_seats.where(client_seats > 0), 1.0 / client_rows)
+    allocated = tickets.reindex(rows['key']).fillna(0.0).to_numpy() * share[:, None]
+    centre_rows = pd.concat([rows, pd.DataFrame(allocated, columns=TICKET_MEASURES, index=rows.index)], axis=1)
+
+    centres = centre_rows.groupby('centre').agg(
+        clients=('key', 'nunique'),
+        seats=('seats', 'sum'),
+        revenue=('revenue', 'sum'),
+        avg_price_per_seat=('price_per_seat', 'mean'),
+        **{measure: (measure, 'sum') for measure in TICKET_MEASURES}
+    )
+    centres['avg_price_per_seat'] = centres['avg_price_per_seat'].round(2)
+    centre_prices = rows.groupby('centre')['price_per_seat']
+    for percentile in PRICE_PERCENTILES:
+        centres[f'price_p{percentile}'] = centre_prices.quantile(percentile / 100).reindex(centres.index).round(2)
+    _add_ticket_kpis(centres, centres['seats'])
+
+    client_view = clients.reset_index(drop=True)[[
+        'client_name', 'centre', 'centres', 'seats', 'revenue', 'price_per_seat', 'centre_median_price',
+        'price_vs_centre_pct', 'price_percentile_in_centre', 'ticket_count', 'tickets_per_seat',
+        'resolution_rate', 'avg_tat', 'sla_compliance_rate', 'escalation_rate'
+    ]]
+    centre_view = centres.reset_index()[[
+        'centre', 'clients', 'seats', 'revenue', 'avg_price_per_seat',
+        *[f'price_p{percentile}' for percentile in PRICE_PERCENTILES],
+        'ticket_count', 'tickets_per_seat', 'resolution_rate', 'avg_tat', 'sla_compliance_rate', 'escalation_rate'
+    ]]
+    client_view['ticket_count'] = client_view['ticket_count'].astype(np.int64)
+    centre_view['ticket_count'] = centre_view['ticket_count'].round().astype(np.int64)
+    return client_view, centre_view
@@ -0,0 +1,116 @@
+
+"""Structured, level-controlled logging for SmartWorks database queries.
+
+Each query produces at most one log record carrying the query name,
+duration, row count and a short fingerprint of its parameters and SQL
+text, instead of the full statement. Slow queries (SLOW_QUERY_MS) and
+errors are always logged; ordinary queries are logged at INFO for a
+sampled fraction (QUERY_LOG_SAMPLE_RATE). The full SQL is only rendered
+when the logger is at DEBUG.
+
+Records are written as JSON lines by default (LOG_FORMAT=json) so they
+can be searched and aggregated, or as plain text (LOG_FORMAT=text).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+LOGGER_NAME = "smartworks"
+QUERY_FIELDS = ('query', 'duration_ms', 'rows', 'params_fp', 'sql_fp', 'slow', 'error')
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in QUERY_FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        fields = " ".join(f"{field}={getattr(record, field)}" for field in QUERY_FIELDS if hasattr(record, field))
+        return f"{text} {fields}" if fields else text
+
+
+def configure_logging(level=None, fmt=None, stream=None):
+    """Configure the smartworks logger once per process; later calls only update the level"""
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(str(level or os.getenv("LOG_LEVEL", "INFO")).upper())
+    if not any(getattr(handler, '_smartworks', False) for handler in logger.handlers):
+        handler = logging.StreamHandler(stream or sys.stdout)
+        if str(fmt or os.getenv("LOG_FORMAT", "json")).lower() == "text":
+            handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        else:
+            handler.setFormatter(JsonFormatter())
+        handler._smartworks = True
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+def fingerprint(value):
+    """Short stable hash, so identical parameters can be grouped without logging client names"""
+    if value is None:
+        return None
+    return hashlib.sha1(repr(value).encode("utf-8")).hexdigest()[:12]
+
+
+def sql_fingerprint(query):
+    """Fingerprint of the SQL shape: whitespace collapsed, quoted literals and numbers replaced"""
+    shape = _LITERAL_RE.sub("?", query)
+    shape = re.sub(r"\b\d+\b", "?", shape)
+    return fingerprint(" ".join(shape.split()))
+
+
+class QueryLogger:
+    def __init__(self, logger=None, slow_ms=None, sample_rate=None):
+        self.logger = logger or logging.getLogger(f"{LOGGER_NAME}.db")
+        self.slow_ms = float(slow_ms if slow_ms is not None else os.getenv("SLOW_QUERY_MS", 1000))
+        self.sample_rate = float(sample_rate if sample_rate is not None else os.getenv("QUERY_LOG_SAMPLE_RATE", 0.1))
+
+    def log(self, query_name, query, duration, rows=None, params=None, error=None):
+        duration_ms = round(duration * 1000, 2)
+        slow = duration_ms >= self.slow_ms
+        if error is not None:
+            level = logging.ERROR
+        elif slow:
+            level = logging.WARNING
+        elif self.logger.isEnabledFor(logging.DEBUG) or random.random() < self.sample_rate:
+            level = logging.INFO
+        else:
+            return
+        if not self.logger.isEnabledFor(level):
+            return
+
+        extra = {
+            'query': query_name,
+            'duration_ms': duration_ms,
+            'rows': rows,
+            # Queries with inlined values are fingerprinted on their string literals instead
+            'params_fp': fingerprint(params) if params else fingerprint(_LITERAL_RE.findall(query) or None),
+            'sql_fp': sql_fingerprint(query),
+            'slow': slow,
+        }
+        if error is not None:
+            extra['error'] = str(error)
+        message = "query failed" if error is not None else "slow query" if slow else "query"
+        self.logger.log(level, message, extra=extra)
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug("sql %s:\n%s", query_name, query, extra={'query': query_name})
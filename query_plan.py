@@ -0,0 +1,329 @@
+
+"""Query plan inspection and index advice for the SmartWorks report queries.
+
+Runs EXPLAIN (or EXPLAIN ANALYZE, which executes the query) for each report
+query and flags plans that regress: full table scans, full index scans,
+filesorts and temporary tables. The SQL text itself is checked for
+non-sargable predicates such as YEAR(createdAt) = ..., which stop MySQL
+from using an index on the column, and composite indexes are suggested
+from the equality and range predicates of each SELECT block.
+
+Check the report queries for a client from the command line:
+
+    python query_plan.py --client "Zomato"
+    python query_plan.py --client "Zomato" --analyze --json
+
+Findings that are known and accepted are listed in an allow-list file
+(query_plan_allowlist.txt by default, one "query: finding" glob per line);
+the command only fails on findings that are not on it, or on query errors.
+Record the current findings with --update-allowlist.
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import sys
+
+DEFAULT_ALLOWLIST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "query_plan_allowlist.txt")
+
+# Functions that hide the column from the optimizer when applied to it in a WHERE clause
+NON_SARGABLE_FUNCTIONS = (
+    'YEAR', 'MONTH', 'DAY', 'DATE', 'DATE_FORMAT', 'LOWER', 'UPPER', 'TRIM',
+    'COALESCE', 'IFNULL', 'CAST', 'SUBSTRING', 'LEFT', 'CONCAT'
+)
+
+# Access types from traditional EXPLAIN output that read the whole table or index
+FULL_SCAN_TYPES = {'ALL': 'full table scan', 'index': 'full index scan'}
+
+CLAUSE_END = r'\b(?:GROUP\s+BY|ORDER\s+BY|HAVING|LIMIT|UNION|WINDOW)\b'
+IDENTIFIER = r'(?:\w+\.)?`?(\w+)`?'
+
+_FUNCTION_RE = re.compile(
+    r'\b(' + '|'.join(NON_SARGABLE_FUNCTIONS) + r')\s*\(\s*' + IDENTIFIER, re.IGNORECASE
+)
+_EQUALITY_RE = re.compile(r'(?<![\w(])' + IDENTIFIER + r'\s*(=|\bIN\s*\()', re.IGNORECASE)
+_RANGE_RE = re.compile(r'(?<![\w(])' + IDENTIFIER + r'\s*(>=|<=|<(?!>)|>|\bBETWEEN\b)', re.IGNORECASE)
+_LEADING_WILDCARD_RE = re.compile(IDENTIFIER + r"\s+LIKE\s+'%", re.IGNORECASE)
+_FROM_RE = re.compile(r'\bFROM\s+`?(\w+)`?', re.IGNORECASE)
+_WHERE_RE = re.compile(r'\bWHERE\b(.*?)(?=' + CLAUSE_END + r'|$)', re.IGNORECASE | re.DOTALL)
+_SQL_KEYWORDS = {'and', 'or', 'not', 'null', 'is', 'select', 'case', 'when', 'then', 'else', 'end'}
+_ROWS_EXAMINED_RE = re.compile(r'\s*\(~[^)]*rows examined\)')
+
+
+def split_select_blocks(query):
+    """Split a query into its outer SELECT and each parenthesized sub-SELECT, innermost last"""
+    blocks = []
+    text = query
+    while True:
+        match = re.search(r'\(\s*SELECT\b', text, re.IGNORECASE)
+        if not match:
+            break
+        depth = 0
+        for end in range(match.start(), len(text)):
+            if text[end] == '(':
+                depth += 1
+            elif text[end] == ')':
+                depth -= 1
+                if depth == 0:
+                    break
+        inner = text[match.start() + 1:end]
+        blocks.extend(split_select_blocks(inner))
+        text = text[:match.start()] + '(?)' + text[end + 1:]
+    return [text] + blocks
+
+
+def _where_clause(block):
+    match = _WHERE_RE.search(block)
+    return match.group(1) if match else ""
+
+
+def find_non_sargable(query):
+    """Predicates that wrap a column in a function or start LIKE with a wildcard"""
+    findings = []
+    for block in split_select_blocks(query):
+        where = _where_clause(block)
+        for function, column in _FUNCTION_RE.findall(where):
+            findings.append(f"{function.upper()}({column}) in WHERE prevents index use on {column}")
+        for column in _LEADING_WILDCARD_RE.findall(where):
+            findings.append(f"LIKE '%...' on {column} cannot use an index")
+    return list(dict.fromkeys(findings))
+
+
+def suggest_indexes(query):
+    """Composite index suggestions per table: equality columns first, then one range column"""
+    suggestions = []
+    for block in split_select_blocks(query):
+        table = _FROM_RE.search(block)
+        where = _where_clause(block)
+        if not table or not where:
+            continue
+        # Predicates on function results can't use the index, so drop them before matching columns
+        plain = _FUNCTION_RE.sub('?(', where)
+        # Single-value equality first: an IN list is a range scan for the columns after it
+        matches = [(column, op) for column, op in _EQUALITY_RE.findall(plain) if column.lower() not in _SQL_KEYWORDS]
+        equality = [column for column, op in matches if op == '='] + [column for column, op in matches if op != '=']
+        ranges = [column for column, _ in _RANGE_RE.findall(plain)
+                  if column.lower() not in _SQL_KEYWORDS and column not in equality]
+        columns = list(dict.fromkeys(equality + ranges[:1]))
+        if columns:
+            suggestions.append({'table': table.group(1), 'columns': columns})
+    return suggestions
+
+
+def index_ddl(table, columns):
+    name = f"idx_{table}_{'_'.join(columns)}"[:64]
+    return f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"
+
+
+def get_existing_indexes(cursor, table):
+    """Column lists of the indexes on a table, in index order"""
+    cursor.execute(f"SHOW INDEX FROM {table}")
+    columns = [col[0] for col in cursor.description]
+    indexes = {}
+    for row in cursor.fetchall():
+        row = dict(zip(columns, row))
+        indexes.setdefault(row['Key_name'], []).append((row['Seq_in_index'], row['Column_name']))
+    return [[column for _, column in sorted(parts)] for parts in indexes.values()]
+
+
+def is_covered(columns, existing_indexes):
+    """True if an existing index starts with the suggested columns"""
+    wanted = [column.lower() for column in columns]
+    return any([column.lower() for column in index[:len(wanted)]] == wanted for index in existing_indexes)
+
+
+def explain_query(cursor, query, params=None, analyze=False):
+    """EXPLAIN rows as dicts; EXPLAIN ANALYZE returns a single row holding the plan tree"""
+    statement = ("EXPLAIN ANALYZE " if analyze else "EXPLAIN ") + query
+    if params:
+        cursor.execute(statement, params)
+    else:
+        cursor.execute(statement)
+    columns = [col[0] for col in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def analyze_plan(plan_rows, analyze=False):
+    """Flag scans, filesorts and temporary tables in EXPLAIN or EXPLAIN ANALYZE output"""
+    findings = []
+    if analyze:
+        for row in plan_rows:
+            tree = str(next(iter(row.values()), ""))
+            for table in re.findall(r'Table scan on (\w+)', tree):
+                findings.append(f"full table scan on {table}")
+            for table in re.findall(r'Index scan on (\w+)', tree):
+                findings.append(f"full index scan on {table}")
+            if re.search(r'\bSort\b', tree) and 'using index' not in tree.lower():
+                findings.append("sort step (filesort)")
+            if 'temporary table' in tree.lower():
+                findings.append("temporary table")
+        return list(dict.fromkeys(findings))
+
+    for row in plan_rows:
+        table = row.get('table')
+        access = row.get('type')
+        extra = str(row.get('Extra') or '')
+        if access in FULL_SCAN_TYPES and table and not table.startswith('<'):
+            findings.append(f"{FULL_SCAN_TYPES[access]} on {table} (~{row.get('rows')} rows examined)")
+        if row.get('possible_keys') and not row.get('key'):
+            findings.append(f"index available on {table} but not used ({row['possible_keys']})")
+        if 'Using filesort' in extra:
+            findings.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            findings.append(f"temporary table for {table}")
+    return list(dict.fromkeys(findings))
+
+
+def inspect_queries(cursor, queries, params=None, analyze=False):
+    """Plan report for each named query plus deduplicated index suggestions.
+
+    params maps query name -> bound parameters for queries that use placeholders.
+    """
+    params = params or {}
+    report = {'queries': {}, 'index_suggestions': []}
+    existing = {}
+    seen = set()
+
+    for query_name, query in queries.items():
+        entry = {
+            'non_sargable': find_non_sargable(query),
+            'plan': [],
+            'plan_findings': [],
+            'error': None,
+        }
+        try:
+            entry['plan'] = explain_query(cursor, query, params.get(query_name), analyze=analyze)
+            entry['plan_findings'] = analyze_plan(entry['plan'], analyze=analyze)
+        except Exception as e:
+            entry['error'] = str(e)
+
+        for suggestion in suggest_indexes(query):
+            table, columns = suggestion['table'], suggestion['columns']
+            key = (table, tuple(columns))
+            if key in seen:
+                continue
+            seen.add(key)
+            if table not in existing:
+                try:
+                    existing[table] = get_existing_indexes(cursor, table)
+                except Exception:
+                    existing[table] = []
+            if not is_covered(columns, existing[table]):
+                report['index_suggestions'].append({
+                    'table': table,
+                    'columns': columns,
+                    'ddl': index_ddl(table, columns),
+                    'query': query_name,
+                })
+        report['queries'][query_name] = entry
+
+    # An index on (a) is redundant next to a suggested (a, b)
+    report['index_suggestions'] = [
+        suggestion for suggestion in report['index_suggestions']
+        if not any(other is not suggestion and other['table'] == suggestion['table']
+                   and len(other['columns']) > len(suggestion['columns'])
+                   and other['columns'][:len(suggestion['columns'])] == suggestion['columns']
+                   for other in report['index_suggestions'])
+    ]
+    report['issues'] = sum(
+        len(entry['non_sargable']) + len(entry['plan_findings']) + (1 if entry['error'] else 0)
+        for entry in report['queries'].values()
+    )
+    return report
+
+
+def report_findings(report):
+    """Every non-sargable and plan finding as "query: finding", without row estimates that vary with the data"""
+    return [
+        f"{query_name}: {_ROWS_EXAMINED_RE.sub('', finding)}"
+        for query_name, entry in report['queries'].items()
+        for finding in entry['non_sargable'] + entry['plan_findings']
+    ]
+
+
+def load_allowlist(path):
+    """Glob patterns from an allow-list file; blank lines and # comments are skipped, a missing file is empty"""
+    if not path or not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def write_allowlist(path, report):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("# Accepted query_plan.py findings, one \"query: finding\" glob per line\n")
+        for finding in sorted(set(report_findings(report))):
+            f.write(finding.replace('[', '[[]') + "\n")
+
+
+def new_findings(report, allowlist):
+    return [finding for finding in report_findings(report)
+            if not any(fnmatch.fnmatchcase(finding, pattern) for pattern in allowlist)]
+
+
+def format_report(report):
+    lines = []
+    for query_name, entry in report['queries'].items():
+        status = "❌" if entry['error'] else "⚠️" if entry['non_sargable'] or entry['plan_findings'] else "✅"
+        lines.append(f"{status} {query_name}")
+        if entry['error']:
+            lines.append(f"    error: {entry['error']}")
+        for finding in entry['non_sargable'] + entry['plan_findings']:
+            lines.append(f"    - {finding}")
+    if report['index_suggestions']:
+        lines.append("")
+        lines.append("Suggested indexes:")
+        for suggestion in report['index_suggestions']:
+            lines.append(f"    {suggestion['ddl']};  -- {suggestion['query']}")
+    return "\n".join(lines)
+
+
+def main():
+    import app
+
+    parser = argparse.ArgumentParser(description="Inspect query plans for the SmartWorks report queries")
+    parser.add_argument("--client", required=True, help="Client name to build the report queries for")
+    parser.add_argument("--analyze", action="store_true",
+                        help="Use EXPLAIN ANALYZE (runs each query; MySQL 8.0.18+)")
+    parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+    parser.add_argument("--allowlist", default=DEFAULT_ALLOWLIST,
+                        help="File of accepted findings; only findings not listed in it fail the check")
+    parser.add_argument("--update-allowlist", action="store_true",
+                        help="Write the current findings to the allow-list file and exit")
+    args = parser.parse_args()
+
+    connections = app.init_connections()
+    if not connections['mysql']:
+        print("❌ Database connection is required for query plan inspection")
+        return 1
+    cursor = connections['mysql'].cursor()
+    try:
+        queries, params = app.build_client_queries(args.client)
+        report = inspect_queries(cursor, queries, params, analyze=args.analyze)
+    finally:
+        cursor.close()
+
+    if args.update_allowlist:
+        write_allowlist(args.allowlist, report)
+        print(f"Wrote {len(set(report_findings(report)))} findings to {args.allowlist}")
+        return 0
+
+    report['new_findings'] = new_findings(report, load_allowlist(args.allowlist))
+    errors = sum(1 for entry in report['queries'].values() if entry['error'])
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(format_report(report))
+        print("")
+        print(f"{len(report['new_findings'])} new findings, "
+              f"{len(report_findings(report)) - len(report['new_findings'])} allowed, {errors} errors")
+        for finding in report['new_findings']:
+            print(f"    new: {finding}")
+    # Non-zero exit lets a scheduled check catch plan regressions; accepted findings do not count
+    return 1 if report['new_findings'] or errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
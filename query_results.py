@@ -0,0 +1,101 @@
+
+"""Convert DB-API result rows into report records or NumPy columns.
+
+MySQL returns DECIMAL columns as Decimal and DATETIME/DATE columns as
+datetime/date objects. Converting them once here, column by column, gives
+the rest of the pipeline plain floats and ISO strings that serialize to
+JSON and prompts without further work, and avoids building a pandas
+DataFrame just to turn it back into a list of dicts.
+"""
+
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+
+def _datetime_to_text(value):
+    return value.isoformat(sep=' ')
+
+
+def _date_to_text(value):
+    return value.isoformat()
+
+
+def _bytes_to_text(value):
+    return bytes(value).decode('utf-8', errors='replace')
+
+
+def _first_value(values):
+    return next((value for value in values if value is not None), None)
+
+
+def _record_converter(sample):
+    """Converter for one column, chosen from its first non-NULL value"""
+    if isinstance(sample, Decimal):
+        return float
+    if isinstance(sample, datetime):
+        return _datetime_to_text
+    if isinstance(sample, date):
+        return _date_to_text
+    if isinstance(sample, timedelta):
+        return str
+    if isinstance(sample, (bytes, bytearray)):
+        return _bytes_to_text
+    return None
+
+
+def rows_to_records(columns, rows):
+    """[{column: value}] with Decimal -> float, datetime/date -> ISO text, bytes -> str"""
+    if not rows:
+        return []
+    column_values = list(zip(*rows))
+    converted = False
+    for index, values in enumerate(column_values):
+        converter = _record_converter(_first_value(values))
+        if converter is not None:
+            column_values[index] = [None if value is None else converter(value) for value in values]
+            converted = True
+    if converted:
+        rows = zip(*column_values)
+    return [dict(zip(columns, row)) for row in rows]
+
+
+def round_half_up(value, digits=2):
+    """Round like MySQL ROUND on DECIMAL values: halves go away from zero, where round() and
+    Series.round() go to the even digit (78.125 -> 78.13, not 78.12). None and NaN pass through.
+    """
+    if value is None or value != value:
+        return value
+    # 12 significant digits drop the binary noise of float sums (19.364999999999991 is the DECIMAL 19.365)
+    rounded = Decimal(f"{float(value):.12g}").quantize(Decimal(1).scaleb(-digits), rounding=ROUND_HALF_UP)
+    return float(rounded)
+
+
+def rows_to_columns(columns, rows):
+    """{column: np.ndarray} for vectorized use.
+
+    Numeric columns become float64 (NULL -> NaN) or int64 when they have no NULLs,
+    DATETIME/DATE columns become datetime64 (NULL -> NaT), everything else stays object.
+    """
+    if not rows:
+        return {column: np.array([], dtype=object) for column in columns}
+    arrays = {}
+    for column, values in zip(columns, zip(*rows)):
+        sample = _first_value(values)
+        has_nulls = None in values
+        if isinstance(sample, bool):
+            arrays[column] = np.array(values, dtype=object)
+        elif isinstance(sample, int) and not has_nulls:
+            arrays[column] = np.array(values, dtype=np.int64)
+        elif isinstance(sample, (int, float, Decimal)):
+            arrays[column] = np.array([np.nan if value is None else float(value) for value in values],
+                                      dtype=np.float64)
+        elif isinstance(sample, (datetime, date)):
+            arrays[column] = np.array(values, dtype='datetime64[us]')
+        elif isinstance(sample, (bytes, bytearray)):
+            arrays[column] = np.array([None if value is None else _bytes_to_text(value) for value in values],
+                                      dtype=object)
+        else:
+            arrays[column] = np.array(values, dtype=object)
+    return arrays
@@ -0,0 +1,137 @@
+
+"""Disk-backed storage for generated SmartWorks reports.
+
+Session state keeps only lightweight report metadata; the heavy artifacts
+(AI narrative, plotly charts, Markdown with embedded images, PDF bytes) are
+written under the session's data directory and loaded on demand. A shared
+registry enforces per-user and global byte budgets, evicting the least
+recently used reports first.
+"""
+
+import base64
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+# Artifact name -> (file name, binary)
+ARTIFACTS = {
+    'ai_report': ('ai_report.md', False),
+    'charts': ('charts.json', False),
+    'chart_pngs': ('chart_pngs.json', False),
+    'markdown_content': ('report.md', False),
+    'pdf_content': ('report.pdf', True),
+}
+
+
+def new_report_id():
+    return uuid.uuid4().hex[:16]
+
+
+class ReportStore:
+    def __init__(self, per_user_bytes=50 * 1024 * 1024, global_bytes=1024 * 1024 * 1024):
+        self.per_user_bytes = per_user_bytes
+        self.global_bytes = global_bytes
+        self.evictions = 0
+        self._reports = OrderedDict()  # report_id -> {'user', 'directory', 'bytes'}, in LRU order
+        self._lock = threading.Lock()
+
+    def save(self, report_id, user, base_dir, artifacts):
+        """Write artifacts for a report and account for them; returns the stored size in bytes"""
+        directory = os.path.join(base_dir, "reports", report_id)
+        os.makedirs(directory, exist_ok=True)
+        for name, value in artifacts.items():
+            if value is not None:
+                self._write_artifact(directory, name, value)
+        total = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+        with self._lock:
+            self._reports[report_id] = {'user': user, 'directory': directory, 'bytes': total}
+            self._reports.move_to_end(report_id)
+            self._enforce_budgets(user, keep=report_id)
+        return total
+
+    def register(self, report_id, user, base_dir):
+        """Account for a report already on disk (e.g. written before a restart); False if it is gone"""
+        directory = os.path.join(base_dir, "reports", report_id)
+        if not os.path.exists(os.path.join(directory, ARTIFACTS['ai_report'][0])):
+            return False
+        total = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+        with self._lock:
+            self._reports[report_id] = {'user': user, 'directory': directory, 'bytes': total}
+            self._reports.move_to_end(report_id)
+            self._enforce_budgets(user, keep=report_id)
+        return True
+
+    def _write_artifact(self, directory, name, value):
+        file_name, binary = ARTIFACTS[name]
+        path = os.path.join(directory, file_name)
+        if name == 'charts':
+            value = json.dumps({key: fig.to_json() for key, fig in value.items() if fig is not None})
+        elif name == 'chart_pngs':
+            value = json.dumps({key: base64.b64encode(img).decode() for key, img in value.items()})
+        with open(path, 'wb' if binary else 'w', **({} if binary else {'encoding': 'utf-8'})) as f:
+            f.write(value)
+
+    def has(self, report_id, name=None):
+        with self._lock:
+            entry = self._reports.get(report_id)
+        if entry is None:
+            return False
+        if name is None:
+            return True
+        return os.path.exists(os.path.join(entry['directory'], ARTIFACTS[name][0]))
+
+    def load(self, report_id, name):
+        """Load one artifact, or None if the report was evicted or the artifact was never stored"""
+        with self._lock:
+            entry = self._reports.get(report_id)
+            if entry is None:
+                return None
+            self._reports.move_to_end(report_id)
+        file_name, binary = ARTIFACTS[name]
+        path = os.path.join(entry['directory'], file_name)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb' if binary else 'r', **({} if binary else {'encoding': 'utf-8'})) as f:
+            value = f.read()
+        if name == 'charts':
+            import plotly.io as pio
+            value = {key: pio.from_json(fig_json) for key, fig_json in json.loads(value).items()}
+        elif name == 'chart_pngs':
+            value = {key: base64.b64decode(img) for key, img in json.loads(value).items()}
+        return value
+
+    def delete(self, report_id):
+        with self._lock:
+            self._remove(report_id)
+
+    def usage(self, user=None):
+        with self._lock:
+            entries = [e for e in self._reports.values() if user is None or e['user'] == user]
+            return {'reports': len(entries), 'bytes': sum(e['bytes'] for e in entries), 'evictions': self.evictions}
+
+    def _enforce_budgets(self, user, keep):
+        # The report just saved is never evicted, even if it alone exceeds a budget
+        user_bytes = sum(e['bytes'] for e in self._reports.values() if e['user'] == user)
+        for report_id in [rid for rid, e in self._reports.items() if e['user'] == user and rid != keep]:
+            if user_bytes <= self.per_user_bytes:
+                break
+            user_bytes -= self._reports[report_id]['bytes']
+            self._remove(report_id)
+            self.evictions += 1
+
+        global_bytes = sum(e['bytes'] for e in self._reports.values())
+        for report_id in [rid for rid in self._reports if rid != keep]:
+            if global_bytes <= self.global_bytes:
+                break
+            global_bytes -= self._reports[report_id]['bytes']
+            self._remove(report_id)
+            self.evictions += 1
+
+    def _remove(self, report_id):
+        entry = self._reports.pop(report_id, None)
+        if entry is not None:
+            shutil.rmtree(entry['directory'], ignore_errors=True)
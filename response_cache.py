@@ -0,0 +1,98 @@
+
+"""Content-addressed on-disk cache for Claude responses.
+
+Responses are stored in a small SQLite database keyed by a SHA-256 of the
+model, sampling parameters and the fully rendered prompt, so identical
+requests are served from disk instead of the API. The cache is bounded by
+total response size and evicts the least recently used entries first.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class ResponseCache:
+    def __init__(self, directory, max_bytes=256 * 1024 * 1024):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, "responses.sqlite3")
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        with self._connect() as db:
+            db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )
+                """
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_responses_lru ON responses (last_accessed)")
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def make_key(model, temperature, prompt, max_tokens=None):
+        payload = json.dumps(
+            {"model": model, "temperature": temperature, "max_tokens": max_tokens, "prompt": prompt},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock, self._connect() as db:
+            row = db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            db.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response):
+        size = len(response.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, created_at, last_accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now)
+            )
+            self._evict(db)
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_accessed").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._lock, self._connect() as db:
+            db.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock, self._connect() as db:
+            entries, total = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": entries, "bytes": total, "hits": self.hits, "misses": self.misses}
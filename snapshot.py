@@ -0,0 +1,379 @@
+
+"""Offline Parquet snapshot of the report source tables.
+
+The export job copies chatbot_portfolio_sheet and the report columns of
+prod_ticketing into a snapshot directory:
+
+    snapshot/
+    ├── manifest.json
+    ├── portfolio.parquet
+    └── tickets/month=YYYY-MM/part-0.parquet   # sorted by company, then createdAt
+
+Ticket files are sorted by a normalized company key, so a single client's
+rows sit in a few row groups and reads skip the rest using the Parquet
+statistics. With DATA_SOURCE=snapshot the app answers the report queries
+from these files (memory-mapped through pyarrow) instead of MySQL.
+
+Refresh the snapshot from the command line:
+
+    python snapshot.py                       # new months plus the last 2 again
+    python snapshot.py --months 13 --full    # rebuild every month
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+from dotenv import load_dotenv
+
+from portfolio import TICKET_TOTAL_COLUMNS
+from query_results import round_half_up, rows_to_records
+
+MANIFEST = "manifest.json"
+PORTFOLIO_FILE = "portfolio.parquet"
+TICKETS_DIR = "tickets"
+
+TICKET_SCHEMA = pa.schema([
+    ('companyName', pa.string()),
+    ('createdAt', pa.timestamp('us')),
+    ('clientStatus', pa.string()),
+    ('category', pa.string()),
+    ('subCategory', pa.string()),
+    ('TAT', pa.float64()),
+    ('isDueDateBreached', pa.int64()),
+    ('escalationLevel', pa.string()),
+    ('escalationStatus', pa.string()),
+])
+
+TICKET_EXPORT_QUERY = f"""
+    SELECT {', '.join(TICKET_SCHEMA.names)}
+    FROM prod_ticketing
+    WHERE createdAt >= %s
+        AND createdAt < %s
+        AND companyName IS NOT NULL
+    """
+
+ROW_GROUP_SIZE = 64 * 1024
+
+
+def snapshot_key(name):
+    """Normalized company key: whitespace collapsed and lower-cased, like MySQL's case-insensitive match"""
+    return " ".join(str(name).split()).lower()
+
+
+def _key_column(names):
+    names = pc.replace_substring_regex(pc.utf8_trim_whitespace(names), r"\s+", " ")
+    return pc.utf8_lower(names)
+
+
+def _month_starts(months, as_of=None):
+    current = (as_of or pd.Timestamp.now()).normalize().replace(day=1)
+    return [current - pd.DateOffset(months=offset) for offset in range(months - 1, -1, -1)]
+
+
+def _write_atomic(table, path, **kwargs):
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, **kwargs)
+    os.replace(tmp_path, path)
+
+
+def _fetch_ticket_month(cursor, month_start, batch_size):
+    month_end = month_start + pd.DateOffset(months=1)
+    cursor.execute(TICKET_EXPORT_QUERY, (month_start.to_pydatetime(), month_end.to_pydatetime()))
+    batches = []
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        columns = list(zip(*rows))
+        # TAT is DECIMAL in MySQL
+        columns[5] = [None if value is None else float(value) for value in columns[5]]
+        batches.append(pa.record_batch(
+            [pa.array(values, type=field.type) for values, field in zip(columns, TICKET_SCHEMA)],
+            schema=TICKET_SCHEMA
+        ))
+    table = pa.Table.from_batches(batches, schema=TICKET_SCHEMA)
+    table = table.append_column('company_key', _key_column(table['companyName']))
+    # Sorting here rather than in SQL keeps the filesort off the production database
+    return table.sort_by([('company_key', 'ascending'), ('createdAt', 'ascending')])
+
+
+def _fetch_portfolio(cursor):
+    cursor.execute("SELECT * FROM chatbot_portfolio_sheet")
+    columns = [col[0] for col in cursor.description]
+    rows = cursor.fetchall()
+    values = list(zip(*rows)) if rows else [[] for _ in columns]
+    return pa.table({column: pa.array(list(column_values)) for column, column_values in zip(columns, values)})
+
+
+def export_snapshot(conn, root, months=13, restate_months=2, full=False, batch_size=50000):
+    """Export the portfolio sheet and ticket months into root; returns the new manifest.
+
+    Months already on disk are kept unless they fall within the last restate_months
+    (tickets still change status and TAT) or full is set. Each file is written to a
+    temporary name and renamed into place, so readers never see a partial file.
+    """
+    os.makedirs(os.path.join(root, TICKETS_DIR), exist_ok=True)
+    previous = read_manifest(root) or {}
+    month_rows = dict(previous.get('months', {}))
+    window = _month_starts(months)
+    restate_from = window[-min(restate_months, len(window))] if restate_months else None
+
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        portfolio_table = _fetch_portfolio(cursor)
+        _write_atomic(portfolio_table, os.path.join(root, PORTFOLIO_FILE))
+
+        for month_start in window:
+            label = month_start.strftime('%Y-%m')
+            month_dir = os.path.join(root, TICKETS_DIR, f"month={label}")
+            path = os.path.join(month_dir, "part-0.parquet")
+            if not full and os.path.exists(path) and label in month_rows and \
+                    (restate_from is None or month_start < restate_from):
+                continue
+            table = _fetch_ticket_month(cursor, month_start, batch_size)
+            os.makedirs(month_dir, exist_ok=True)
+            _write_atomic(table, path, row_group_size=ROW_GROUP_SIZE)
+            month_rows[label] = table.num_rows
+            print(f"  {label}: {table.num_rows} tickets")
+    finally:
+        cursor.close()
+
+    # Drop months that have left the window
+    keep = {month_start.strftime('%Y-%m') for month_start in window}
+    for entry in os.listdir(os.path.join(root, TICKETS_DIR)):
+        label = entry.split("=", 1)[-1]
+        if entry.startswith("month=") and label not in keep:
+            shutil.rmtree(os.path.join(root, TICKETS_DIR, entry), ignore_errors=True)
+            month_rows.pop(label, None)
+
+    manifest = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'portfolio_rows': portfolio_table.num_rows,
+        'months': {label: month_rows[label] for label in sorted(month_rows)},
+        'export_seconds': round(time.perf_counter() - start, 2),
+    }
+    tmp_path = os.path.join(root, f"{MANIFEST}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(root, MANIFEST))
+    return manifest
+
+
+def read_manifest(root):
+    try:
+        with open(os.path.join(root, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _days_since(value, today):
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date) and value < today:
+        return (today - value).days
+    return 0
+
+
+class SnapshotReader:
+    """Report queries answered from a snapshot directory; reloads when the manifest changes"""
+
+    def __init__(self, root):
+        self.root = root
+        self._lock = threading.Lock()
+        self._loaded_mtime = None
+        self._portfolio = None
+        self._tickets = None
+
+    @property
+    def manifest(self):
+        return read_manifest(self.root)
+
+    @property
+    def refreshed_at(self):
+        manifest = self.manifest
+        return datetime.fromisoformat(manifest['created_at']) if manifest else None
+
+    def available(self):
+        return os.path.exists(os.path.join(self.root, MANIFEST))
+
+    def _load(self):
+        """Return (portfolio table, tickets dataset), reopened after each export"""
+        mtime = os.path.getmtime(os.path.join(self.root, MANIFEST))
+        with self._lock:
+            if mtime != self._loaded_mtime:
+                portfolio = pq.read_table(os.path.join(self.root, PORTFOLIO_FILE), memory_map=True)
+                self._portfolio = portfolio.append_column(
+                    '_key', _key_column(portfolio['Client_Name'].cast(pa.string()))
+                )
+                self._tickets = ds.dataset(
+                    os.path.join(self.root, TICKETS_DIR), format='parquet', partitioning='hive',
+                    filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True)
+                )
+                self._loaded_mtime = mtime
+            return self._portfolio, self._tickets
+
+    def client_demographics(self, client_name, seat_column, revenue_column, today=None):
+        """Same rows and columns as the client_demographics query"""
+        today = today or date.today()
+        portfolio, _ = self._load()
+        mask = pc.and_(
+            pc.equal(portfolio['_key'], snapshot_key(client_name)),
+            pc.is_in(portfolio['Status'].cast(pa.string()), value_set=pa.array(['Active', 'Inactive']))
+        )
+        columns = [
+            'centre_name', 'client_name', 'client_id', 'move_in_date', 'move_out_date', 'client_type', 'Status',
+            'floor_info', 'current_month_seats', 'current_month_revenue', 'current_month_price_per_seat',
+            'Escalation', 'Escalation_Frequency', 'First_Escalation_Date', 'days_since_moveout'
+        ]
+        rows = []
+        for row in portfolio.filter(mask).to_pylist():
+            seats = row.get(seat_column) or 0
+            revenue = row.get(revenue_column) or 0
+            rows.append((
+                row.get('Centre'), row.get('Client_Name'), row.get('Client_Id'), row.get('Client_Move_in'),
+                row.get('Client_Move_out'), row.get('Stage_Strategy'), row.get('Status'), row.get('Floor'),
+                seats, revenue, round_half_up(float(revenue) / float(seats)) if seats > 0 and revenue > 0 else 0,
+                row.get('Escalation'), row.get('Escalation_Frequency'), row.get('First_Escalation_Date'),
+                _days_since(row.get('Client_Move_out'), today),
+            ))
+        return rows_to_records(columns, rows)
+
+    def center_avg_pricing(self, client_name, seat_column, revenue_column):
+        """Same result as the center_avg_pricing query: active clients with seats and revenue in the client's centre"""
+        portfolio, _ = self._load()
+        matches = portfolio.filter(pc.equal(portfolio['_key'], snapshot_key(client_name)))
+        if matches.num_rows == 0 or seat_column not in portfolio.column_names \
+                or revenue_column not in portfolio.column_names:
+            return []
+        centre = matches['Centre'][0].as_py()
+        in_centre = portfolio.filter(pc.and_(
+            pc.equal(portfolio['Centre'], centre), pc.equal(portfolio['Status'], 'Active')
+        ))
+        seats = np.nan_to_num(in_centre[seat_column].cast(pa.float64()).to_numpy(zero_copy_only=False))
+        revenue = np.nan_to_num(in_centre[revenue_column].cast(pa.float64()).to_numpy(zero_copy_only=False))
+        priced = (seats > 0) & (revenue > 0)
+        if not priced.any():
+            return []
+        return [{
+            'Centre': centre,
+            'total_clients_in_center': int(priced.sum()),
+            'total_center_seats': float(seats[priced].sum()),
+            'total_center_revenue': float(revenue[priced].sum()),
+            'center_avg_price_per_seat': round_half_up((revenue[priced] / seats[priced]).mean()),
+        }]
+
+    def ticket_slice(self, client_name, since, columns):
+        """{column: np.ndarray} of a client's tickets created at or after since; reads only matching row groups"""
+        _, tickets = self._load()
+        since = pd.Timestamp(since)
+        table = tickets.to_table(
+            columns=list(columns),
+            filter=(ds.field('month') >= since.strftime('%Y-%m'))
+            & (ds.field('company_key') == snapshot_key(client_name))
+            & (ds.field('createdAt') >= pa.scalar(since.to_pydatetime(), type=pa.timestamp('us')))
+        )
+        return {column: table[column].to_numpy(zero_copy_only=False) for column in columns}
+
+    def portfolio_columns(self, seat_column, revenue_column):
+        """Active portfolio rows as portfolio.build_portfolio_query returns them"""
+        portfolio, _ = self._load()
+        active = portfolio.filter(pc.and_(
+            pc.equal(portfolio['Status'], 'Active'), pc.is_valid(portfolio['Client_Name'])
+        ))
+
+        def _numbers(column):
+            if column not in active.column_names:
+                return np.zeros(active.num_rows)
+            return np.nan_to_num(active[column].cast(pa.float64()).to_numpy(zero_copy_only=False))
+
+        return {
+            'centre': active['Centre'].to_numpy(zero_copy_only=False),
+            'client_name': active['Client_Name'].to_numpy(zero_copy_only=False),
+            'seats': _numbers(seat_column),
+            'revenue': _numbers(revenue_column),
+        }
+
+    def ticket_totals(self, months=6):
+        """Per-company totals in portfolio.TICKET_TOTAL_COLUMNS over the last months"""
+        _, tickets = self._load()
+        since = pd.Timestamp.now().normalize() - pd.DateOffset(months=months)
+        table = tickets.to_table(
+            columns=['companyName', 'clientStatus', 'TAT', 'isDueDateBreached', 'escalationLevel'],
+            filter=(ds.field('month') >= since.strftime('%Y-%m'))
+            & (ds.field('createdAt') >= pa.scalar(since.to_pydatetime(), type=pa.timestamp('us')))
+        )
+        frame = table.to_pandas()
+        closed = frame['clientStatus'] == 'Closed'
+        tat = frame['TAT']
+        work = pd.DataFrame({
+            'companyName': frame['companyName'],
+            'ticket_count': 1,
+            'closed_count': closed.astype(int),
+            'open_count': (frame['clientStatus'] == 'Open').astype(int),
+            'closed_tat_sum': tat.where(closed),
+            'closed_tat_count': (closed & tat.notna()).astype(int),
+            'within_sla_count': (frame['isDueDateBreached'] == 0).astype(int),
+            'breached_count': (frame['isDueDateBreached'] == 1).astype(int),
+            'escalated_count': frame['escalationLevel'].notna().astype(int),
+        })
+        totals = work.groupby('companyName', sort=False).sum(min_count=1).reset_index()
+        return {column: totals[column].to_numpy() for column in TICKET_TOTAL_COLUMNS}
+
+    def client_names(self):
+        portfolio, tickets = self._load()
+        names = set(portfolio['Client_Name'].drop_null().cast(pa.string()).to_pylist())
+        names.update(pc.unique(tickets.to_table(columns=['companyName'])['companyName']).drop_null().to_pylist())
+        return sorted(names)
+
+
+def _connect_from_env():
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host=os.getenv('DB_HOST'),
+        database=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        port=int(os.getenv("DB_PORT", 3306)),
+        autocommit=True,
+        connect_timeout=10
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export the report tables to a Parquet snapshot")
+    parser.add_argument("--output", default=os.getenv("SNAPSHOT_DIR", "./snapshot"), help="Snapshot directory")
+    parser.add_argument("--months", type=int, default=int(os.getenv("SNAPSHOT_MONTHS", 13)),
+                        help="Months of tickets to keep, including the current one")
+    parser.add_argument("--restate-months", type=int, default=2,
+                        help="Re-export at least this many recent months to pick up ticket updates")
+    parser.add_argument("--full", action="store_true", help="Re-export every month in the window")
+    args = parser.parse_args()
+
+    conn = _connect_from_env()
+    try:
+        manifest = export_snapshot(conn, args.output, args.months, args.restate_months, args.full)
+    finally:
+        conn.close()
+    print(f"✅ Snapshot written to {args.output}: {manifest['portfolio_rows']} portfolio rows, "
+          f"{sum(manifest['months'].values())} tickets in {len(manifest['months'])} months "
+          f"({manifest['export_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
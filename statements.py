@@ -0,0 +1,106 @@
+
+"""Server-side prepared statements reused per MySQL connection.
+
+mysql.connector's prepared cursor holds a single statement and only skips
+the PREPARE round trip when it is handed the very same SQL string object
+again. StatementCache keeps one prepared cursor per distinct SQL text on
+each physical connection, together with the canonical string it was
+prepared with, so repeated report queries bind new parameters to an
+already parsed and planned statement.
+
+Prepared statements live in the server session: they are dropped when the
+connection reconnects (the cache checks the connection id) and when the
+pool resets the session on checkin, so pools that want reuse across
+checkouts must be created with pool_reset_session=False.
+
+A MySQL connection runs one statement at a time, so each physical
+connection also gets a lock (connection_lock); the cache's cursors are only
+used while it is held.
+"""
+
+import threading
+from collections import OrderedDict
+
+_CACHE_ATTRIBUTE = "_smartworks_statements"
+_LOCK_ATTRIBUTE = "_smartworks_lock"
+_attach_lock = threading.Lock()
+
+
+def _physical_connection(conn):
+    # PooledMySQLConnection wraps the real connection, which outlives each checkout
+    return getattr(conn, "_cnx", None) or conn
+
+
+def connection_lock(conn):
+    """Re-entrant lock serializing statements on conn's physical connection, created on first use"""
+    physical = _physical_connection(conn)
+    lock = getattr(physical, _LOCK_ATTRIBUTE, None)
+    if lock is None:
+        with _attach_lock:
+            lock = getattr(physical, _LOCK_ATTRIBUTE, None)
+            if lock is None:
+                lock = threading.RLock()
+                setattr(physical, _LOCK_ATTRIBUTE, lock)
+    return lock
+
+
+class StatementCache:
+    def __init__(self, connection, max_statements=64):
+        self.connection = connection
+        self.lock = connection_lock(connection)
+        self.max_statements = max_statements
+        self.connection_id = getattr(connection, "connection_id", None)
+        self.prepares = 0
+        self.reuses = 0
+        self._statements = OrderedDict()  # sql -> (prepared cursor, canonical sql), in LRU order
+
+    def cursor_for(self, sql):
+        """Prepared cursor for sql plus the string to execute it with; execute it while holding self.lock"""
+        with self.lock:
+            connection_id = getattr(self.connection, "connection_id", None)
+            if connection_id != self.connection_id:
+                # Reconnected: the server forgot every statement prepared on the old session
+                self._statements.clear()
+                self.connection_id = connection_id
+
+            entry = self._statements.get(sql)
+            if entry is not None:
+                self._statements.move_to_end(sql)
+                self.reuses += 1
+                return entry
+
+            while len(self._statements) >= self.max_statements:
+                _, (old_cursor, _) = self._statements.popitem(last=False)
+                try:
+                    old_cursor.close()
+                except Exception:
+                    pass
+            entry = (self.connection.cursor(prepared=True), sql)
+            self._statements[sql] = entry
+            self.prepares += 1
+            return entry
+
+    def discard(self, sql):
+        with self.lock:
+            entry = self._statements.pop(sql, None)
+            if entry is not None:
+                try:
+                    entry[0].close()
+                except Exception:
+                    pass
+
+    def stats(self):
+        return {'statements': len(self._statements), 'prepares': self.prepares, 'reuses': self.reuses}
+
+
+def get_statement_cache(conn, max_statements=64):
+    """The statement cache attached to conn's physical connection, created on first use"""
+    physical = _physical_connection(conn)
+    cache = getattr(physical, _CACHE_ATTRIBUTE, None)
+    if cache is None:
+        with _attach_lock:
+            cache = getattr(physical, _CACHE_ATTRIBUTE, None)
+            if cache is None:
+                cache = StatementCache(physical, max_statements)
+                setattr(physical, _CACHE_ATTRIBUTE, cache)
+    return cache
@@ -0,0 +1,337 @@
+
+"""Per-client monthly ticket rollup for the SmartWorks report queries.
+
+The rollup keeps one row per client, month, category, subCategory,
+escalationLevel and escalationStatus with ticket counts, TAT sums and SLA
+breach counts, so the report path can read O(months x categories) rows
+instead of scanning raw prod_ticketing tickets.
+
+The rollup is month-grained, so its trend window starts on the first day of
+the month six months back, while the live queries start on the same day six
+months back: rollup-based reports and portfolio totals include the whole of
+that oldest month, up to one month of tickets more than the live queries.
+Freshness is measured with the database clock, which also stamps
+refreshed_at, so the app and database may run in different time zones.
+
+Run the refresh job from the command line:
+
+    python ticket_rollup.py --once
+    python ticket_rollup.py --interval 900
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from query_results import round_half_up
+
+ROLLUP_TABLE = "client_ticket_rollup"
+STATE_TABLE = "client_ticket_rollup_state"
+JOB_NAME = "client_ticket_rollup"
+
+# Table name -> DDL
+ROLLUP_SCHEMA = {
+    ROLLUP_TABLE: f"""
+    CREATE TABLE IF NOT EXISTS {ROLLUP_TABLE} (
+        month_start DATE NOT NULL,
+        companyName VARCHAR(255) NOT NULL,
+        category VARCHAR(255) NULL,
+        subCategory VARCHAR(255) NULL,
+        escalationLevel VARCHAR(64) NULL,
+        escalationStatus VARCHAR(64) NULL,
+        ticket_count INT NOT NULL,
+        closed_count INT NOT NULL,
+        open_count INT NOT NULL,
+        closed_tat_sum DOUBLE NULL,
+        closed_tat_count INT NOT NULL,
+        tat_sum DOUBLE NULL,
+        tat_count INT NOT NULL,
+        within_sla_count INT NOT NULL,
+        breached_count INT NOT NULL,
+        within_sla_tat_sum DOUBLE NULL,
+        within_sla_tat_count INT NOT NULL,
+        breached_tat_sum DOUBLE NULL,
+        breached_tat_count INT NOT NULL,
+        KEY idx_rollup_company_month (companyName, month_start),
+        KEY idx_rollup_month (month_start)
+    ) DEFAULT CHARSET=utf8mb4
+    """,
+    STATE_TABLE: f"""
+    CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+        job_name VARCHAR(64) NOT NULL PRIMARY KEY,
+        watermark DATETIME NULL,
+        refreshed_at DATETIME NOT NULL
+    ) DEFAULT CHARSET=utf8mb4
+    """
+}
+
+ROLLUP_MEASURES = [
+    'ticket_count', 'closed_count', 'open_count', 'closed_tat_sum', 'closed_tat_count',
+    'tat_sum', 'tat_count', 'within_sla_count', 'breached_count',
+    'within_sla_tat_sum', 'within_sla_tat_count', 'breached_tat_sum', 'breached_tat_count'
+]
+
+ROLLUP_DIMENSIONS = ['month_start', 'category', 'subCategory', 'escalationLevel', 'escalationStatus']
+
+# Aggregate raw tickets created at or after {refresh_from} into rollup rows
+ROLLUP_INSERT = f"""
+    INSERT INTO {ROLLUP_TABLE} (
+        month_start, companyName, category, subCategory, escalationLevel, escalationStatus,
+        {', '.join(ROLLUP_MEASURES)}
+    )
+    SELECT
+        DATE_SUB(DATE(createdAt), INTERVAL DAYOFMONTH(createdAt) - 1 DAY) as month_start,
+        companyName,
+        category,
+        subCategory,
+        escalationLevel,
+        escalationStatus,
+        COUNT(*) as ticket_count,
+        COUNT(CASE WHEN clientStatus = 'Closed' THEN 1 END) as closed_count,
+        COUNT(CASE WHEN clientStatus = 'Open' THEN 1 END) as open_count,
+        SUM(CASE WHEN clientStatus = 'Closed' THEN TAT END) as closed_tat_sum,
+        COUNT(CASE WHEN clientStatus = 'Closed' AND TAT IS NOT NULL THEN 1 END) as closed_tat_count,
+        SUM(TAT) as tat_sum,
+        COUNT(TAT) as tat_count,
+        COUNT(CASE WHEN isDueDateBreached = 0 THEN 1 END) as within_sla_count,
+        COUNT(CASE WHEN isDueDateBreached = 1 THEN 1 END) as breached_count,
+        SUM(CASE WHEN isDueDateBreached = 0 THEN TAT END) as within_sla_tat_sum,
+        COUNT(CASE WHEN isDueDateBreached = 0 AND TAT IS NOT NULL THEN 1 END) as within_sla_tat_count,
+        SUM(CASE WHEN isDueDateBreached = 1 THEN TAT END) as breached_tat_sum,
+        COUNT(CASE WHEN isDueDateBreached = 1 AND TAT IS NOT NULL THEN 1 END) as breached_tat_count
+    FROM prod_ticketing
+    WHERE createdAt >= '{{refresh_from}}'
+        AND companyName IS NOT NULL
+    GROUP BY month_start, companyName, category, subCategory, escalationLevel, escalationStatus
+"""
+
+
+def ensure_rollup_schema(conn):
+    """Create the rollup tables that do not exist yet.
+
+    Existing tables are skipped up front: CREATE TABLE IF NOT EXISTS on them raises a note (1050),
+    which is an error on connections opened with raise_on_warnings, like the app's pool.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "SELECT table_name FROM information_schema.tables "
+            "WHERE table_schema = DATABASE() AND table_name IN (%s, %s)",
+            (ROLLUP_TABLE, STATE_TABLE)
+        )
+        existing = {str(row[0]).lower() for row in cursor.fetchall()}
+        for table, statement in ROLLUP_SCHEMA.items():
+            if table.lower() not in existing:
+                cursor.execute(statement)
+    finally:
+        cursor.close()
+
+
+def get_rollup_state(cursor):
+    """Return (watermark, refreshed_at, age in seconds) for the rollup job, or (None, None, None) if it never ran.
+
+    The age is computed by the database against the NOW() that wrote refreshed_at, not the app's clock.
+    """
+    cursor.execute(
+        f"SELECT watermark, refreshed_at, TIMESTAMPDIFF(SECOND, refreshed_at, NOW()) "
+        f"FROM {STATE_TABLE} WHERE job_name = '{JOB_NAME}'"
+    )
+    row = cursor.fetchone()
+    return (row[0], row[1], row[2]) if row else (None, None, None)
+
+
+def month_start(value):
+    return datetime(value.year, value.month, 1)
+
+
+def refresh_rollup(conn, restate_days=35, history_months=13):
+    """Incrementally refresh the rollup from the last processed createdAt watermark.
+
+    Whole months from the watermark (pulled back by restate_days, so status and TAT
+    changes on recent tickets are picked up) are deleted and re-aggregated inside one
+    transaction. The first run builds history_months of history.
+    """
+    cursor = conn.cursor()
+    try:
+        watermark, _, _ = get_rollup_state(cursor)
+        # The watermark is a createdAt value, so compare it with the database's clock
+        cursor.execute("SELECT NOW()")
+        now = cursor.fetchone()[0]
+
+        if watermark is None:
+            refresh_from = month_start(pd.Timestamp(now) - pd.DateOffset(months=history_months))
+        else:
+            refresh_from = month_start(min(watermark, now - timedelta(days=restate_days)))
+        refresh_from_sql = refresh_from.strftime('%Y-%m-%d %H:%M:%S')
+
+        start = time.perf_counter()
+        conn.start_transaction()
+        cursor.execute(f"SELECT MAX(createdAt) FROM prod_ticketing WHERE createdAt >= '{refresh_from_sql}'")
+        new_watermark = cursor.fetchone()[0] or watermark
+
+        cursor.execute(f"DELETE FROM {ROLLUP_TABLE} WHERE month_start >= '{refresh_from.strftime('%Y-%m-%d')}'")
+        deleted = cursor.rowcount
+        cursor.execute(ROLLUP_INSERT.replace('{refresh_from}', refresh_from_sql))
+        inserted = cursor.rowcount
+
+        cursor.execute(
+            f"""
+            INSERT INTO {STATE_TABLE} (job_name, watermark, refreshed_at)
+            VALUES ('{JOB_NAME}', %s, NOW())
+            ON DUPLICATE KEY UPDATE watermark = %s, refreshed_at = NOW()
+            """,
+            (new_watermark, new_watermark)
+        )
+        conn.commit()
+
+        print(f"✅ Ticket rollup refreshed from {refresh_from:%Y-%m-%d}: "
+              f"{deleted} rows replaced by {inserted} in {time.perf_counter() - start:.2f}s "
+              f"(watermark {new_watermark})")
+        return {'refresh_from': refresh_from, 'watermark': new_watermark, 'rows': inserted}
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def build_client_rollup_query(months=6):
+    """Rollup rows for one client (bound as the only parameter) covering the trend window.
+
+    The rollup is month-grained, so the window starts at the first day of the month
+    six months back rather than at the exact day used by the live queries.
+    """
+    return f"""
+        SELECT
+            month_start, {', '.join(ROLLUP_DIMENSIONS[1:])},
+            {', '.join(ROLLUP_MEASURES)}
+        FROM {ROLLUP_TABLE}
+        WHERE companyName = %s
+            AND month_start >= DATE_SUB(DATE_SUB(CURDATE(), INTERVAL DAYOFMONTH(CURDATE()) - 1 DAY), INTERVAL {int(months)} MONTH)
+        """
+
+
+def _ratio(numerator, denominator, scale=1.0):
+    numerator = pd.to_numeric(numerator, errors='coerce').astype(float)
+    denominator = pd.to_numeric(denominator, errors='coerce').astype(float)
+    return (numerator * scale / denominator.where(denominator > 0)).map(round_half_up)
+
+
+def _records(df):
+    df = df.astype(object)
+    return df.where(pd.notna(df), None).to_dict(orient='records')
+
+
+def rollup_to_ticket_data(rollup_rows, as_of=None):
+    """Derive monthly_trend, issues_breakdown, sla_compliance and escalation_analysis from rollup rows.
+
+    rollup_rows is a list of rows in ROLLUP_DIMENSIONS + ROLLUP_MEASURES order or a {column: array} mapping.
+    """
+    as_of = as_of or pd.Timestamp.now()
+    rollup = pd.DataFrame(rollup_rows, columns=ROLLUP_DIMENSIONS + ROLLUP_MEASURES)
+    for measure in ROLLUP_MEASURES:
+        rollup[measure] = pd.to_numeric(rollup[measure], errors='coerce').fillna(0)
+    months = pd.to_datetime(rollup['month_start'])
+    rollup['month'] = months.dt.strftime('%Y-%m')
+
+    monthly = rollup.groupby('month', sort=True)[ROLLUP_MEASURES].sum().reset_index()
+    monthly_trend = pd.DataFrame({
+        'month': monthly['month'],
+        'resolved_tickets': monthly['closed_count'].astype(int),
+        'unresolved_tickets': monthly['open_count'].astype(int),
+        'total_tickets': monthly['ticket_count'].astype(int),
+        'avg_tat': _ratio(monthly['closed_tat_sum'], monthly['closed_tat_count']),
+    })
+
+    issues_mask = rollup['category'].notna() & (rollup['category'] != 'AC')
+    issues = rollup[issues_mask].groupby(
+        ['category', 'subCategory'], dropna=False, sort=False
+    )[ROLLUP_MEASURES].sum().reset_index()
+    issues_breakdown = pd.DataFrame({
+        'category': issues['category'],
+        'subCategory': issues['subCategory'],
+        'resolved_count': issues['closed_count'].astype(int),
+        'unresolved_count': issues['open_count'].astype(int),
+        'total_tickets': issues['ticket_count'].astype(int),
+        'avg_tat': _ratio(issues['closed_tat_sum'], issues['closed_tat_count']),
+        'resolution_rate': _ratio(issues['closed_count'], issues['ticket_count'], 100.0),
+    }).sort_values('total_tickets', ascending=False, kind='mergesort')
+
+    current = rollup[((months.dt.year == as_of.year) & (months.dt.month == as_of.month)).to_numpy()]
+    sla = current[ROLLUP_MEASURES].sum()
+    total = int(sla['ticket_count'])
+    sla_compliance = [{
+        'total_tickets': total,
+        'within_sla': int(sla['within_sla_count']),
+        'sla_breached': int(sla['breached_count']),
+        'sla_compliance_rate': round_half_up(sla['within_sla_count'] * 100.0 / total) if total else None,
+        'avg_tat_within_sla': round_half_up(sla['within_sla_tat_sum'] / sla['within_sla_tat_count']) if sla['within_sla_tat_count'] else None,
+        'avg_tat_breached': round_half_up(sla['breached_tat_sum'] / sla['breached_tat_count']) if sla['breached_tat_count'] else None,
+    }]
+
+    escalation = rollup[rollup['escalationLevel'].notna()].groupby(
+        ['escalationLevel', 'escalationStatus'], dropna=False, sort=False
+    )[ROLLUP_MEASURES].sum().reset_index()
+    escalation_analysis = pd.DataFrame({
+        'escalationLevel': escalation['escalationLevel'],
+        'escalationStatus': escalation['escalationStatus'],
+        'ticket_count': escalation['ticket_count'].astype(int),
+        'avg_resolution_time': _ratio(escalation['tat_sum'], escalation['tat_count']),
+        'resolved_count': escalation['closed_count'].astype(int),
+        'unresolved_count': escalation['open_count'].astype(int),
+        'resolution_rate': _ratio(escalation['closed_count'], escalation['ticket_count'], 100.0),
+    }).sort_values('escalationLevel', kind='mergesort')
+
+    return {
+        'monthly_trend': _records(monthly_trend),
+        'issues_breakdown': _records(issues_breakdown),
+        'sla_compliance': sla_compliance,
+        'escalation_analysis': _records(escalation_analysis),
+    }
+
+
+def _connect_from_env():
+    import mysql.connector
+
+    return mysql.connector.connect(
+        host=os.getenv('DB_HOST'),
+        database=os.getenv('DB_NAME'),
+        user=os.getenv('DB_USER'),
+        password=os.getenv('DB_PASSWORD'),
+        port=int(os.getenv("DB_PORT", 3306)),
+        autocommit=True,
+        connect_timeout=10
+    )
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Refresh the per-client ticket rollup table")
+    parser.add_argument("--once", action="store_true", help="Run a single refresh and exit")
+    parser.add_argument("--interval", type=float, default=float(os.getenv("ROLLUP_REFRESH_INTERVAL_SECONDS", 900)),
+                        help="Seconds between refreshes when running continuously")
+    parser.add_argument("--restate-days", type=int, default=int(os.getenv("ROLLUP_RESTATE_DAYS", 35)),
+                        help="Re-aggregate at least this many days back to pick up ticket updates")
+    args = parser.parse_args()
+
+    conn = _connect_from_env()
+    ensure_rollup_schema(conn)
+    while True:
+        try:
+            if not conn.is_connected():
+                conn.reconnect(attempts=3, delay=5)
+            refresh_rollup(conn, restate_days=args.restate_days)
+        except Exception as e:
+            print(f"❌ Ticket rollup refresh failed: {e}")
+        if args.once:
+            break
+        time.sleep(args.interval)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+
+"""Lightweight tracing for the SmartWorks report pipeline.
+
+A trace covers one unit of work (a report, a download export, a batch
+report) and collects spans for its stages: database queries, Anthropic
+calls, chart building, kaleido image exports and PDF builds. The active
+trace lives in a context variable, so spans opened anywhere below it are
+recorded without threading a tracer through every function; work handed
+to thread pools must be wrapped with propagate() to keep the trace.
+
+Finished traces are kept in a bounded TraceStore for p50/p95 summaries
+and can be appended to a JSON lines file.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+_current_trace = contextvars.ContextVar("smartworks_trace", default=None)
+_current_span = contextvars.ContextVar("smartworks_span", default=None)
+
+
+class Span:
+    __slots__ = ('name', 'category', 'attributes', 'parent', 'thread', 'start', 'end')
+
+    def __init__(self, name, category="app", parent=None, **attributes):
+        self.name = name
+        self.category = category
+        self.attributes = attributes
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self, origin):
+        return {
+            'name': self.name,
+            'category': self.category,
+            'parent': self.parent.name if self.parent else None,
+            'thread': self.thread,
+            'start_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round(self.duration * 1000, 2),
+            'attributes': self.attributes,
+        }
+
+
+class Trace:
+    def __init__(self, name, **attributes):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = datetime.now()
+        self.start = time.perf_counter()
+        self.end = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def finish(self):
+        if self.end is None:
+            self.end = time.perf_counter()
+
+    @property
+    def duration(self):
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span.start)
+        return {
+            'trace_id': self.trace_id,
+            'name': self.name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'duration_ms': round(self.duration * 1000, 2),
+            'attributes': self.attributes,
+            'spans': [span.to_dict(self.start) for span in spans],
+        }
+
+
+class TraceStore:
+    """Recent finished traces (as dicts), optionally appended to a JSON lines file"""
+
+    def __init__(self, max_traces=200, path=None):
+        self.path = path
+        self._traces = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def record(self, trace):
+        entry = trace.to_dict()
+        line = json.dumps(entry, default=str)
+        with self._lock:
+            self._traces.append(entry)
+            if self.path:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(line + "\n")
+        return entry
+
+    def recent(self, name=None, limit=None):
+        """Newest first"""
+        with self._lock:
+            traces = [entry for entry in reversed(self._traces) if name is None or entry['name'] == name]
+        return traces[:limit] if limit else traces
+
+    def percentiles(self, name=None, limit=None, quantiles=(50, 95)):
+        """{stage: {'count', 'p50', 'p95'}} in ms over recent traces; 'total' is the whole trace"""
+        samples = {}
+        for entry in self.recent(name, limit):
+            samples.setdefault('total', []).append(entry['duration_ms'])
+            # Stages that run more than once per trace (e.g. one export per chart) are summed
+            per_trace = {}
+            for span in entry['spans']:
+                per_trace[span['name']] = per_trace.get(span['name'], 0.0) + span['duration_ms']
+            for stage, duration in per_trace.items():
+                samples.setdefault(stage, []).append(duration)
+        return {
+            stage: {'count': len(values), **{f"p{q}": round(percentile(values, q), 2) for q in quantiles}}
+            for stage, values in samples.items()
+        }
+
+    def export_jsonl(self, name=None):
+        return "".join(json.dumps(entry, default=str) + "\n" for entry in reversed(self.recent(name)))
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile, q in 0-100"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+@contextmanager
+def trace(name, store=None, **attributes):
+    """Start a trace for the enclosed work; it is recorded in store when the block exits"""
+    active = Trace(name, **attributes)
+    trace_token = _current_trace.set(active)
+    span_token = _current_span.set(None)
+    try:
+        yield active
+    except Exception as e:
+        active.attributes.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+        active.finish()
+        if store is not None:
+            store.record(active)
+
+
+@contextmanager
+def span(name, category="app", **attributes):
+    """Time the enclosed block as a span of the active trace; a no-op outside a trace"""
+    active = _current_trace.get()
+    current = Span(name, category, _current_span.get(), **attributes)
+    if active is None:
+        yield current
+        return
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.attributes.setdefault('error', type(e).__name__)
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        active.add(current)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def annotate(**attributes):
+    """Add attributes to the innermost open span, if any"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(**attributes)
+
+
+def propagate(fn):
+    """Bind fn to a copy of the current context so spans opened in a worker thread join the trace"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(fn, *args, **kwargs)